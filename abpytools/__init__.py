@@ -1,4 +1,5 @@
 from .core import *
+# the analysis modules bind matplotlib and seaborn with lazy_import, so importing them here stays cheap
 from .analysis.cdr_length import CDRLength
 from .analysis.amino_acid_freq import AminoAcidFreq
 from .analysis.sequence_alignment import SequenceAlignment
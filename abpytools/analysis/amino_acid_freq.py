@@ -1,10 +1,11 @@
 from abpytools.features.regions import ChainDomains
-from collections import Counter
 import numpy as np
-from matplotlib import pyplot as plt
 from abpytools.utils.data_loader import DataLoader
 import os
-from abpytools.utils import PythonConfig
+from abpytools.utils import PythonConfig, lazy_import
+from abpytools.utils.encoding import ALPHABET, ALPHABET_SIZE, encode_sequence
+
+plt = lazy_import('matplotlib.pyplot')
 
 amino_acid_index = {"R": 0,
                     "N": 1,
@@ -27,6 +28,20 @@ amino_acid_index = {"R": 0,
                     "W": 18,
                     "Y": 19}
 
+# amino_acid_index, hydrophobicity class and charge class indexed by residue code (see abpytools.utils.encoding)
+_amino_acid_rows = np.full(ALPHABET_SIZE, -1, dtype=np.int64)
+_amino_acid_rows[[ALPHABET.index(x) for x in amino_acid_index]] = list(amino_acid_index.values())
+
+# hydrophilic -> 0, moderate -> 1, hydrophobic -> 2
+_hydrophobicity_rows = np.full(ALPHABET_SIZE, 2, dtype=np.int64)
+_hydrophobicity_rows[[ALPHABET.index(x) for x in ['R', 'N', 'D', 'E', 'Q', 'K', 'S', 'T']]] = 0
+_hydrophobicity_rows[[ALPHABET.index(x) for x in ['C', 'H', 'M']]] = 1
+
+# negative -> 0, positive -> 1, neutral -> 2
+_charge_rows = np.full(ALPHABET_SIZE, 2, dtype=np.int64)
+_charge_rows[[ALPHABET.index(x) for x in ['D', 'E']]] = 0
+_charge_rows[[ALPHABET.index(x) for x in ['R', 'K', 'H']]] = 1
+
 
 class AminoAcidFreq(ChainDomains):
 
@@ -67,43 +82,41 @@ class AminoAcidFreq(ChainDomains):
         # if the sum of self._aa_count is zero then the count has not been performed at this point
         if self._aa_count.sum() == 0:
 
-            for position in range(len(max(self._sequences, key=len))):
-
-                position_sequence = [x[position] for x in self._sequences if len(x) > position]
-                count_i = Counter(position_sequence)
-                total_i = len(position_sequence)
-
-                for amino_acid_i in count_i.keys():
-
-                    self._aa_count[amino_acid_index[amino_acid_i], position] = count_i[amino_acid_i]
-
-                    # _aa_hyd_freq: row1 -> hydrophilic
-                    #               row2 -> moderate
-                    #               row3 -> hydrophobic
-                    if amino_acid_i in ['R', 'N', 'D', 'E', 'Q', 'K', 'S', 'T']:
-                        self._aa_hyd_count[0, position] += count_i[amino_acid_i]
-                    elif amino_acid_i in ['C', 'H', 'M']:
-                        self._aa_hyd_count[1, position] += count_i[amino_acid_i]
-                    else:
-                        self._aa_hyd_count[2, position] += count_i[amino_acid_i]
-
-                    # _aa_chg_freq: row1 -> negative
-                    #               row2 -> positive
-                    #               row3 -> neutral
-                    if amino_acid_i in ['D', 'E']:
-                        self._aa_chg_count[0, position] += count_i[amino_acid_i]
-                    elif amino_acid_i in ['R', 'K', 'H']:
-                        self._aa_chg_count[1, position] += count_i[amino_acid_i]
-                    else:
-                        self._aa_chg_count[2, position] += count_i[amino_acid_i]
-
-                # normalize values
-                # doing it even when it is not required comes at a small computational cost
-                # it would take longer if the user had to recalculate everything to have a count plot and then a
-                # frequency plot
-                self._aa_freq[:, position] = self._aa_count[:, position] / total_i
-                self._aa_chg_freq[:, position] = self._aa_chg_count[:, position] / total_i
-                self._aa_hyd_freq[:, position] = self._aa_hyd_count[:, position] / total_i
+            encoded_sequences = [encode_sequence(x) for x in self._sequences]
+            lengths = np.array([len(x) for x in encoded_sequences], dtype=np.int64)
+            codes = np.concatenate(encoded_sequences)
+
+            if np.any(_amino_acid_rows[codes] < 0):
+                raise ValueError("Amino acid frequency is only defined for the twenty standard amino acids")
+
+            # position of each residue in its sequence
+            positions = np.arange(len(codes)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            n_positions = self._sequence_count
+
+            def position_count(rows, n_rows):
+                return np.bincount(rows[codes] * n_positions + positions,
+                                   minlength=n_rows * n_positions).reshape(n_rows, n_positions)
+
+            self._aa_count = position_count(_amino_acid_rows, 20).astype(np.float64)
+
+            # _aa_hyd_freq: row1 -> hydrophilic
+            #               row2 -> moderate
+            #               row3 -> hydrophobic
+            self._aa_hyd_count = position_count(_hydrophobicity_rows, 3).astype(np.float64)
+
+            # _aa_chg_freq: row1 -> negative
+            #               row2 -> positive
+            #               row3 -> neutral
+            self._aa_chg_count = position_count(_charge_rows, 3).astype(np.float64)
+
+            # normalize values
+            # doing it even when it is not required comes at a small computational cost
+            # it would take longer if the user had to recalculate everything to have a count plot and then a
+            # frequency plot
+            total = np.bincount(positions, minlength=n_positions)
+            self._aa_freq = self._aa_count / total
+            self._aa_chg_freq = self._aa_chg_count / total
+            self._aa_hyd_freq = self._aa_hyd_count / total
 
         if normalize:
             return self._aa_freq, self._aa_chg_freq, self._aa_hyd_freq
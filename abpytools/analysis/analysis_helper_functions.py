@@ -1,8 +1,9 @@
 import warnings
-import _pickle as cPickle
-from abpytools.home import Home
+from ..utils.reference_bundle import get_reference_bundle
 from ..utils.python_config import PythonConfig
-import matplotlib.pyplot as plt
+from ..utils.lazy_imports import lazy_import
+
+plt = lazy_import('matplotlib.pyplot')
 
 SUPPORTED_SUBSITUTION_MATRICES = ['BLOSUM45', 'BLOSUM62', 'BLOSUM80']
 
@@ -17,11 +18,8 @@ def load_alignment_algorithm(algorithm):
 
 def load_substitution_matrix(substitution_matrix):
 
-    abpytools_directory = Home().homedir
-
     if substitution_matrix in SUPPORTED_SUBSITUTION_MATRICES:
-        with open('{}/data/{}.txt'.format(abpytools_directory, substitution_matrix), 'rb') as f:
-            matrix = cPickle.load(f)
+        matrix = get_reference_bundle().substitution_matrix_dict(substitution_matrix)
     else:
         raise ValueError("Unknown substitution matrix")
 
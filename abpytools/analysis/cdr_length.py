@@ -1,11 +1,12 @@
-from matplotlib import pyplot as plt
-import seaborn as sns
 import os
-from abpytools.utils import PythonConfig
+from abpytools.utils import PythonConfig, lazy_import
 from abpytools.features.regions import ChainDomains
-from matplotlib.ticker import MaxNLocator
 from .analysis_helper_functions import switch_interactive_mode
 
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
+ticker = lazy_import('matplotlib.ticker')
+
 
 class CDRLength(ChainDomains):
 
@@ -34,7 +35,7 @@ class CDRLength(ChainDomains):
             sns.distplot(self.cdr_lengths()[:, 2], hist=hist, ax=ax, **kwargs)
             ax.set_ylabel('Density', size=14)
             ax.set_xlabel('CDR Length', size=14)
-            ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+            ax.xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
         else:
             if plot_title is None:
                 plt.suptitle('CDR Length', size=20)
@@ -51,7 +52,7 @@ class CDRLength(ChainDomains):
                 if i == 1:
                     ax[i].set_xlabel('CDR Length', size=16)
 
-                ax[i].xaxis.set_major_locator(MaxNLocator(integer=True))
+                ax[i].xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
 
             plt.tight_layout()
             plt.subplots_adjust(top=0.85)
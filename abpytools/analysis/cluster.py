@@ -1,7 +1,10 @@
-from sklearn import cluster, decomposition
 import numpy as np
 from abpytools import ChainCollection
-from matplotlib import pyplot as plt
+from abpytools.utils import lazy_import
+
+cluster = lazy_import('sklearn.cluster')
+decomposition = lazy_import('sklearn.decomposition')
+plt = lazy_import('matplotlib.pyplot')
 
 
 class Cluster:
@@ -1,10 +1,12 @@
 from ..core.chain_collection import ChainCollection
-import seaborn as sns
 from .analysis_helper_functions import switch_interactive_mode
-from matplotlib import pyplot as plt
-from scipy.cluster.hierarchy import linkage, dendrogram
-import scipy.spatial.distance as ssd
 from ..utils.python_config import PythonConfig
+from ..utils.lazy_imports import lazy_import
+
+sns = lazy_import('seaborn')
+plt = lazy_import('matplotlib.pyplot')
+hierarchy = lazy_import('scipy.cluster.hierarchy')
+ssd = lazy_import('scipy.spatial.distance')
 
 
 class DistancePlot(ChainCollection):
@@ -12,9 +14,11 @@ class DistancePlot(ChainCollection):
         super().__init__(antibody_objects=antibody_objects, path=path)
 
     def plot_heatmap(self, feature='chou', distance_metric='cosine_distance', save=False, ax=None, labels=None,
-                     multiprocessing=False, file_name='./heatmap.png', **kwargs):
+                     multiprocessing=False, file_name='./heatmap.png', path=None, **kwargs):
 
-        data = self.distance_matrix(feature=feature, metric=distance_metric, multiprocessing=multiprocessing)
+        # with a path the distance matrix is a numpy memmap (see ChainCollection.distance_matrix)
+        data = self.distance_matrix(feature=feature, metric=distance_metric, multiprocessing=multiprocessing,
+                                    path=path)
 
         switch_interactive_mode(save=save)
 
@@ -37,15 +41,20 @@ class DistancePlot(ChainCollection):
             plt.savefig(file_name)
 
     def plot_dendrogram(self, feature='chou', distance_metric='cosine_distance', save=False, ax=None, labels=None,
-                        multiprocessing=False, **kwargs):
+                        multiprocessing=False, path=None, **kwargs):
 
         switch_interactive_mode(save=save)
 
-        data = self.distance_matrix(feature=feature, metric=distance_metric, multiprocessing=multiprocessing)
-        # convert the redundant n*n square matrix form into a condensed nC2 array
-        data = ssd.squareform(data)
+        if path is None:
+            data = self.distance_matrix(feature=feature, metric=distance_metric, multiprocessing=multiprocessing)
+            # convert the redundant n*n square matrix form into a condensed nC2 array
+            data = ssd.squareform(data)
+        else:
+            # the condensed nC2 array is written to a numpy memmap, the square matrix is never created
+            data = self.distance_matrix(feature=feature, metric=distance_metric, multiprocessing=multiprocessing,
+                                        path=path, condensed=True)
 
-        clustered_data = linkage(y=data)
+        clustered_data = hierarchy.linkage(y=data)
 
         if ax is None:
             f, ax = plt.subplots(1, 1, figsize=(8, 6))
@@ -55,7 +64,7 @@ class DistancePlot(ChainCollection):
             labels = self.names
 
         # plot dendrogram
-        _ = dendrogram(clustered_data, labels=labels, ax=ax, **kwargs)
+        _ = hierarchy.dendrogram(clustered_data, labels=labels, ax=ax, **kwargs)
 
         ipython_config = PythonConfig()
         if ipython_config.ipython_info == 'notebook' and save is False:
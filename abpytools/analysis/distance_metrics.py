@@ -1,5 +1,8 @@
-from .distance_metrics_ import cosine_distance_, hamming_distance_, levenshtein_distance_
+from .distance_metrics_ import (cosine_distance_, hamming_distance_, levenshtein_distance_, levenshtein_bit_parallel_,
+                                levenshtein_one_vs_many_, levenshtein_tile_)
 from abpytools.utils.math_utils import Vector
+from abpytools.utils.encoding import encode_sequence
+import numpy as np
 # from .analysis_helper_functions import init_score_matrix
 # from math import acos
 # from ..utils.math_utils import dot_product, magnitude
@@ -32,22 +35,24 @@ def cosine_similarity(u, v):
 def hamming_distance(seq1, seq2):
     """
     returns the hamming distance between two sequences
-    :param seq1:
-    :param seq2:
+    :param seq1: str or encoded sequence (see abpytools.utils.encoding)
+    :param seq2: str or encoded sequence (see abpytools.utils.encoding)
     :return:
     """
     if len(seq1) != len(seq2):
         raise ValueError("Sequences must be equal length, instead got {} and {}".format(len(seq1), len(seq2)))
     # pure python:
     # sum(aa1 != aa2 for aa1, aa2 in zip(seq1, seq2))
-    return hamming_distance_(seq1, seq2)
+    return hamming_distance_(encode_sequence(seq1), encode_sequence(seq2))
 
 
-def levenshtein_distance(seq1, seq2):
+def levenshtein_distance(seq1, seq2, max_distance=None):
     """
-
-    :param seq1:
-    :param seq2:
+    returns the levenshtein distance between two sequences, computed with the bit-parallel algorithm of Myers
+    :param seq1: str or encoded sequence (see abpytools.utils.encoding)
+    :param seq2: str or encoded sequence (see abpytools.utils.encoding)
+    :param max_distance: if not None the computation stops as soon as the distance is greater than max_distance,
+                         and max_distance + 1 is returned, e.g. to check if two CDR3s are within k edits
     :return:
     """
 
@@ -68,7 +73,64 @@ def levenshtein_distance(seq1, seq2):
     #                              dist[row - 1][col - 1] + cost)  # substitution
     #
     # return dist[rows-1][cols-1]
-    return levenshtein_distance_(seq1, seq2)
+    return levenshtein_bit_parallel_(encode_sequence(seq1), encode_sequence(seq2),
+                                     max_distance=_check_max_distance(max_distance))
+
+
+def levenshtein_distances(seq, sequences, n_threads=0, max_distance=None):
+    """
+    returns the levenshtein distances between a sequence and each sequence of a list, which are computed in
+    parallel with OpenMP
+    :param seq: str or encoded sequence (see abpytools.utils.encoding)
+    :param sequences: list of str or encoded sequences
+    :param n_threads: number of OpenMP threads, 0 for the OpenMP default
+    :param max_distance: if not None the distances greater than max_distance are max_distance + 1
+    :return: numpy.ndarray of int32 with shape (len(sequences),)
+    """
+    values, offsets = concatenate_sequences(sequences)
+    return levenshtein_one_vs_many_(encode_sequence(seq), values, offsets, n_threads=n_threads,
+                                    max_distance=_check_max_distance(max_distance))
+
+
+def levenshtein_distance_matrix(sequences, n_threads=0, max_distance=None):
+    """
+    returns the levenshtein distances between all the sequences of a list, where each pair is computed once in
+    parallel with OpenMP
+    :param sequences: list of str or encoded sequences
+    :param n_threads: number of OpenMP threads, 0 for the OpenMP default
+    :param max_distance: if not None the distances greater than max_distance are max_distance + 1
+    :return: numpy.ndarray of int32 with shape (len(sequences), len(sequences))
+    """
+    values, offsets = concatenate_sequences(sequences)
+    n = len(offsets) - 1
+    return levenshtein_tile_(values, offsets, 0, n, 0, n, n_threads=n_threads,
+                             max_distance=_check_max_distance(max_distance))
+
+
+def concatenate_sequences(sequences):
+    """
+    returns the concatenated encoded sequences and the start of each sequence, which is the input of the
+    batched levenshtein kernels
+    :param sequences: list of str or encoded sequences
+    :return: tuple with the uint8 codes and the offsets (numpy.intp with len(sequences) + 1 elements)
+    """
+    encoded_sequences = [encode_sequence(x) for x in sequences]
+    offsets = np.zeros(len(encoded_sequences) + 1, dtype=np.intp)
+    np.cumsum([len(x) for x in encoded_sequences], out=offsets[1:])
+    if len(encoded_sequences) > 0:
+        values = np.ascontiguousarray(np.concatenate(encoded_sequences), dtype=np.uint8)
+    else:
+        values = np.zeros(0, dtype=np.uint8)
+    return values, offsets
+
+
+def _check_max_distance(max_distance):
+    # the levenshtein kernels use -1 for no cutoff
+    if max_distance is None:
+        return -1
+    if max_distance < 0:
+        raise ValueError("Expected a non negative max_distance, instead got {}".format(max_distance))
+    return max_distance
 
 
 def euclidean_distance(u, v):
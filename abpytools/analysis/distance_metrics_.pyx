@@ -1,32 +1,12 @@
-from abpytools.cython_extensions.convert_py_2_C cimport release_C_pointer, get_C_char_array_pointers
-from abpytools.utils.math_utils cimport Matrix2D_backend, Vector
+from abpytools.utils.math_utils cimport Vector
 from libc.math cimport acos as acos_C
-from libc.math cimport fmin as min_C
 from libc.float cimport DBL_EPSILON
-
-
-cdef Matrix2D_backend init_score_matrix_(str seq_1, str seq_2, int indel):
-    """
-    - score matrix initialisation with two sequences
-    Example init_score_matrix('SEND', 'AND', -1):
-        [[0, -1, -2],
-         [-1, 0, 0],
-         [-2, 0, 0],
-         [-3, 0, 0]]
-
-    Args:
-        seq_1: 
-        seq_2: 
-        indel: 
-
-    Returns:
-
-    """
-
-    init_matrix = Matrix2D_backend([[x * indel] + [0] * len(seq_1) if x > 0 else
-                                    list(range(0, (len(seq_1) + 1) * indel, indel)) for x in range(len(seq_2) + 1)])
-
-    return init_matrix
+from libc.stdlib cimport malloc, calloc, free
+from libc.stdint cimport uint64_t
+from cython.parallel cimport prange, threadid
+cimport cython
+cimport openmp
+import numpy as np
 
 
 cpdef double cosine_distance_(list u, list v):
@@ -63,61 +43,382 @@ cpdef double cosine_distance_(list u, list v):
 
     return result
 
-cpdef int hamming_distance_(str seq1, str seq2):
+cpdef int hamming_distance_(const unsigned char[:] seq1, const unsigned char[:] seq2):
     """
     
     Args:
-        seq1: 
-        seq2: 
+        seq1: encoded sequence (see abpytools.utils.encoding)
+        seq2: encoded sequence (see abpytools.utils.encoding)
 
     Returns:
 
     """
 
     cdef int size
-    if len(seq1) == len(seq2):
-        size = len(seq1)
+    if seq1.shape[0] == seq2.shape[0]:
+        size = seq1.shape[0]
     else:
         raise ValueError("Sequence size mismatch")
 
     cdef int i
     cdef int result = 0
-    cdef char *seq1_ = get_C_char_array_pointers(seq1, size)
-    cdef char *seq2_ = get_C_char_array_pointers(seq2, size)
 
     for i in range(size):
-        if seq1_[i] != seq2_[i]:
+        if seq1[i] != seq2[i]:
             result+=1
 
-    release_C_pointer(seq1_)
-    release_C_pointer(seq2_)
-
     return result
 
 
-cpdef double levenshtein_distance_(seq1, seq2):
+cdef int levenshtein_(const unsigned char* seq1, Py_ssize_t len_1, const unsigned char* seq2, Py_ssize_t len_2,
+                     int* previous, int* current) noexcept nogil:
+    """
+    Levenshtein distance with two rolling rows of the score matrix, previous and current, which must have at
+    least len_2 + 1 elements.
+
+    Args:
+        seq1: encoded sequence (see abpytools.utils.encoding)
+        len_1: length of seq1
+        seq2: encoded sequence (see abpytools.utils.encoding)
+        len_2: length of seq2
+        previous: buffer of the previous row
+        current: buffer of the current row
+
+    Returns:
+
+    """
+    cdef Py_ssize_t row, col
+    cdef int deletion, insertion, substitution
+    cdef int* swap
+
+    for col in range(len_2 + 1):
+        previous[col] = col
+
+    for row in range(1, len_1 + 1):
+        current[0] = row
+        for col in range(1, len_2 + 1):
+            deletion = previous[col] + 1
+            insertion = current[col - 1] + 1
+            substitution = previous[col - 1] + (seq1[row - 1] != seq2[col - 1])
+            if insertion < deletion:
+                deletion = insertion
+            if substitution < deletion:
+                deletion = substitution
+            current[col] = deletion
+        swap = previous
+        previous = current
+        current = swap
+
+    return previous[len_2]
+
+
+cpdef double levenshtein_distance_(const unsigned char[:] seq1, const unsigned char[:] seq2):
     """
     
     Args:
-        seq1: 
-        seq2: 
+        seq1: encoded sequence (see abpytools.utils.encoding)
+        seq2: encoded sequence (see abpytools.utils.encoding)
+
+    Returns:
+
+    """
+    cdef Py_ssize_t len_1 = seq1.shape[0]
+    cdef Py_ssize_t len_2 = seq2.shape[0]
+    cdef int result
+
+    if len_1 == 0 or len_2 == 0:
+        return len_1 + len_2
+
+    cdef int* rows = <int*> malloc(2 * (len_2 + 1) * sizeof(int))
+    if rows == NULL:
+        raise MemoryError()
+
+    with nogil:
+        result = levenshtein_(&seq1[0], len_1, &seq2[0], len_2, rows, rows + len_2 + 1)
+
+    free(rows)
+
+    return result
+
+
+cdef enum:
+    # number of bits of each word of the bit-parallel levenshtein distance
+    WORD_SIZE = 64
+    # number of values of the encoded residues
+    N_CODES = 256
+
+
+cdef int myers_(const unsigned char* seq1, Py_ssize_t len_1, const unsigned char* seq2, Py_ssize_t len_2,
+                int max_distance, uint64_t* workspace) noexcept nogil:
+    """
+    Bit-parallel levenshtein distance (Myers, 1999), with the blocks of Hyyrö (2003) for sequences longer than
+    WORD_SIZE, where each column of the score matrix is a handful of operations on ceil(len / WORD_SIZE) words.
+    The shorter sequence is the pattern. If max_distance is not negative the computation stops as soon as the
+    distance is known to be greater than max_distance, and max_distance + 1 is returned.
+
+    Args:
+        seq1: encoded sequence (see abpytools.utils.encoding)
+        len_1: length of seq1
+        seq2: encoded sequence (see abpytools.utils.encoding)
+        len_2: length of seq2
+        max_distance: cutoff, or -1 to compute the distance
+        workspace: zeroed buffer with at least (N_CODES + 2) * ceil(max(len_1, len_2) / WORD_SIZE) elements,
+                   which is zeroed again before returning
 
     Returns:
 
     """
-    cdef Matrix2D_backend dist = init_score_matrix_(seq_1=seq1, seq_2=seq2, indel=1)
-    cdef int rows = dist.n_rows
-    cdef int cols = dist.n_cols
-    cdef int col, row, cost
+    cdef const unsigned char* pattern = seq1
+    cdef const unsigned char* text = seq2
+    cdef Py_ssize_t m = len_1
+    cdef Py_ssize_t n = len_2
+    cdef Py_ssize_t i, j, block, n_blocks
+    cdef uint64_t* peq
+    cdef uint64_t* pv
+    cdef uint64_t* mv
+    cdef uint64_t eq, xv, xh, ph, mh, high_bit
+    cdef uint64_t last_bit
+    cdef int h_in, h_out, score
+
+    if len_1 > len_2:
+        pattern, text, m, n = seq2, seq1, len_2, len_1
+
+    if max_distance >= 0 and n - m > max_distance:
+        return max_distance + 1
+    if m == 0:
+        return n
+
+    n_blocks = (m + WORD_SIZE - 1) // WORD_SIZE
+    # peq[code * n_blocks + block] has the bits of the positions of code in the pattern
+    peq = workspace
+    pv = workspace + N_CODES * n_blocks
+    mv = pv + n_blocks
+
+    for i in range(m):
+        peq[pattern[i] * n_blocks + i // WORD_SIZE] |= (<uint64_t> 1) << (i % WORD_SIZE)
+    for block in range(n_blocks):
+        pv[block] = ~(<uint64_t> 0)
+        mv[block] = 0
+
+    # the score of the last row is read from the bit of the last residue of the pattern
+    last_bit = (<uint64_t> 1) << ((m - 1) % WORD_SIZE)
+    score = m
+
+    for j in range(n):
+        # the first row of the score matrix increases by one in each column
+        h_in = 1
+        for block in range(n_blocks):
+            high_bit = last_bit if block == n_blocks - 1 else (<uint64_t> 1) << (WORD_SIZE - 1)
+            eq = peq[text[j] * n_blocks + block]
+            xv = eq | mv[block]
+            if h_in < 0:
+                eq |= 1
+            xh = (((eq & pv[block]) + pv[block]) ^ pv[block]) | eq
+            ph = mv[block] | ~(xh | pv[block])
+            mh = pv[block] & xh
+
+            h_out = 0
+            if ph & high_bit:
+                h_out = 1
+            elif mh & high_bit:
+                h_out = -1
+
+            ph <<= 1
+            mh <<= 1
+            if h_in < 0:
+                mh |= 1
+            elif h_in > 0:
+                ph |= 1
+
+            pv[block] = mh | ~(xv | ph)
+            mv[block] = ph & xv
+            h_in = h_out
+
+        score += h_in
+
+        # each of the remaining columns can decrease the score by at most one
+        if max_distance >= 0 and score - (n - j - 1) > max_distance:
+            score = max_distance + 1
+            break
+
+    for i in range(m):
+        peq[pattern[i] * n_blocks + i // WORD_SIZE] = 0
+
+    if max_distance >= 0 and score > max_distance:
+        return max_distance + 1
+    return score
+
+
+cdef Py_ssize_t workspace_size(Py_ssize_t max_length) noexcept nogil:
+    return (N_CODES + 2) * ((max_length + WORD_SIZE - 1) // WORD_SIZE + 1)
+
+
+cpdef int levenshtein_bit_parallel_(const unsigned char[:] seq1, const unsigned char[:] seq2,
+                                    int max_distance=-1) except -2:
+    """
+    Bit-parallel levenshtein distance, see myers_
+
+    Args:
+        seq1: encoded sequence (see abpytools.utils.encoding)
+        seq2: encoded sequence (see abpytools.utils.encoding)
+        max_distance: cutoff, or -1 to compute the distance
+
+    Returns:
+        the distance, or max_distance + 1 if it is greater than max_distance
+
+    """
+    cdef Py_ssize_t len_1 = seq1.shape[0]
+    cdef Py_ssize_t len_2 = seq2.shape[0]
+    cdef int result
+
+    if len_1 == 0 or len_2 == 0:
+        result = len_1 + len_2
+        if 0 <= max_distance < result:
+            return max_distance + 1
+        return result
+
+    cdef uint64_t* workspace = <uint64_t*> calloc(workspace_size(max(len_1, len_2)), sizeof(uint64_t))
+    if workspace == NULL:
+        raise MemoryError()
+
+    with nogil:
+        result = myers_(&seq1[0], len_1, &seq2[0], len_2, max_distance, workspace)
+
+    free(workspace)
+
+    return result
+
+
+cdef int get_n_threads(int n_threads) noexcept:
+    if n_threads < 1:
+        return openmp.omp_get_max_threads()
+    return n_threads
+
+
+cdef uint64_t* allocate_workspaces(int n_threads, Py_ssize_t max_length) except NULL:
+    # a zeroed workspace for each thread, see myers_
+    cdef uint64_t* workspaces = <uint64_t*> calloc(n_threads * workspace_size(max_length), sizeof(uint64_t))
+    if workspaces == NULL:
+        raise MemoryError()
+    return workspaces
+
+
+# the offsets are created by abpytools.analysis.distance_metrics.concatenate_sequences
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def levenshtein_one_vs_many_(const unsigned char[:] query, const unsigned char[:] values,
+                             const Py_ssize_t[:] offsets, int n_threads=0, int max_distance=-1):
+    """
+    Levenshtein distances between a sequence and many sequences, which are computed with the bit-parallel
+    algorithm (see myers_) in parallel with OpenMP.
+
+    Args:
+        query: encoded sequence (see abpytools.utils.encoding)
+        values: concatenated encoded sequences
+        offsets: start of each sequence in values followed by the length of values (n_sequences + 1 elements)
+        n_threads: number of OpenMP threads, 0 for the OpenMP default
+        max_distance: cutoff, or -1 to compute the distances
+
+    Returns:
+        numpy.ndarray: int32 with shape (n_sequences,), where the distances greater than max_distance are
+                       max_distance + 1
+
+    """
+    cdef Py_ssize_t n = offsets.shape[0] - 1
+    cdef Py_ssize_t len_1 = query.shape[0]
+    cdef Py_ssize_t max_length = len_1
+    cdef Py_ssize_t i
+    cdef uint64_t* workspaces
+    cdef int num_threads = get_n_threads(n_threads)
+
+    distances = np.zeros(n, dtype=np.int32)
+    cdef int[::1] distances_view = distances
+
+    if n == 0:
+        return distances
+
+    for i in range(n):
+        max_length = max(max_length, offsets[i + 1] - offsets[i])
+
+    workspaces = allocate_workspaces(num_threads, max_length)
+
+    with nogil:
+        for i in prange(n, schedule='dynamic', chunksize=64, num_threads=num_threads):
+            distances_view[i] = myers_(&query[0] if len_1 > 0 else NULL, len_1, &values[offsets[i]],
+                                       offsets[i + 1] - offsets[i], max_distance,
+                                       workspaces + threadid() * workspace_size(max_length))
+
+    free(workspaces)
+
+    return distances
+
+
+# the offsets are created by abpytools.analysis.distance_metrics.concatenate_sequences
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def levenshtein_tile_(const unsigned char[:] values, const Py_ssize_t[:] offsets, Py_ssize_t row_start,
+                      Py_ssize_t row_stop, Py_ssize_t column_start, Py_ssize_t column_stop, int n_threads=0,
+                      int max_distance=-1):
+    """
+    Levenshtein distances between the sequences in [row_start, row_stop) and [column_start, column_stop), which
+    are computed with the bit-parallel algorithm (see myers_) in parallel with OpenMP. The pairs where both
+    sequences are in the rows and in the columns are computed once, and the diagonal is 0.
+
+    Args:
+        values: concatenated encoded sequences
+        offsets: start of each sequence in values followed by the length of values (n_sequences + 1 elements)
+        row_start:
+        row_stop:
+        column_start:
+        column_stop:
+        n_threads: number of OpenMP threads, 0 for the OpenMP default
+        max_distance: cutoff, or -1 to compute the distances
+
+    Returns:
+        numpy.ndarray: int32 with shape (row_stop - row_start, column_stop - column_start), where the distances
+                       greater than max_distance are max_distance + 1
+
+    """
+    cdef Py_ssize_t n = offsets.shape[0] - 1
+    if not (0 <= row_start <= row_stop <= n and 0 <= column_start <= column_stop <= n):
+        raise ValueError("Expected ranges of {} sequences, instead got [{}, {}) and [{}, {})".format(
+            n, row_start, row_stop, column_start, column_stop))
+
+    cdef Py_ssize_t n_rows = row_stop - row_start
+    cdef Py_ssize_t n_columns = column_stop - column_start
+    cdef Py_ssize_t max_length = 0
+    cdef Py_ssize_t k, i, j
+    cdef uint64_t* workspaces
+    cdef int num_threads = get_n_threads(n_threads)
+
+    distances = np.zeros((n_rows, n_columns), dtype=np.int32)
+    cdef int[:, ::1] distances_view = distances
+
+    if n_rows == 0 or n_columns == 0:
+        return distances
+
+    for i in range(n):
+        max_length = max(max_length, offsets[i + 1] - offsets[i])
+
+    workspaces = allocate_workspaces(num_threads, max_length)
+
+    with nogil:
+        for k in prange(n_rows * n_columns, schedule='dynamic', chunksize=64, num_threads=num_threads):
+            i = row_start + k // n_columns
+            j = column_start + k % n_columns
+            # the pairs below the diagonal with a transpose in the tile are copied afterwards
+            if j < i and j >= row_start and i < column_stop:
+                continue
+            if i == j:
+                continue
+            distances_view[i - row_start, j - column_start] = myers_(
+                &values[offsets[i]], offsets[i + 1] - offsets[i], &values[offsets[j]], offsets[j + 1] - offsets[j],
+                max_distance, workspaces + threadid() * workspace_size(max_length))
+
+    free(workspaces)
 
-    for col in range(1, cols):
-        for row in range(1, rows):
-            if seq2[row - 1] == seq1[col - 1]:
-                cost = 0
-            else:
-                cost = 1
-            dist[row, col] = min_C(min_C(dist[row - 1, col] + 1,  # deletion
-                                   dist[row, col - 1] + 1),  # insertion
-                                   dist[row - 1, col - 1] + cost)  # substitution
+    for i in range(max(row_start, column_start), min(row_stop, column_stop)):
+        for j in range(max(row_start, column_start), i):
+            distances_view[i - row_start, j - column_start] = distances_view[j - row_start, i - column_start]
 
-    return dist[rows-1, cols-1]
+    return distances
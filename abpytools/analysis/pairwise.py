@@ -0,0 +1,856 @@
+import numpy as np
+import multiprocessing
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from math import ceil, sqrt
+from numpy.lib.format import open_memmap
+from ..utils.python_config import progressbar
+from .distance_metrics import concatenate_sequences, _check_max_distance
+from .distance_metrics_ import levenshtein_tile_
+
+# metrics of the pairwise distance engine, with the same names and values as the functions in distance_metrics
+AVAILABLE_METRICS = ('cosine_distance', 'cosine_similarity', 'euclidean_distance', 'manhattan_distance',
+                     'hamming_distance')
+
+# number of rows (and columns) of each tile of the distance matrix
+DEFAULT_BLOCK_SIZE = 1024
+
+# minimum number of tiles of each process of the pool, unless the tiles would have less than one row
+TILES_PER_PROCESS = 4
+
+# maximum number of columns of the one-hot encoding of the hamming distance, observations with more
+# (feature, value) combinations are compared one feature at a time
+_MAX_ONE_HOT_SIZE = 1 << 16
+
+
+def condensed_size(n):
+    """
+    Returns the number of distances in the condensed form of a (n, n) distance matrix, i.e. the upper triangle
+    without the diagonal in row-major order (the same layout as scipy.spatial.distance.squareform).
+
+    Args:
+        n (int): number of observations
+
+    Returns:
+        int
+    """
+    return n * (n - 1) // 2
+
+
+def upper_triangle_tiles(n, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Returns the [row_start, row_stop) and [column_start, column_stop) ranges of the tiles in the upper
+    triangle of a (n, n) distance matrix (including the diagonal tiles), which cover all the pairs once.
+
+    Args:
+        n (int): number of observations
+        block_size (int): number of rows and columns of each tile
+
+    Returns:
+        list: (row_start, row_stop, column_start, column_stop) tuples
+    """
+    if block_size < 1:
+        raise ValueError("Expected a positive block size, instead got {}".format(block_size))
+    starts = range(0, n, block_size)
+    return [(i, min(i + block_size, n), j, min(j + block_size, n)) for i in starts for j in starts if j >= i]
+
+
+def parallel_block_size(n, n_processes, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Returns the number of rows and columns of the tiles of a distance matrix that is computed by a process
+    pool, which is at most block_size and small enough that each process has at least TILES_PER_PROCESS tiles.
+
+    Args:
+        n (int): number of observations
+        n_processes (int): number of processes
+        block_size (int): maximum number of rows and columns of each tile
+
+    Returns:
+        int
+    """
+    # the upper triangle of b blocks of rows has b * (b + 1) / 2 tiles
+    n_blocks = ceil((sqrt(8 * TILES_PER_PROCESS * n_processes + 1) - 1) / 2)
+    return max(1, min(block_size, ceil(n / n_blocks)))
+
+
+def condensed_offset(n, i):
+    """
+    Returns the index in the condensed distance matrix of the distance between observation i and i + 1.
+
+    Args:
+        n (int): number of observations
+        i (int or numpy.ndarray): row of the distance matrix
+
+    Returns:
+        int or numpy.ndarray
+    """
+    return n * i - i * (i + 1) // 2
+
+
+class DistanceEngine:
+    """
+    Computes the pairwise distances of a matrix of observations (feature vectors or encoded aligned sequences)
+    in square tiles, where each tile is a handful of BLAS or numpy operations instead of a Python call per pair.
+
+    Only the tiles in the upper triangle of the distance matrix are computed (see DistanceEngine.tiles), the
+    lower triangle is the transpose.
+
+    Examples:
+        >>> from abpytools.analysis.pairwise import DistanceEngine
+        >>> engine = DistanceEngine(features, metric='euclidean_distance')
+        >>> tile = engine.tile(0, 1024, 1024, 2048)
+    """
+
+    def __init__(self, data, metric='cosine_distance'):
+        """
+
+        Args:
+            data (numpy.ndarray): matrix with shape (n_observations, n_features), for the hamming distance the
+                                  features can be of any dtype, i.e. uint8 residue codes of aligned sequences
+            metric (str): one of AVAILABLE_METRICS
+        """
+        if metric not in AVAILABLE_METRICS:
+            raise ValueError("Unknown distance metric {}. Available metrics: {}".format(metric,
+                                                                                     ', '.join(AVAILABLE_METRICS)))
+        data = np.asarray(data)
+        if data.ndim != 2:
+            raise ValueError("Expected a matrix with shape (n_observations, n_features), "
+                             "instead got an array with shape {}".format(data.shape))
+
+        self._metric = metric
+        self._n = len(data)
+
+        if metric == 'hamming_distance':
+            # the values of each feature are replaced by the column of the one-hot encoding of (feature, value),
+            # so that the number of matching values of two observations is the dot product of their one-hot
+            # encodings, which only has a column for the values that occur in each feature
+            self._data = np.empty(data.shape, dtype=np.int64)
+            self._one_hot_size = 0
+            for feature in range(data.shape[1]):
+                values, codes = np.unique(data[:, feature], return_inverse=True)
+                self._data[:, feature] = codes + self._one_hot_size
+                self._one_hot_size += len(values)
+        else:
+            self._data = data.astype(np.float64)
+            self._squared_norms = np.einsum('ij,ij->i', self._data, self._data)
+            self._norms = np.sqrt(self._squared_norms)
+
+    @property
+    def metric(self):
+        return self._metric
+
+    @property
+    def n(self):
+        return self._n
+
+    def tiles(self, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Returns the [row_start, row_stop) and [column_start, column_stop) ranges of the tiles in the upper
+        triangle of the distance matrix (see upper_triangle_tiles).
+
+        Args:
+            block_size (int): number of rows and columns of each tile
+
+        Returns:
+            list: (row_start, row_stop, column_start, column_stop) tuples
+        """
+        return upper_triangle_tiles(self._n, block_size=block_size)
+
+    def tile(self, row_start, row_stop, column_start, column_stop):
+        """
+        Returns the distances between the observations in [row_start, row_stop) and [column_start, column_stop).
+
+        Returns:
+            numpy.ndarray: float64 with shape (row_stop - row_start, column_stop - column_start)
+        """
+        rows = slice(row_start, row_stop)
+        columns = slice(column_start, column_stop)
+
+        if self._metric == 'hamming_distance':
+            distances = self._hamming_tile(rows, columns)
+        elif self._metric == 'manhattan_distance':
+            distances = self._manhattan_tile(rows, columns)
+        elif self._metric == 'euclidean_distance':
+            distances = self._squared_norms[rows, np.newaxis] + self._squared_norms[np.newaxis, columns] - \
+                2 * (self._data[rows] @ self._data[columns].T)
+            distances = np.sqrt(np.maximum(distances, 0, out=distances), out=distances)
+        else:
+            distances = self._cosine_tile(rows, columns)
+            if self._metric == 'cosine_similarity':
+                distances = 1 - distances
+
+        # the diagonal is 0 for all metrics, as in ChainCollection.distance_matrix
+        diagonal = np.arange(max(row_start, column_start), min(row_stop, column_stop))
+        distances[diagonal - row_start, diagonal - column_start] = 0
+        return distances
+
+    def _cosine_tile(self, rows, columns):
+        dot_products = self._data[rows] @ self._data[columns].T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cosine = dot_products / (self._norms[rows, np.newaxis] * self._norms[np.newaxis, columns])
+        angles = np.arccos(np.clip(cosine, -1, 1))
+        # same as cosine_distance, dot products below the double rounding error are considered to be 0
+        angles[dot_products < np.finfo(np.float64).eps] = 0
+        return angles
+
+    def _manhattan_tile(self, rows, columns):
+        x = self._data[rows]
+        y = self._data[columns]
+        distances = np.zeros((len(x), len(y)), dtype=np.float64)
+        difference = np.empty_like(distances)
+        # one feature at a time, which keeps the temporary arrays to the size of the tile
+        for feature in range(x.shape[1]):
+            np.subtract.outer(x[:, feature], y[:, feature], out=difference)
+            distances += np.abs(difference, out=difference)
+        return distances
+
+    def _one_hot(self, rows):
+        codes = self._data[rows]
+        one_hot = np.zeros((len(codes), self._one_hot_size), dtype=np.float32)
+        np.put_along_axis(one_hot, codes, 1, axis=1)
+        return one_hot
+
+    def _hamming_tile(self, rows, columns):
+        n_features = self._data.shape[1]
+        if self._one_hot_size <= _MAX_ONE_HOT_SIZE:
+            # float32 sums of zeros and ones are exact up to 2 ** 24 features
+            matches = self._one_hot(rows) @ self._one_hot(columns).T
+            return n_features - matches.astype(np.float64)
+
+        x = self._data[rows]
+        y = self._data[columns]
+        distances = np.zeros((len(x), len(y)), dtype=np.float64)
+        for feature in range(n_features):
+            distances += x[:, feature, np.newaxis] != y[np.newaxis, :, feature]
+        return distances
+
+    def __repr__(self):
+        return "<DistanceEngine: {} observations, {}>".format(self._n, self._metric)
+
+
+class LevenshteinEngine:
+    """
+    Computes the levenshtein distances of a list of sequences in the same tiles as DistanceEngine, where each tile
+    is computed by a bit-parallel OpenMP kernel that releases the GIL (see distance_metrics_.levenshtein_tile_).
+    With max_distance the kernel stops each pair as soon as its distance is greater than max_distance, which is
+    much faster when most pairs are far apart, e.g. when grouping CDR3s within a few edits into clonotypes.
+
+    Examples:
+        >>> from abpytools.analysis.pairwise import LevenshteinEngine
+        >>> engine = LevenshteinEngine(cdr3_sequences, max_distance=2)
+        >>> tile = engine.tile(0, 1024, 1024, 2048)
+    """
+
+    def __init__(self, data, n_threads=0, max_distance=None):
+        """
+
+        Args:
+            data (list): str or encoded sequences (see abpytools.utils.encoding)
+            n_threads (int): number of OpenMP threads, 0 for the OpenMP default
+            max_distance (int): if not None the distances greater than max_distance are max_distance + 1
+        """
+        self._values, self._offsets = concatenate_sequences(data)
+        self._n = len(self._offsets) - 1
+        self._n_threads = n_threads
+        self._max_distance = _check_max_distance(max_distance)
+
+    @property
+    def metric(self):
+        return 'levenshtein_distance'
+
+    @property
+    def n(self):
+        return self._n
+
+    def tiles(self, block_size=DEFAULT_BLOCK_SIZE):
+        return upper_triangle_tiles(self._n, block_size=block_size)
+
+    def tile(self, row_start, row_stop, column_start, column_stop):
+        """
+        Returns the distances between the sequences in [row_start, row_stop) and [column_start, column_stop).
+
+        Returns:
+            numpy.ndarray: float64 with shape (row_stop - row_start, column_stop - column_start)
+        """
+        return levenshtein_tile_(self._values, self._offsets, row_start, row_stop, column_start, column_stop,
+                                 n_threads=self._n_threads, max_distance=self._max_distance).astype(np.float64)
+
+    def __repr__(self):
+        return "<LevenshteinEngine: {} sequences>".format(self._n)
+
+
+class FunctionDistanceEngine:
+    """
+    Computes the pairwise distances of a list of observations with a function that is called once for each
+    pair, i.e. levenshtein_distance or a user defined metric, in the same tiles as DistanceEngine.
+
+    Examples:
+        >>> from abpytools.analysis.pairwise import FunctionDistanceEngine
+        >>> from abpytools.analysis.distance_metrics import levenshtein_distance
+        >>> engine = FunctionDistanceEngine(sequences, metric=levenshtein_distance)
+    """
+
+    def __init__(self, data, metric):
+        """
+
+        Args:
+            data (list): observations that are passed to the metric
+            metric (callable): function that takes two observations and returns their distance
+        """
+        if not callable(metric):
+            raise ValueError("Expected a function that takes two observations, instead got {}".format(metric))
+        self._data = data
+        self._metric = metric
+        self._n = len(data)
+
+    @property
+    def metric(self):
+        return self._metric
+
+    @property
+    def n(self):
+        return self._n
+
+    def tiles(self, block_size=DEFAULT_BLOCK_SIZE):
+        return upper_triangle_tiles(self._n, block_size=block_size)
+
+    def tile(self, row_start, row_stop, column_start, column_stop):
+        """
+        Returns the distances between the observations in [row_start, row_stop) and [column_start, column_stop).
+
+        Returns:
+            numpy.ndarray: float64 with shape (row_stop - row_start, column_stop - column_start)
+        """
+        distances = np.zeros((row_stop - row_start, column_stop - column_start), dtype=np.float64)
+        for i in range(row_start, row_stop):
+            # the metric is called once for each pair of a diagonal tile, the lower triangle is the transpose
+            for j in range(max(column_start, i + 1), column_stop):
+                distances[i - row_start, j - column_start] = self._metric(self._data[i], self._data[j])
+        if row_start == column_start:
+            distances += distances.T
+        return distances
+
+    def __repr__(self):
+        return "<FunctionDistanceEngine: {} observations, {}>".format(self._n, getattr(self._metric, '__name__',
+                                                                                       self._metric))
+
+
+def _get_engine(data, metric, max_distance=None):
+    if metric == 'levenshtein_distance':
+        return LevenshteinEngine(data, max_distance=max_distance)
+    if max_distance is not None:
+        raise ValueError("max_distance can only be used with the levenshtein_distance metric")
+    if callable(metric):
+        return FunctionDistanceEngine(data, metric=metric)
+    return DistanceEngine(data, metric=metric)
+
+
+def pairwise_distances(data, metric='cosine_distance', condensed=False, block_size=None,
+                       dtype=np.float32, n_processes=1, max_distance=None):
+    """
+    Returns the pairwise distances of a matrix of observations computed with a DistanceEngine, where each pair
+    is computed once. With more than one process the tiles are computed by a process pool (see
+    parallel_pairwise_distances).
+
+    Examples:
+        >>> from abpytools.analysis.pairwise import pairwise_distances
+        >>> distances = pairwise_distances(features, metric='euclidean_distance', condensed=True)
+
+    Args:
+        data (numpy.ndarray): matrix with shape (n_observations, n_features), or a list of observations if
+                              metric is 'levenshtein_distance' or a function
+        metric (str or callable): one of AVAILABLE_METRICS, 'levenshtein_distance' (for a list of sequences), or a
+                                  function that takes two observations
+        condensed (bool): whether to return the condensed distance matrix (see condensed_size) instead of the
+                          square matrix
+        block_size (int): number of rows and columns of each tile, by default DEFAULT_BLOCK_SIZE, or
+                          parallel_block_size with more than one process
+        dtype: dtype of the result
+        n_processes (int): number of processes, None for the number of CPUs
+        max_distance (int): cutoff of the levenshtein distance, the distances greater than max_distance are
+                            max_distance + 1 (see LevenshteinEngine)
+
+    Returns:
+        numpy.ndarray: with shape (n_observations, n_observations), or (n_observations * (n_observations - 1) / 2,)
+                       if condensed is True
+    """
+    if n_processes != 1:
+        return parallel_pairwise_distances(data, metric=metric, condensed=condensed, block_size=block_size,
+                                           dtype=dtype, n_processes=n_processes, max_distance=max_distance)
+
+    engine = _get_engine(data, metric, max_distance=max_distance)
+    distances = _empty_distances(engine.n, condensed, dtype)
+
+    for tile in engine.tiles(block_size=DEFAULT_BLOCK_SIZE if block_size is None else block_size):
+        write_tile(distances, engine, tile, condensed)
+
+    return distances
+
+
+def parallel_pairwise_distances(data, metric='cosine_distance', condensed=False, block_size=None,
+                                dtype=np.float32, n_processes=None, max_distance=None):
+    """
+    Returns the pairwise distances of a matrix of observations, where the tiles in the upper triangle of the
+    distance matrix are dispatched to a fixed size process pool. The arrays of the DistanceEngine and the
+    result are in shared memory (see SharedArrays), so that each process reads the observations and writes its
+    tiles without copying them through a pipe, and only the tile ranges are sent to the workers. By default the
+    tiles are small enough that each process has at least TILES_PER_PROCESS tiles (see parallel_block_size).
+
+    Examples:
+        >>> from abpytools.analysis.pairwise import parallel_pairwise_distances
+        >>> distances = parallel_pairwise_distances(features, metric='euclidean_distance', n_processes=4)
+
+    Args:
+        data (numpy.ndarray): matrix with shape (n_observations, n_features), or a list of observations if
+                              metric is 'levenshtein_distance' or a function
+        metric (str or callable): one of AVAILABLE_METRICS, 'levenshtein_distance' (for a list of sequences), or a
+                                  function that takes two observations (which must be picklable if the
+                                  processes are not forked)
+        condensed (bool): whether to return the condensed distance matrix (see condensed_size) instead of the
+                          square matrix
+        block_size (int): number of rows and columns of each tile, by default DEFAULT_BLOCK_SIZE, or
+                          parallel_block_size with more than one process
+        dtype: dtype of the result
+        n_processes (int): number of processes, None for the number of CPUs
+        max_distance (int): cutoff of the levenshtein distance, the distances greater than max_distance are
+                            max_distance + 1 (see LevenshteinEngine)
+
+    Returns:
+        numpy.ndarray: with shape (n_observations, n_observations), or (n_observations * (n_observations - 1) / 2,)
+                       if condensed is True
+    """
+    engine = _get_engine(data, metric, max_distance=max_distance)
+    shape = (condensed_size(engine.n),) if condensed else (engine.n, engine.n)
+    n_processes = _get_n_processes(n_processes)
+    if block_size is None:
+        block_size = parallel_block_size(engine.n, n_processes)
+
+    with SharedArrays() as shared_arrays:
+        distances, output_spec = shared_arrays.allocate(shape, dtype)
+        for _ in run_parallel_tiles(engine, output_spec, engine.tiles(block_size=block_size), condensed,
+                                    n_processes=n_processes):
+            pass
+        # the result is copied out of the shared array, which is released
+        result = np.array(distances)
+        del distances
+
+    return result
+
+
+def memmap_pairwise_distances(data, path, metric='cosine_distance', condensed=False, block_size=None,
+                              dtype=np.float32, n_processes=1, checkpoint_path=None, show_progressbar=False,
+                              max_distance=None):
+    """
+    Writes the pairwise distances of a matrix of observations to a .npy file, one tile at a time, so that the
+    distance matrix never has to fit in memory. Each completed tile is appended to a checkpoint file after it is
+    flushed to disk, and if the checkpoint file already exists the tiles it contains are not computed again,
+    so that an interrupted computation resumes from the last completed tile. The checkpoint is only used with
+    the same data and parameters, and it is removed once all the tiles are written.
+
+    Examples:
+        >>> from abpytools.analysis.pairwise import memmap_pairwise_distances
+        >>> distances = memmap_pairwise_distances(features, 'distances.npy', metric='euclidean_distance',
+        ...                                       condensed=True, n_processes=8, show_progressbar=True)
+
+    Args:
+        data (numpy.ndarray): matrix with shape (n_observations, n_features), or a list of observations if
+                              metric is 'levenshtein_distance' or a function
+        path (str): path to the .npy file
+        metric (str or callable): one of AVAILABLE_METRICS, 'levenshtein_distance' (for a list of sequences), or a
+                                  function that takes two observations
+        condensed (bool): whether to write the condensed distance matrix (see condensed_size) instead of the
+                          square matrix
+        block_size (int): number of rows and columns of each tile, by default DEFAULT_BLOCK_SIZE, or
+                          parallel_block_size with more than one process
+        dtype: dtype of the result
+        n_processes (int): number of processes, None for the number of CPUs
+        checkpoint_path (str): path to the checkpoint file, by default path + '.checkpoint'
+        show_progressbar (bool):
+        max_distance (int): cutoff of the levenshtein distance, the distances greater than max_distance are
+                            max_distance + 1 (see LevenshteinEngine)
+
+    Returns:
+        numpy.memmap: read only, with shape (n_observations, n_observations), or
+                      (n_observations * (n_observations - 1) / 2,) if condensed is True
+    """
+    engine = _get_engine(data, metric, max_distance=max_distance)
+    dtype = np.dtype(dtype)
+    shape = (condensed_size(engine.n),) if condensed else (engine.n, engine.n)
+    if block_size is None:
+        block_size = DEFAULT_BLOCK_SIZE if n_processes == 1 else parallel_block_size(engine.n,
+                                                                                     _get_n_processes(n_processes))
+    tiles = engine.tiles(block_size=block_size)
+
+    if checkpoint_path is None:
+        checkpoint_path = path + '.checkpoint'
+
+    # the checkpoint can only be used to resume the same distance matrix of the same data
+    header = {"n": engine.n, "metric": getattr(metric, '__name__', metric), "condensed": condensed,
+              "block_size": block_size, "dtype": dtype.str, "max_distance": max_distance,
+              "fingerprint": engine_fingerprint(engine)}
+
+    completed_tiles = read_tile_checkpoint(checkpoint_path, header)
+
+    if len(completed_tiles) > 0:
+        if not os.path.isfile(path):
+            raise ValueError("Checkpoint file {} has completed tiles, but {} does not exist, "
+                             "remove the checkpoint to start from the beginning".format(checkpoint_path, path))
+        distances = open_memmap(path, mode='r+')
+        if distances.shape != shape or distances.dtype != dtype:
+            raise ValueError("Expected {} to have shape {} and dtype {}, instead got {} and {}".format(
+                path, shape, dtype, distances.shape, distances.dtype))
+    else:
+        distances = open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+    tile_index = {tile: i for i, tile in enumerate(tiles)}
+    remaining_tiles = [tile for i, tile in enumerate(tiles) if i not in completed_tiles]
+
+    if n_processes == 1:
+        tile_iterator = _memmap_tiles(distances, engine, remaining_tiles, condensed)
+    else:
+        output_spec = ('memmap', path, shape, dtype.str, distances.offset)
+        tile_iterator = run_parallel_tiles(engine, output_spec, remaining_tiles, condensed, n_processes=n_processes)
+
+    if show_progressbar:
+        tile_iterator = progressbar(tile_iterator, total=len(tiles), initial=len(tiles) - len(remaining_tiles),
+                                    unit='tile')
+
+    with open(checkpoint_path, 'a') as checkpoint:
+        for tile in tile_iterator:
+            checkpoint.write(json.dumps({"tile": tile_index[tile]}) + '\n')
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+
+    del distances
+
+    # all the tiles are written, a later call with the same path starts from the beginning
+    os.remove(checkpoint_path)
+
+    return np.load(path, mmap_mode='r')
+
+
+def engine_fingerprint(engine):
+    """
+    Returns a hash of the data of a distance engine, which identifies the data of a checkpoint file.
+
+    Args:
+        engine: DistanceEngine, LevenshteinEngine or FunctionDistanceEngine
+
+    Returns:
+        str: hexadecimal SHA-1 digest
+    """
+    fingerprint = hashlib.sha1()
+    for name, value in sorted(vars(engine).items()):
+        if isinstance(value, np.ndarray):
+            values = [value]
+        elif isinstance(value, (list, tuple)):
+            values = value
+        else:
+            # the metric, the number of observations and the number of threads
+            continue
+        fingerprint.update(name.encode())
+        for x in values:
+            if isinstance(x, np.ndarray):
+                fingerprint.update('{}{}'.format(x.dtype.str, x.shape).encode())
+                fingerprint.update(np.ascontiguousarray(x).data)
+            else:
+                fingerprint.update(repr(x).encode())
+            fingerprint.update(b'\0')
+    return fingerprint.hexdigest()
+
+
+def read_tile_checkpoint(checkpoint_path, header):
+    """
+    Reads the indices of the tiles stored in a checkpoint file written by memmap_pairwise_distances.
+    If the file does not exist it is created with header. A line that was only partially written
+    (i.e. the process was killed while writing it) is removed from the file.
+
+    Args:
+        checkpoint_path (str):
+        header (dict): parameters of the distance matrix, which must match the ones stored in the checkpoint
+
+    Returns:
+        set: indices of the completed tiles in DistanceEngine.tiles
+
+    """
+    if not os.path.isfile(checkpoint_path):
+        with open(checkpoint_path, 'w') as f:
+            f.write(json.dumps(header) + '\n')
+        return set()
+
+    completed_tiles = set()
+
+    with open(checkpoint_path, 'rb+') as f:
+        line = f.readline()
+        try:
+            checkpoint_header = json.loads(line)
+        except ValueError:
+            raise ValueError("{} is not a valid checkpoint file".format(checkpoint_path))
+        if checkpoint_header != header:
+            raise ValueError("Checkpoint file {} was created with different parameters ({}), "
+                             "remove it to start from the beginning".format(checkpoint_path, checkpoint_header))
+
+        end = f.tell()
+        for line in iter(f.readline, b''):
+            try:
+                tile = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b'\n'):
+                break
+            completed_tiles.add(tile['tile'])
+            end = f.tell()
+
+        f.truncate(end)
+
+    return completed_tiles
+
+
+def _memmap_tiles(distances, engine, tiles, condensed):
+    for tile in tiles:
+        write_tile(distances, engine, tile, condensed)
+        distances.flush()
+        yield tile
+
+
+def run_parallel_tiles(engine, output_spec, tiles, condensed, n_processes=None):
+    """
+    Computes the tiles of a distance matrix with a fixed size process pool, where each process writes its tiles
+    to the output, and yields the tiles in the order in which they are completed.
+
+    Args:
+        engine: DistanceEngine, LevenshteinEngine or FunctionDistanceEngine, the numpy arrays of the engine are
+                copied to shared arrays (see SharedArrays) and the other attributes are passed to the workers
+        output_spec (tuple): ('shared_memory', name, shape, dtype) of a multiprocessing.shared_memory block, or
+                             ('memmap', filename, shape, dtype, offset) of a numpy.memmap (see SharedArrays)
+        tiles (list): (row_start, row_stop, column_start, column_stop) tuples
+        condensed (bool): whether the output is a condensed distance matrix
+        n_processes (int): number of processes, None for the number of CPUs
+
+    Returns:
+        generator: (row_start, row_stop, column_start, column_stop) tuples
+    """
+    n_processes = _get_n_processes(n_processes)
+    if len(tiles) == 0:
+        return
+
+    with SharedArrays() as shared_arrays:
+        engine_spec = _share_engine(engine, shared_arrays)
+        with multiprocessing.get_context().Pool(processes=min(n_processes, len(tiles)),
+                                                initializer=_initialise_worker,
+                                                initargs=(engine_spec, output_spec, condensed)) as pool:
+            # one tile per task, the tiles are large enough that the dispatch overhead is negligible
+            for tile in pool.imap_unordered(_compute_tile, tiles, chunksize=1):
+                yield tile
+
+
+def write_tile(distances, engine, tile, condensed):
+    """
+    Computes a tile with a distance engine and writes it to a square or condensed distance matrix.
+
+    Args:
+        distances (numpy.ndarray): square or condensed distance matrix
+        engine: DistanceEngine, LevenshteinEngine or FunctionDistanceEngine
+        tile (tuple): (row_start, row_stop, column_start, column_stop)
+        condensed (bool): whether distances is a condensed distance matrix
+
+    Returns:
+        None
+    """
+    row_start, row_stop, column_start, column_stop = tile
+    values = engine.tile(row_start, row_stop, column_start, column_stop)
+    if condensed:
+        write_condensed_tile(distances, engine.n, values, row_start, column_start)
+    else:
+        distances[row_start:row_stop, column_start:column_stop] = values
+        distances[column_start:column_stop, row_start:row_stop] = values.T
+
+
+def _empty_distances(n, condensed, dtype):
+    if condensed:
+        return np.empty(condensed_size(n), dtype=dtype)
+    return np.empty((n, n), dtype=dtype)
+
+
+def _get_n_processes(n_processes):
+    if n_processes is None:
+        return os.cpu_count() or 1
+    if n_processes < 1:
+        raise ValueError("Expected a positive number of processes, instead got {}".format(n_processes))
+    return n_processes
+
+
+def _get_shared_memory():
+    # multiprocessing.shared_memory is only available from python 3.8
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        return None
+    return shared_memory
+
+
+class SharedArrays:
+    """
+    Allocates the arrays that are shared with the processes of a pool, which are multiprocessing.shared_memory
+    blocks, or numpy memmaps of files in a temporary directory before python 3.8. The arrays are released when
+    the context manager exits.
+
+    Examples:
+        >>> with SharedArrays() as shared_arrays:
+        ...     distances, spec = shared_arrays.allocate((n, n), np.float32)
+    """
+
+    def __init__(self):
+        self._shared_memory = _get_shared_memory()
+        self._blocks = []
+        self._directory = None
+
+    def allocate(self, shape, dtype):
+        """
+        Allocates a zeroed array.
+
+        Args:
+            shape (tuple):
+            dtype:
+
+        Returns:
+            tuple: the array and its spec, which is opened in the workers with open_shared_array
+        """
+        dtype = np.dtype(dtype)
+        shape = tuple(shape)
+        if self._shared_memory is not None:
+            block = self._shared_memory.SharedMemory(create=True,
+                                                     size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+            self._blocks.append(block)
+            array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            array[...] = 0
+            return array, ('shared_memory', block.name, shape, dtype.str)
+
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix='abpytools_')
+        filename = os.path.join(self._directory, '{}.npy'.format(len(os.listdir(self._directory))))
+        array = open_memmap(filename, mode='w+', dtype=dtype, shape=shape)
+        return array, ('memmap', filename, shape, dtype.str, array.offset)
+
+    def share(self, array):
+        """
+        Copies an array to a new shared array.
+
+        Returns:
+            tuple: spec of the shared array
+        """
+        shared_array, spec = self.allocate(array.shape, array.dtype)
+        shared_array[...] = array
+        return spec
+
+    def release(self):
+        for block in self._blocks:
+            try:
+                block.close()
+            except BufferError:
+                # a view of the block is still referenced, i.e. while an exception is raised
+                pass
+            block.unlink()
+        self._blocks = []
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def open_shared_array(spec):
+    """
+    Opens an array allocated by SharedArrays, or a numpy memmap, in another process.
+
+    Args:
+        spec (tuple): ('shared_memory', name, shape, dtype) or ('memmap', filename, shape, dtype, offset)
+
+    Returns:
+        tuple: the array and the shared memory block that must be kept open while the array is used (None for
+               a numpy memmap)
+    """
+    if spec[0] == 'shared_memory':
+        _, name, shape, dtype = spec
+        block = _get_shared_memory().SharedMemory(name=name)
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf), block
+    _, filename, shape, dtype, offset = spec
+    return np.memmap(filename, dtype=dtype, mode='r+', shape=shape, offset=offset), None
+
+
+def _share_engine(engine, shared_arrays):
+    # the numpy arrays of the engine are copied to shared arrays, the workers rebuild the engine with views
+    attributes = {}
+    arrays = {}
+    for name, value in vars(engine).items():
+        if isinstance(value, np.ndarray):
+            arrays[name] = shared_arrays.share(value)
+        else:
+            attributes[name] = value
+    return type(engine), attributes, arrays
+
+
+# state of each process of the pool, set by _initialise_worker
+_worker = {}
+
+
+def _initialise_worker(engine_spec, output_spec, condensed):
+    engine_class, attributes, arrays = engine_spec
+    engine = engine_class.__new__(engine_class)
+    engine.__dict__.update(attributes)
+    if isinstance(engine, LevenshteinEngine):
+        # the processes of the pool already use all the CPUs
+        engine._n_threads = 1
+
+    blocks = []
+    for name, spec in arrays.items():
+        array, block = open_shared_array(spec)
+        blocks.append(block)
+        setattr(engine, name, array)
+
+    distances, block = open_shared_array(output_spec)
+    blocks.append(block)
+
+    # the blocks are kept open for the lifetime of the process
+    _worker.update(engine=engine, distances=distances, condensed=condensed, blocks=blocks)
+
+
+def _compute_tile(tile):
+    distances = _worker['distances']
+    write_tile(distances, _worker['engine'], tile, _worker['condensed'])
+    # the tile is on disk before it is recorded in the checkpoint (see memmap_pairwise_distances)
+    if isinstance(distances, np.memmap):
+        distances.flush()
+    return tile
+
+
+def write_condensed_tile(distances, n, tile, row_start, column_start):
+    """
+    Writes the distances of a tile in the upper triangle of the distance matrix to the condensed distance
+    matrix, the distances on or below the diagonal are ignored.
+
+    Args:
+        distances (numpy.ndarray): condensed distance matrix, with shape (condensed_size(n),)
+        n (int): number of observations
+        tile (numpy.ndarray): distances of rows [row_start, row_start + tile.shape[0]) to columns
+                              [column_start, column_start + tile.shape[1])
+        row_start (int):
+        column_start (int):
+
+    Returns:
+        None
+    """
+    for k, row in enumerate(range(row_start, row_start + tile.shape[0])):
+        # the columns after the diagonal, which are contiguous in the condensed matrix
+        first_column = max(column_start, row + 1)
+        last_column = column_start + tile.shape[1]
+        if first_column < last_column:
+            start = condensed_offset(n, row) + first_column - row - 1
+            distances[start:start + last_column - first_column] = tile[k, first_column - column_start:]
@@ -1,18 +1,27 @@
-import re
 import numpy as np
-from ..utils import DataLoader, Download, NumberingException
-import pandas as pd
-from .helper_functions import numbering_table_sequences, numbering_table_region, numbering_table_multiindex
+import asyncio
+from copy import deepcopy
+from functools import partial
+from ..utils import (NumberingException, AsyncDownload, get_reference_bundle, get_reference_data,
+                     lazy_import)
+from ..utils.encoding import AMINO_ACIDS, encode_sequence, residue_counts, residue_table_from_ascii
+from .properties import PI_GRID, get_pka_values
+from .helper_functions import numbering_table_region, get_numbering_table_layout, numbering_position_codes
+from .numbering import (get_numbering_backend, get_async_numbering_backend, is_cached_numbering_backend,
+                        get_numbering_cache)
 from . import Cache
 from .flags import *
 
+pd = lazy_import('pandas')
+
 
 class Chain:
     """The Chain object represent a single chain variable fragment (scFv) antibody.
 
     A scFv can be part of either the heavy or light chain of an antibody.
-    The nature of the chain is determined by querying the sequence
-    to the Abnum server, and is implemented with the Chain.ab_numbering() method.
+    The nature of the chain is determined by numbering the sequence, either by querying
+    the Abnum server or with the local numbering engine, and is implemented with the
+    Chain.ab_numbering() method.
 
     Attributes:
         numbering (list): the name of each position occupied by amino acids in sequence
@@ -42,8 +51,10 @@ class Chain:
         self._raw_sequence = sequence.upper()
         self._sequence = self._raw_sequence.replace('-', '')
         self._aligned_sequence = None
+        self._encoded_sequence = None
         self._name = name
         self._chain = None
+        self._numbering_codes = None
         self.numbering = None
         self.hydrophobicity_matrix = None
         self.mw = None
@@ -56,22 +67,24 @@ class Chain:
         self._cache = Cache(max_cache_size=10)
 
     @classmethod
-    def load_from_string(cls, sequence, name='Chain1', numbering_scheme=NUMBERING_FLAGS.CHOTHIA):
+    def load_from_string(cls, sequence, name='Chain1', numbering_scheme=NUMBERING_FLAGS.CHOTHIA,
+                         server=OPTION_FLAGS.ABYSIS):
         """
         Returns an instantiated Chain object from a sequence
         Args:
             sequence:
             name:
             numbering_scheme:
+            server:
 
         Returns:
 
         """
         new_chain = cls(sequence=sequence, name=name, numbering_scheme=numbering_scheme)
-        new_chain.load()
+        new_chain.load(server=server)
         return new_chain
 
-    def load(self):
+    def load(self, server=OPTION_FLAGS.ABYSIS):
         """
         Generates all the data:
         - Chain Numbering
@@ -81,15 +94,16 @@ class Chain:
 
         All the data is then stored in its respective attributes
 
+        :param server: name of the numbering backend (see OPTION_FLAGS.AVAILABLE_SERVERS)
         :return:
 
         """
 
         if self._loading_status in [NUMBERING_FLAGS.FAILED, NUMBERING_FLAGS.NOT_LOADED]:
             try:
-                self.numbering = self.ab_numbering()
+                self.numbering = self.ab_numbering(server=server)
                 self._loading_status = NUMBERING_FLAGS.LOADED
-                self.load()
+                self.load(server=server)
 
             except ValueError:
                 self._loading_status = NUMBERING_FLAGS.FAILED
@@ -107,6 +121,60 @@ class Chain:
             # this should never happen...
             raise ValueError("Unknown loading status")  # pragma: no cover
 
+    async def aload(self, server=OPTION_FLAGS.ABYSIS, client=None, **kwargs):
+        """
+        asyncio version of Chain.load, where the sequence is numbered with the asyncio implementation
+        of the numbering backend (backends without one are run in a separate thread).
+
+        :param server: name of the numbering backend (see OPTION_FLAGS.AVAILABLE_SERVERS)
+        :param client: AsyncDownload object used to query the server, if None a new client is created
+        :param kwargs: keyword arguments passed on to the numbering backend
+        :return:
+
+        """
+
+        if client is None:
+            async with AsyncDownload() as client:
+                return await self.aload(server=server, client=client, **kwargs)
+
+        if self._loading_status in [NUMBERING_FLAGS.FAILED, NUMBERING_FLAGS.NOT_LOADED]:
+            try:
+                numbering = await aget_ab_numbering(self._sequence, server, self._numbering_scheme,
+                                                    client=client, **kwargs)
+                self.numbering = numbering
+                self._chain = self.determine_chain_type(numbering)
+                self._loading_status = NUMBERING_FLAGS.LOADED
+                self.load(server=server)
+
+            except ValueError:
+                self._loading_status = NUMBERING_FLAGS.FAILED
+
+            except NumberingException:
+                self._loading_status = NUMBERING_FLAGS.UNNUMBERED
+
+    def _load_from_chain(self, other):
+        """
+        Copies the numbering and the data derived from it from a Chain object with the same sequence
+        and numbering scheme, instead of numbering the sequence again.
+
+        :param other: Chain object that has already been loaded
+        :return:
+        """
+
+        if other.sequence != self._sequence or other.numbering_scheme != self._numbering_scheme:
+            raise ValueError("Can only load data from a Chain object with the same sequence and numbering scheme")
+
+        self._loading_status = other.status
+        self._chain = other.chain
+        self.numbering = list(other.numbering) if other.numbering is not None else None
+
+        if self._loading_status == NUMBERING_FLAGS.LOADED:
+            self.hydrophobicity_matrix = other.hydrophobicity_matrix.copy()
+            self.mw = other.mw
+            self.pI = other.pI
+            self.cdr = deepcopy(other.cdr)
+            self._cache.update('cdrs', self.cdr)
+
     @staticmethod
     def determine_chain_type(numbering):
         if numbering[0][0] == 'H':
@@ -123,6 +191,11 @@ class Chain:
         """
         Return list
 
+        Args:
+            server (str): name of the numbering backend, i.e. OPTION_FLAGS.ABYSIS to query the abnum server
+                          or OPTION_FLAGS.LOCAL to number the sequence in-process
+            **kwargs: keyword arguments passed on to the numbering backend
+
         Returns:
             list:
         """
@@ -150,20 +223,19 @@ class Chain:
                                     NUMBERING_FLAGS.FAILED]:
             self.numbering = self.ab_numbering()
 
-        whole_sequence_dict, whole_sequence = numbering_table_sequences(region=region,
-                                                                        numbering_scheme=self._numbering_scheme,
-                                                                        chain=self._chain)
-
         # now that all the prep has been done we can extract the position from each amino acid
         # according to the numbering scheme
-        data = np.empty((len(whole_sequence)), dtype=str)
-        for i, position in enumerate(whole_sequence):
-            if position in self.numbering:
-                data[i] = self._sequence[self.numbering.index(position)]
-            else:
-                # if there is no amino acid in the sequence that corresponds to position i we just replace it by
-                # the replacement value, which is by default '-'
-                data[i] = replacement
+        # if there is no amino acid in the sequence that corresponds to a position we just replace it by
+        # the replacement value, which is by default '-'
+        numbering_codes = self.numbering_codes
+        numbered = numbering_codes >= 0
+        positions = np.full(len(get_reference_bundle().positions(self._numbering_scheme, self._chain)),
+                            replacement, dtype='<U1')
+        positions[numbering_codes[numbered]] = np.array(list(self._sequence[:len(numbering_codes)]),
+                                                        dtype='<U1')[numbered]
+
+        layout = get_numbering_table_layout(region, self._numbering_scheme, self._chain)
+        data = positions[layout.columns]
 
         self._aligned_sequence = data
 
@@ -173,16 +245,8 @@ class Chain:
         else:
 
             # return the data as a pandas.DataFrame -> it's slower but looks nicer and makes it easier to get
-            # the data of interest
-
-            multi_index = numbering_table_multiindex(region=region,
-                                                     whole_sequence_dict=whole_sequence_dict)
-
-            # create the DataFrame and assign the columns and index names
-            data = pd.DataFrame(data=data).T
-            data.columns = multi_index
-            data.index = [self._name]
-            return data
+            # the data of interest, the columns (pandas.MultiIndex) are cached in the layout
+            return pd.DataFrame(data=data.reshape(1, -1), columns=layout.multi_index, index=[self._name])
 
     def ab_hydrophobicity_matrix(self, hydrophobicity_scores=HYDROPHOBICITY_FLAGS.EW):
 
@@ -199,22 +263,19 @@ class Chain:
         if self._chain == 'NA':
             raise ValueError("Could not determine chain type")
 
-        data_loader = DataLoader(data_type='NumberingSchemes',
-                                 data=[self._numbering_scheme, self._chain])
-        whole_sequence_dict = data_loader.get_data()
+        bundle = get_reference_bundle()
 
-        # whole_sequence is a list with all the amino acid positions in the selected numbering scheme
-        whole_sequence = whole_sequence_dict
+        # the number of amino acid positions in the selected numbering scheme
+        n_positions = len(bundle.positions(self._numbering_scheme, self._chain))
 
-        # get the dictionary with the hydrophobicity scores
-        data_loader = DataLoader(data_type='AminoAcidProperties',
-                                 data=['hydrophobicity', hydrophobicity_scores + 'Hydrophobicity'])
-        aa_hydrophobicity_scores = data_loader.get_data()
+        # get the hydrophobicity scores indexed by residue code
+        aa_hydrophobicity_scores = residue_table_from_ascii(
+            bundle.amino_acid_table('hydrophobicity', hydrophobicity_scores + 'Hydrophobicity'))
 
-        return calculate_hydrophobicity_matrix(whole_sequence=whole_sequence,
-                                               numbering=self.numbering,
+        return calculate_hydrophobicity_matrix(numbering_codes=self.numbering_codes,
+                                               n_positions=n_positions,
                                                aa_hydrophobicity_scores=aa_hydrophobicity_scores,
-                                               sequence=self._sequence)
+                                               sequence=self.encoded_sequence)
 
     def ab_regions(self):
 
@@ -232,14 +293,9 @@ class Chain:
             if self.numbering == 'NA':
                 raise ValueError("Cannot return CDR positions without the antibody numbering information")
 
-            data_loader = DataLoader(data_type='CDR_positions', data=[self._numbering_scheme, self._chain])
-            cdr_positions = data_loader.get_data()
+            region_slices = get_reference_bundle().region_slices(self._numbering_scheme, self._chain)
 
-            data_loader = DataLoader(data_type='Framework_positions', data=[self._numbering_scheme, self._chain])
-            framework_position = data_loader.get_data()
-
-            cdrs = calculate_cdr(numbering=self.numbering, cdr_positions=cdr_positions,
-                                 framework_positions=framework_position)
+            cdrs = calculate_cdr(numbering_codes=self.numbering_codes, region_slices=region_slices)
 
             self._cache.update('cdrs', cdrs)
 
@@ -247,13 +303,11 @@ class Chain:
 
     def ab_molecular_weight(self, monoisotopic=False):
 
+        # the shared read-only view, DataLoader.get_data returns a copy of the table on every call
         if monoisotopic:
-            data_loader = DataLoader(data_type='AminoAcidProperties',
-                                     data=['MolecularWeight', 'average'])
+            mw_dict = get_reference_data('AminoAcidProperties')['MolecularWeight']['average']
         else:
-            data_loader = DataLoader(data_type='AminoAcidProperties',
-                                     data=['MolecularWeight', 'monoisotopic'])
-        mw_dict = data_loader.get_data()
+            mw_dict = get_reference_data('AminoAcidProperties')['MolecularWeight']['monoisotopic']
 
         return calculate_mw(self._sequence, mw_dict)
 
@@ -264,26 +318,25 @@ class Chain:
             "Available databases: {}".format(pi_database, ' ,'.join(
                 OPTION_FLAGS.AVAILABLE_PI_VALUES))
 
-        data_loader = DataLoader(data_type='AminoAcidProperties',
-                                 data=['pI', pi_database])
-        pi_data = data_loader.get_data()
+        pi_data = get_pka_values(pi_database)
 
-        return calculate_pi(sequence=self._sequence, pi_data=pi_data)
+        return calculate_pi(sequence=self.encoded_sequence, pi_data=pi_data)
 
     def ab_ec(self, extinction_coefficient_database='Standard', reduced=False, normalise=False, **kwargs):
 
         if reduced:
             extinction_coefficient_database += '_reduced'
 
-        data_loader = DataLoader(data_type='AminoAcidProperties', data=['ExtinctionCoefficient',
-                                                                        extinction_coefficient_database])
-
-        ec_data = data_loader.get_data()
+        ec_tables = get_reference_data('AminoAcidProperties')['ExtinctionCoefficient']
+        if extinction_coefficient_database not in ec_tables:
+            raise ValueError("Got {}, but only {} are available".format(extinction_coefficient_database,
+                                                                        ', '.join(ec_tables)))
+        ec_data = ec_tables[extinction_coefficient_database]
 
         if normalise:
-            return calculate_ec(sequence=self._sequence, ec_data=ec_data) / self.ab_molecular_weight(**kwargs)
+            return calculate_ec(sequence=self.encoded_sequence, ec_data=ec_data) / self.ab_molecular_weight(**kwargs)
         else:
-            return calculate_ec(sequence=self._sequence, ec_data=ec_data)
+            return calculate_ec(sequence=self.encoded_sequence, ec_data=ec_data)
 
     def ab_format(self):
         return {"name": self._name, "sequence": self._sequence, "numbering": self.numbering, "chain": self._chain,
@@ -306,9 +359,7 @@ class Chain:
             "Available databases: {}".format(pka_database,
                                              ' ,'.join(OPTION_FLAGS.AVAILABLE_PI_VALUES))
 
-        data_loader = DataLoader(data_type='AminoAcidProperties',
-                                 data=['pI', pka_database])
-        pka_data = data_loader.get_data()
+        pka_data = get_pka_values(pka_database)
 
         if align:
             # get the first (and only) row
@@ -325,16 +376,44 @@ class Chain:
             "Available databases: {}".format(pka_database,
                                              ' ,'.join(OPTION_FLAGS.AVAILABLE_PI_VALUES))
 
-        data_loader = DataLoader(data_type='AminoAcidProperties',
-                                 data=['pI', pka_database])
-        pka_data = data_loader.get_data()
+        pka_data = get_pka_values(pka_database)
 
-        return calculate_charge(sequence=self._sequence, ph=ph, pka_values=pka_data)
+        return calculate_charge(sequence=self.encoded_sequence, ph=ph, pka_values=pka_data)
 
     @property
     def chain(self):
         return self._chain
 
+    @property
+    def numbering(self):
+        return self._numbering
+
+    @numbering.setter
+    def numbering(self, numbering):
+        self._numbering = numbering
+        self._numbering_codes = None
+
+    @property
+    def numbering_codes(self):
+        """
+        The numbering as an int16 array with the column of each position in the numbering scheme
+        (see ReferenceBundle.positions), -1 for positions that are not in the numbering scheme.
+        The codes are computed once, and are used to build the numbering table, hydrophobicity matrix and
+        regions with array operations instead of searching the numbering list.
+
+        Returns:
+            numpy.ndarray
+
+        """
+        if self._numbering is None:
+            return None
+        key = (self._numbering_scheme, self._chain)
+        if self._numbering_codes is None or self._numbering_codes[0] != key:
+            numbering_codes = numbering_position_codes(self._numbering, self._numbering_scheme, self._chain)
+            numbering_codes.setflags(write=False)
+            self._numbering_codes = (key, numbering_codes)
+        return self._numbering_codes[1]
+
     @property
     def name(self):
         return self._name
@@ -346,6 +425,21 @@ class Chain:
     def sequence(self):
         return self._sequence
 
+    @property
+    def encoded_sequence(self):
+        """
+        The sequence in the canonical uint8 residue encoding (see abpytools.utils.encoding), which is computed once
+        and shared by the composition, charge and distance calculations.
+
+        Returns:
+            numpy.ndarray
+
+        """
+        if self._encoded_sequence is None:
+            self._encoded_sequence = encode_sequence(self._sequence)
+            self._encoded_sequence.setflags(write=False)
+        return self._encoded_sequence
+
     @property
     def aligned_sequence(self):
         if self._aligned_sequence is None:
@@ -372,77 +466,108 @@ class Chain:
         return len(self.sequence)
 
 
-def get_ab_numbering(sequence, server, numbering_scheme, timeout=30):
+def get_ab_numbering(sequence, server, numbering_scheme, **kwargs):
     """
+    Returns the numbering of sequence using the numbering backend registered as server
+    (see abpytools.core.numbering).
+    The results of the remote backends are stored in the persistent numbering cache, which is looked up
+    before querying the backend.
 
     :rtype: list
     """
-    # check which server to use to get numbering
-    if server == OPTION_FLAGS.ABYSIS:
-        # find out which numbering scheme to use
-        if numbering_scheme == NUMBERING_FLAGS.CHOTHIA:
-            scheme = '-c'
-        elif numbering_scheme in (NUMBERING_FLAGS.CHOTHIA_EXT, NUMBERING_FLAGS.MARTIN):
-            scheme = '-a'
-        elif numbering_scheme == NUMBERING_FLAGS.KABAT:
-            scheme = '-k'
-        else:
-            raise ValueError("{} numbering scheme is unknown.".format(numbering_scheme.capitalize()))
+    backend = get_numbering_backend(server)
+
+    cache = get_numbering_cache() if is_cached_numbering_backend(server) else None
+
+    if cache is not None:
+        entry = cache.get(sequence, numbering_scheme, server)
+        if entry is not None:
+            return entry[0]
+
+    numbering = backend(sequence, numbering_scheme, **kwargs)
+
+    if cache is not None:
+        cache.set(sequence, numbering_scheme, server, numbering, Chain.determine_chain_type(numbering))
 
-        # prepare the url string to query server
-        url = f"http://www.bioinf.org.uk/abs/abnum/abnum.cgi?plain=1&aaseq={sequence}&scheme={scheme}"
-        # use the Download class from utils to get output
-        numbering_table = Download(url, verbose=False, timeout=timeout)
-        try:
-            numbering_table.download()
-        except ValueError:
-            raise ValueError("Check the internet connection.")
+    return numbering
+
+
+async def aget_ab_numbering(sequence, server, numbering_scheme, client, **kwargs):
+    """
+    asyncio version of get_ab_numbering, which queries the server with client (an AsyncDownload object).
 
-        # check whether the server returned an error
-        if numbering_table.html.replace("\n", '') == 'Warning: Unable to number sequence' or len(
-                numbering_table.html.replace("\n", '')) == 0:
-            raise NumberingException("Unable to number sequence")
+    :rtype: list
+    """
+    backend = get_async_numbering_backend(server)
 
-        # parse the results
-        parsed_numbering_table = re.findall("[\S| ]+", numbering_table.html)
+    cache = get_numbering_cache() if is_cached_numbering_backend(server) else None
 
-        # get the numbering from the parsed table
-        numbering = [x[:-2] for x in parsed_numbering_table if x[-1] != '-']
+    # the numbering cache and the backends without an asyncio implementation are blocking, so they are
+    # run in a separate thread (get_event_loop returns the running loop inside a coroutine, and unlike
+    # get_running_loop it is available in python 3.6)
+    loop = asyncio.get_event_loop()
 
-        # TODO: add more server options
+    if cache is not None:
+        entry = await loop.run_in_executor(None, cache.get, sequence, numbering_scheme, server)
+        if entry is not None:
+            return entry[0]
+
+    if backend is None:
+        numbering = await loop.run_in_executor(
+            None, partial(get_numbering_backend(server), sequence, numbering_scheme, **kwargs))
     else:
-        numbering = ['']
+        numbering = await backend(sequence, numbering_scheme, client=client, **kwargs)
+
+    if cache is not None:
+        await loop.run_in_executor(None, cache.set, sequence, numbering_scheme, server, numbering,
+                                   Chain.determine_chain_type(numbering))
 
     return numbering
 
 
-def calculate_hydrophobicity_matrix(whole_sequence, numbering, aa_hydrophobicity_scores, sequence):
-    # instantiate numpy array (whole sequence includes all the amino acid positions of the VH/VL, even the ones
-    # that aren't occupied -> these will be filled with zeros
-    # hydrophobicity_matrix = np.zeros(len(whole_sequence))
-    #
-    # # iterate through each position
-    # for i, position in enumerate(whole_sequence):
-    #
-    #     if position in numbering:
-    #         position_in_data = numbering.index(position)
-    #         hydrophobicity_matrix[i] = aa_hydrophobicity_scores[sequence[position_in_data]]
-    #
-    # return hydrophobicity_matrix
-    # same thing as above but in a comprehension list
-    return np.array([aa_hydrophobicity_scores[sequence[numbering.index(x)]] if x in numbering
-                     else 0 for x in whole_sequence])
+def calculate_hydrophobicity_matrix(numbering_codes, n_positions, aa_hydrophobicity_scores, sequence):
+    """
+    Hydrophobicity of each position of the numbering scheme, the positions that aren't occupied are zero.
+
+    :param numbering_codes: numbering position codes (see Chain.numbering_codes)
+    :param n_positions: number of positions in the numbering scheme
+    :param aa_hydrophobicity_scores: hydrophobicity scores indexed by residue code
+    :param sequence: encoded sequence (see abpytools.utils.encoding)
+    :return: numpy.array with shape (n_positions,)
+    """
+    hydrophobicity_matrix = np.zeros(n_positions)
+    numbered = numbering_codes >= 0
+    hydrophobicity_matrix[numbering_codes[numbered]] = \
+        aa_hydrophobicity_scores[sequence[:len(numbering_codes)][numbered]]
+    return hydrophobicity_matrix
+
+
+_IONISABLE_RESIDUE_CODES = [AMINO_ACIDS.index(x) for x in 'DECYHKR']
+_EC_RESIDUE_CODES = [AMINO_ACIDS.index(x) for x in 'WYC']
+_PI_GRID = PI_GRID.tolist()
 
 
 def calculate_mw(sequence, mw_data):
     return sum(mw_data[x] for x in sequence) - (len(sequence) - 1) * mw_data['water']
 
 
+def ionisable_residue_counts(sequence):
+    """
+    Number of D, E, C, Y, H, K and R residues in a sequence.
+
+    Args:
+        sequence (str or numpy.ndarray): sequence or its encoding (see abpytools.utils.encoding)
+
+    Returns:
+        list
+
+    """
+    return residue_counts(sequence)[_IONISABLE_RESIDUE_CODES].tolist()
+
+
 def calculate_ec(sequence, ec_data):
     # ϵ280 = nW x 5,500 + nY x 1,490 + nC x 125
-    n_W = sequence.count('W')
-    n_Y = sequence.count('Y')
-    n_C = sequence.count('C')
+    n_W, n_Y, n_C = residue_counts(sequence)[_EC_RESIDUE_CODES].tolist()
     return n_W * ec_data['W'] + n_Y * ec_data['Y'] + n_C * ec_data['C']
 
 
@@ -450,25 +575,9 @@ def calculate_pi(sequence, pi_data):
     # algorithm implemented from http://isoelectric.ovh.org/files/practise-isoelectric-point.html
 
     # count number of D, E, C, Y, H, K, R
-    d_count = sequence.count('D')
-    e_count = sequence.count('E')
-    c_count = sequence.count('C')
-    y_count = sequence.count('Y')
-    h_count = sequence.count('H')
-    k_count = sequence.count('K')
-    r_count = sequence.count('R')
-
-    # initiate value of pH and nq (any number above 0)
-    nq = 10
-    ph = 0
-    # define precision
-    delta = 0.01
-
-    while nq > 0:
-
-        if ph >= 14:
-            raise Exception("Could not calculate pI (pH reached above 14)")
+    d_count, e_count, c_count, y_count, h_count, k_count, r_count = ionisable_residue_counts(sequence)
 
+    def net_charge(ph):
         # qn1, qn2, qn3, qn4, qn5, qp1, qp2, qp3, qp4
         qn1 = -1 / (1 + 10 ** (pi_data['COOH'] - ph))  # C-terminus charge
         qn2 = - d_count / (1 + 10 ** (pi_data['D'] - ph))  # D charge
@@ -480,47 +589,40 @@ def calculate_pi(sequence, pi_data):
         qp3 = k_count / (1 + 10 ** (ph - pi_data['K']))  # K charge
         qp4 = r_count / (1 + 10 ** (ph - pi_data['R']))  # R charge
 
-        nq = qn1 + qn2 + qn3 + qn4 + qn5 + qp1 + qp2 + qp3 + qp4
+        return qn1 + qn2 + qn3 + qn4 + qn5 + qp1 + qp2 + qp3 + qp4
 
-        # update pH
-        ph += delta
+    # the pI is the step of 0.01 pH units after the first pH at which the net charge is not positive,
+    # since the net charge decreases with the pH the step is found with a bisection instead of a linear search
+    n_steps = len(_PI_GRID) - 1
+    low, high = 0, n_steps
+    while low < high:
+        middle = (low + high) // 2
+        if net_charge(_PI_GRID[middle]) <= 0:
+            high = middle
+        else:
+            low = middle + 1
 
-    return ph
+    if low == n_steps:
+        raise Exception("Could not calculate pI (pH reached above 14)")
 
+    return _PI_GRID[low + 1]
 
-def calculate_cdr(numbering, cdr_positions, framework_positions):
-    """
 
-    :param numbering:
-    :param cdr_positions:
-    :param framework_positions:
-    :return:
+def calculate_cdr(numbering_codes, region_slices):
     """
 
-    cdrs = {'CDR1': list(),
-            'CDR2': list(),
-            'CDR3': list()}
-
-    frameworks = {'FR1': list(),
-                  'FR2': list(),
-                  'FR3': list(),
-                  'FR4': list()}
-
-    for cdr in cdrs.keys():
-
-        cdr_positions_i = cdr_positions[cdr]
-
-        for i, position in enumerate(numbering):
-            if position in cdr_positions_i:
-                cdrs[cdr].append(i)
+    :param numbering_codes: numbering position codes (see Chain.numbering_codes)
+    :param region_slices: [start, stop) position codes of each region (see ReferenceBundle.region_slices)
+    :return: indices of the amino acids in each CDR and framework region
+    """
 
-    for framework in frameworks.keys():
+    def region_index(region):
+        start, stop = region_slices[region]
+        return np.flatnonzero((numbering_codes >= start) & (numbering_codes < stop)).tolist()
 
-        framework_position_i = framework_positions[framework]
+    cdrs = {cdr: region_index(cdr) for cdr in ['CDR1', 'CDR2', 'CDR3']}
 
-        for i, position in enumerate(numbering):
-            if position in framework_position_i:
-                frameworks[framework].append(i)
+    frameworks = {framework: region_index(framework) for framework in ['FR1', 'FR2', 'FR3', 'FR4']}
 
     return cdrs, frameworks
 
@@ -543,13 +645,7 @@ def calculate_charge(sequence, ph, pka_values):
 
     # Faster implementation
     # count number of D, E, C, Y, H, K, R
-    d_count = sequence.count('D')
-    e_count = sequence.count('E')
-    c_count = sequence.count('C')
-    y_count = sequence.count('Y')
-    h_count = sequence.count('H')
-    k_count = sequence.count('K')
-    r_count = sequence.count('R')
+    d_count, e_count, c_count, y_count, h_count, k_count, r_count = ionisable_residue_counts(sequence)
 
     # qn1, qn2, qn3, qn4, qn5, qp1, qp2, qp3, qp4
     qn1 = -1 / (1 + 10 ** (pka_values['COOH'] - ph))  # C-terminus charge
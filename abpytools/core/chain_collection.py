@@ -1,41 +1,50 @@
 from .chain import Chain
+from .chain_store import ChainStore, SegmentedArray, numbering_matrix, hydrophobicity_tensor, region_offsets
+from .properties import (AVAILABLE_PROPERTIES, calculate_properties, residue_count_matrix, net_charges,
+                         molecular_weights, extinction_coefficients, solve_isoelectric_points, position_charges)
+from ..utils.encoding import decode_array, decode_sequence
 import numpy as np
 import logging
-from abpytools.utils import PythonConfig, Download
+import time
+import asyncio
+from abpytools.utils import (Download, AsyncDownload, get_loading_executor, get_reference_bundle, progressbar,
+                             lazy_import)
 import json
+import re
 import os
-import pandas as pd
-from .helper_functions import numbering_table_sequences, numbering_table_region, numbering_table_multiindex
+import hashlib
+from .helper_functions import get_numbering_table_layout
 from operator import itemgetter
+from itertools import islice
+from functools import partial
 from urllib import parse
 from math import ceil
 from .base import CollectionBase
 from ..features.composition import *
 from ..analysis.distance_metrics import *
-from ..core.cache import Cache
-from multiprocessing import Manager, Process
+from ..analysis.pairwise import AVAILABLE_METRICS, pairwise_distances, memmap_pairwise_distances
 from inspect import signature
 from .utils import (json_ChainCollection_formatter, pb2_ChainCollection_formatter, pb2_ChainCollection_parser,
-                    fasta_ChainCollection_parser, json_ChainCollection_parser)
+                    fasta_ChainCollection_parser, json_ChainCollection_parser, fasta_Chain_iterator,
+                    checkpoint_Chain_formatter, checkpoint_Chain_parser)
 from .flags import *
 
 # setting up debugging messages
 logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.DEBUG)
 
-ipython_config = PythonConfig()
-if ipython_config.ipython_info == 'notebook':
-    from tqdm import tqdm_notebook as tqdm  # pragma: no cover
-else:
-    from tqdm import tqdm
-
-if BACKEND_FLAGS.HAS_PROTO:
-    from abpytools.core.formats import ChainCollectionProto
+pd = lazy_import('pandas')
 
 
 class ChainCollection(CollectionBase):
     """
     Object containing Chain objects and to perform analysis on the ensemble.
 
+    The Chain objects are stored either as a list (ChainCollection.antibody_objects), or in columnar mode as a
+    ChainStore, where each attribute of all the chains is stored in a single array (see
+    ChainCollection.to_columnar). Columnar collections use an order of magnitude less memory and compute names,
+    sequences, molecular weights, extinction coefficients and the hydrophobicity matrix with numpy operations.
+    The other methods create the Chain objects on the fly.
+
     """
 
     def __init__(self, antibody_objects=None, load=True, **kwargs):
@@ -47,11 +56,13 @@ class ChainCollection(CollectionBase):
             **kwargs:
         """
 
+        self._store = None
+
         if antibody_objects is None:
             self.antibody_objects = []
         else:
             if isinstance(antibody_objects, ChainCollection):
-                antibody_objects = antibody_objects.antibody_objects
+                antibody_objects = antibody_objects._chain_objects()
             elif not isinstance(antibody_objects, list):
                 raise ValueError("Expected a list, instead got object of type {}".format(type(antibody_objects)))
 
@@ -75,15 +86,223 @@ class ChainCollection(CollectionBase):
             if load:
                 self.load(**kwargs)
 
-    def load(self, show_progressbar=True, n_threads=4, verbose=True):
+    def load(self, show_progressbar=True, n_threads=4, verbose=True, server=OPTION_FLAGS.ABYSIS):
         self.antibody_objects, self._chain = load_from_antibody_object(
             antibody_objects=self.antibody_objects,
             show_progressbar=show_progressbar,
-            n_threads=n_threads, verbose=verbose)
+            n_threads=n_threads, verbose=verbose,
+            server=server)
+
+    @classmethod
+    def from_store(cls, store):
+        """
+        Returns a ChainCollection in columnar mode with the chains of a ChainStore.
+
+        Args:
+            store (ChainStore):
+
+        Returns:
+            ChainCollection
+
+        """
+
+        chains = set(store.chains)
+        if len(chains) > 1:
+            raise ValueError("ChainCollection only support Chain objects with the same chain type.")
+
+        collection = cls()
+        collection._store = store
+        collection._numbering_scheme = store.numbering_scheme
+        collection._chain = next(iter(chains)) if chains else ''
+
+        return collection
+
+    def to_columnar(self):
+        """
+        Returns a ChainCollection with the same chains in columnar mode (see ChainStore).
+
+        Examples:
+            >>> from abpytools import ChainCollection
+            >>> collection = ChainCollection.load_from_file(path='./tests/Data/chain_collection_fasta_test.fasta')
+            >>> columnar_collection = collection.to_columnar()
+            >>> columnar_collection.molecular_weights()
+
+        Returns:
+            ChainCollection
+
+        """
+
+        if self._store is not None:
+            return self.from_store(self._store)
+
+        return self.from_store(ChainStore.from_chains(self._antibody_objects, numbering_scheme=self._numbering_scheme))
+
+    @property
+    def is_columnar(self):
+        return self._store is not None
+
+    @property
+    def store(self):
+        return self._store
+
+    @property
+    def antibody_objects(self):
+        """
+        The list of Chain objects of the collection. Accessing it in columnar mode converts the collection back
+        to a list of Chain objects, so that changes to the list and its Chain objects are kept.
+
+        Returns:
+            list
+
+        """
+        if self._store is not None:
+            self._antibody_objects = self._chain_objects()
+            self._store = None
+        return self._antibody_objects
+
+    @antibody_objects.setter
+    def antibody_objects(self, antibody_objects):
+        self._antibody_objects = antibody_objects
+        self._store = None
+
+    def _chain_objects(self):
+        # the Chain objects of the collection without leaving columnar mode, i.e. for read only access
+        if self._store is not None:
+            return [self._store.to_chain(i) for i in range(len(self._store))]
+        return self._antibody_objects
+
+    async def aload(self, verbose=True, server=OPTION_FLAGS.ABYSIS, max_connections_per_host=8, timeout=30,
+                    client=None, **kwargs):
+        """
+        asyncio version of ChainCollection.load, where all the Chain objects are loaded concurrently
+        sharing a pool of keep-alive connections.
+
+        Args:
+            verbose (bool):
+            server (str): name of the numbering backend
+            max_connections_per_host (int): maximum number of concurrent requests to the numbering server
+            timeout (float): timeout of each request in seconds
+            client (AsyncDownload): client used to query the server, if None a new client is created with
+                                    max_connections_per_host and timeout
+            **kwargs: keyword arguments passed on to the numbering backend (i.e. url)
+
+        Returns:
+            dict: request statistics
+                  - n_requests: number of requests sent to the server
+                  - n_connections: number of connections opened to the server
+                  - latencies: list with the latency in seconds of each request
+                  - mean_latency: mean latency in seconds
+                  - max_latency: maximum latency in seconds
+                  - elapsed_time: time in seconds spent loading the collection
+
+        Examples:
+            >>> import asyncio
+            >>> from abpytools import ChainCollection
+            >>> collection = ChainCollection(antibody_objects=chains, load=False)
+            >>> stats = asyncio.run(collection.aload(max_connections_per_host=4))
+        """
+
+        if client is None:
+            async with AsyncDownload(max_connections_per_host=max_connections_per_host, timeout=timeout) as client:
+                return await self.aload(verbose=verbose, server=server, client=client, **kwargs)
+
+        if verbose:
+            print("Loading in antibody objects")
+
+        start = time.perf_counter()
+        n_requests = len(client.latencies)
+        n_connections = client.n_connections
+
+        await asyncio.gather(*[antibody_object.aload(server=server, client=client, **kwargs)
+                               for antibody_object in self.antibody_objects])
+
+        self.antibody_objects, self._chain = filter_loaded_antibody_objects(self.antibody_objects, verbose=verbose)
+
+        latencies = [x[1] for x in client.latencies[n_requests:]]
+
+        return {"n_requests": len(latencies),
+                "n_connections": client.n_connections - n_connections,
+                "latencies": latencies,
+                "mean_latency": sum(latencies) / len(latencies) if len(latencies) > 0 else 0.,
+                "max_latency": max(latencies) if len(latencies) > 0 else 0.,
+                "elapsed_time": time.perf_counter() - start}
+
+    def number_batch(self, show_progressbar=True, n_threads=4, verbose=True, server=OPTION_FLAGS.ABYSIS):
+        """
+        Loads the Chain objects of the collection numbering each unique (sequence, numbering scheme) pair only once.
+        The results are then copied to all the Chain objects with the same sequence and numbering scheme.
+        Chain objects that have already been loaded are used as the source of their duplicates.
+
+        Args:
+            show_progressbar (bool):
+            n_threads (int): number of threads used to number the unique sequences
+            verbose (bool): if True prints the deduplication statistics
+            server (str): name of the numbering backend
+
+        Returns:
+            dict: deduplication statistics
+                  - n_sequences: number of Chain objects in the collection
+                  - n_unique: number of unique (sequence, numbering scheme) pairs
+                  - n_numbered: number of sequences that were numbered
+                  - dedup_ratio: fraction of the Chain objects that were not numbered because of a duplicate
+                  - elapsed_time: time in seconds spent loading the collection
+                  - time_saved: estimate of the time in seconds saved by not numbering the duplicates
+
+        Examples:
+            >>> from abpytools import Chain, ChainCollection
+            >>> sequence = ('QVQLQQSGAELARPGASVKMSCKASGYTFTRYTMHWVKQRPGQGLEWIGYINPSRGYTNYNQKFKDKATLTTDKSSSTAYMQLSSLTSEDSAVYYCAR'
+            ...             'YYDDHYCLDYWGQGTTLTVSS')
+            >>> sequences = [sequence] * 10
+            >>> collection = ChainCollection(antibody_objects=[Chain(sequence=x) for x in sequences], load=False)
+            >>> stats = collection.number_batch(server='local', show_progressbar=False, verbose=False)
+            >>> stats['dedup_ratio']
+            0.9
+        """
+
+        start = time.perf_counter()
+
+        groups = group_antibody_objects(self.antibody_objects)
+
+        # a loaded Chain object is used as the source of its group, otherwise the first object is numbered
+        sources = []
+        for group in groups.values():
+            loaded = [x for x in group if x.status in [NUMBERING_FLAGS.LOADED, NUMBERING_FLAGS.UNNUMBERED]]
+            sources.append(loaded[0] if len(loaded) > 0 else group[0])
+
+        to_number = [x for x in sources if x.status in [NUMBERING_FLAGS.NOT_LOADED, NUMBERING_FLAGS.FAILED]]
+
+        numbering_start = time.perf_counter()
+        number_antibody_objects(to_number, show_progressbar=show_progressbar, n_threads=n_threads, server=server)
+        numbering_time = time.perf_counter() - numbering_start
+
+        n_copied = 0
+        for source, group in zip(sources, groups.values()):
+            for antibody_object in group:
+                if antibody_object is not source and antibody_object.status != source.status:
+                    antibody_object._load_from_chain(source)
+                    n_copied += 1
+
+        self.antibody_objects, self._chain = filter_loaded_antibody_objects(self.antibody_objects, verbose=verbose)
+
+        n_sequences = sum(len(x) for x in groups.values())
+        time_per_sequence = numbering_time / len(to_number) if len(to_number) > 0 else 0.
+
+        stats = {"n_sequences": n_sequences,
+                 "n_unique": len(groups),
+                 "n_numbered": len(to_number),
+                 "dedup_ratio": 1 - len(groups) / n_sequences if n_sequences > 0 else 0.,
+                 "elapsed_time": time.perf_counter() - start,
+                 "time_saved": time_per_sequence * n_copied}
+
+        if verbose:
+            print("Numbered {n_numbered} unique sequences out of {n_sequences} "
+                  "(dedup ratio: {dedup_ratio:.2%}, estimated time saved: {time_saved:.2f}s)".format(**stats))
+
+        return stats
 
     @classmethod
     def load_from_fasta(cls, path, numbering_scheme=NUMBERING_FLAGS.CHOTHIA, n_threads=20,
-                        verbose=True, show_progressbar=True):
+                        verbose=True, show_progressbar=True, server=OPTION_FLAGS.ABYSIS):
         if not os.path.isfile(path):
             raise ValueError("File does not exist!")
         with open(path, 'r') as f:
@@ -91,12 +310,89 @@ class ChainCollection(CollectionBase):
 
         chain_collection = cls(antibody_objects=antibody_objects, load=True,
                                n_threads=n_threads, verbose=verbose,
-                               show_progressbar=show_progressbar)
+                               show_progressbar=show_progressbar, server=server)
 
         return chain_collection
 
+    @classmethod
+    def load_from_fasta_checkpointed(cls, path, checkpoint_path=None, chunk_size=1000,
+                                     numbering_scheme=NUMBERING_FLAGS.CHOTHIA, n_threads=20, verbose=True,
+                                     show_progressbar=True, server=OPTION_FLAGS.ABYSIS):
+        """
+        Loads a FASTA file in chunks of chunk_size sequences, appending each completed chunk to a checkpoint file.
+        If the checkpoint file already exists the chunks it contains are not numbered again, so that
+        an interrupted load resumes from the last completed chunk. Only the chains whose numbering failed
+        (i.e. the server could not be reached) are numbered again, and their chunk is checkpointed again.
+        The checkpoint stores a hash of the FASTA file, so that it is not used to resume loading a modified file.
+        The FASTA file is read lazily, one chunk at a time.
+
+        Args:
+            path (str): path to the FASTA file
+            checkpoint_path (str): path to the checkpoint file, by default path + '.checkpoint'
+            chunk_size (int): number of sequences numbered between checkpoints
+            numbering_scheme (str):
+            n_threads (int):
+            verbose (bool):
+            show_progressbar (bool):
+            server (str): name of the numbering backend
+
+        Returns:
+            ChainCollection
+
+        Examples:
+            >>> from abpytools import ChainCollection
+            >>> collection = ChainCollection.load_from_fasta_checkpointed('repertoire.fasta', chunk_size=10000)
+        """
+        if not os.path.isfile(path):
+            raise ValueError("File does not exist!")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+
+        if checkpoint_path is None:
+            checkpoint_path = path + '.checkpoint'
+
+        # the checkpoint can only be used to resume loading the same file with the same parameters
+        header = {"fasta": os.path.basename(path), "size": os.path.getsize(path), "sha1": file_fingerprint(path),
+                  "chunk_size": chunk_size, "numbering_scheme": numbering_scheme, "server": server}
+
+        completed_chunks = read_loading_checkpoint(checkpoint_path, header)
+
+        if verbose and len(completed_chunks) > 0:
+            print("Resuming from checkpoint: {} chunks already loaded".format(len(completed_chunks)))
+
+        antibody_objects = []
+
+        with open(path, 'r') as f, open(checkpoint_path, 'a') as checkpoint:
+            chain_iterator = fasta_Chain_iterator(f, numbering_scheme=numbering_scheme)
+            chunks = iter(lambda: list(islice(chain_iterator, chunk_size)), [])
+            if show_progressbar:
+                chunks = progressbar(chunks, unit='chunk')
+
+            for i, chunk in enumerate(chunks):
+                if i in completed_chunks:
+                    chunk = [checkpoint_Chain_parser(record, numbering_scheme) for record in completed_chunks[i]]
+                    failed = [x for x in chunk if x.status == NUMBERING_FLAGS.FAILED]
+                    if not failed:
+                        antibody_objects.extend(chunk)
+                        continue
+                    number_antibody_objects(failed, show_progressbar=False, n_threads=n_threads, server=server)
+                else:
+                    number_antibody_objects(chunk, show_progressbar=False, n_threads=n_threads, server=server)
+
+                checkpoint.write(json.dumps({"chunk": i,
+                                             "records": [checkpoint_Chain_formatter(x) for x in chunk]}) + '\n')
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+
+                antibody_objects.extend(chunk)
+
+        antibody_objects, _ = filter_loaded_antibody_objects(antibody_objects, verbose=verbose)
+
+        return cls(antibody_objects=antibody_objects, load=False)
+
     @classmethod
     def load_from_pb2(cls, path, n_threads=20, verbose=True, show_progressbar=True):
+        from abpytools.core.formats import ChainCollectionProto
         with open(path, 'rb') as f:
             proto_parser = ChainCollectionProto()
             proto_parser.ParseFromString(f.read())
@@ -129,6 +425,7 @@ class ChainCollection(CollectionBase):
             json.dump(data, f, indent=2)
 
     def save_to_pb2(self, path, update=True):
+        from abpytools.core.formats import ChainCollectionProto
         proto_parser = ChainCollectionProto()
         try:
             with open(os.path.join(path + '.pb2'), 'rb') as f:
@@ -154,7 +451,9 @@ class ChainCollection(CollectionBase):
         :return: list
         """
 
-        return [x.ab_molecular_weight(monoisotopic=monoisotopic) for x in self.antibody_objects]
+        encoded_sequences = self.encoded_sequences
+        return molecular_weights(residue_count_matrix(encoded_sequences), encoded_sequences,
+                                 monoisotopic=monoisotopic).tolist()
 
     def extinction_coefficients(self, extinction_coefficient_database='Standard', reduced=False):
 
@@ -165,21 +464,135 @@ class ChainCollection(CollectionBase):
         :return: list
         """
 
-        return [x.ab_ec(extinction_coefficient_database=extinction_coefficient_database,
-                        reduced=reduced) for x in self.antibody_objects]
+        return extinction_coefficients(residue_count_matrix(self.encoded_sequences),
+                                       extinction_coefficient_database=extinction_coefficient_database,
+                                       reduced=reduced).tolist()
 
-    def hydrophobicity_matrix(self):
+    def properties(self, properties=AVAILABLE_PROPERTIES, monoisotopic=False, extinction_coefficient_database='Standard',
+                   reduced=False, ph=7.4, pka_database=PI_FLAGS.WIKIPEDIA, as_dataframe=False):
+        """
+        Computes the physicochemical properties of all the sequences from a single (n_sequences, 20) residue
+        count matrix, where each property is a matrix-vector product (see abpytools.core.properties).
+        The values are the same as the ones of the Chain methods.
 
-        if self._chain == CHAIN_FLAGS.HEAVY_CHAIN:
-            num_columns = 158
-        else:
-            num_columns = 138
-        abs_hydrophobicity_matrix = np.zeros((len(self.antibody_objects), num_columns))
+        Examples:
+            >>> from abpytools import ChainCollection
+            >>> collection = ChainCollection.load_from_file(path='chains.json')
+            >>> collection.properties(properties=['mw', 'pI'], as_dataframe=True)
+
+        Args:
+            properties (list): any of 'length', 'mw' (molecular weight), 'ec' (extinction coefficient),
+                               'pI' and 'charge' (net charge at ph)
+            monoisotopic (bool): molecular weight table (see Chain.ab_molecular_weight)
+            extinction_coefficient_database (str):
+            reduced (bool): whether to consider the cysteines to be reduced in the extinction coefficient
+            ph (float): pH of the net charge
+            pka_database (str): pKa values of the pI and the net charge, one of OPTION_FLAGS.AVAILABLE_PI_VALUES
+            as_dataframe (bool): whether to return a pandas DataFrame indexed by name
+
+        Returns:
+            numpy.recarray: with a name field and a field for each property, or a pandas DataFrame
+
+        """
+        result = calculate_properties(self.encoded_sequences, properties=properties, monoisotopic=monoisotopic,
+                                      extinction_coefficient_database=extinction_coefficient_database,
+                                      reduced=reduced, ph=ph, pka_database=pka_database)
+        if as_dataframe:
+            return pd.DataFrame(result, index=self.names, columns=list(properties))
+        return np.rec.fromarrays([np.array(self.names, dtype=str)] + [result[x] for x in properties],
+                                 names=['name'] + list(properties))
+
+    def isoelectric_points(self, pka_databases=OPTION_FLAGS.AVAILABLE_PI_VALUES, tolerance=1e-3, as_dataframe=False):
+        """
+        Computes the pI of all the sequences with several pKa databases at once, with a bisection of the net
+        charge of the whole collection to the given tolerance (see abpytools.core.properties).
+        Chain.ab_pi and ChainCollection.properties return the pI in steps of 0.01 pH units instead.
+
+        Args:
+            pka_databases (list): names of the pKa databases, see OPTION_FLAGS.AVAILABLE_PI_VALUES
+            tolerance (float): maximum absolute error of the pI
+            as_dataframe (bool): whether to return a pandas DataFrame indexed by name
+
+        Returns:
+            numpy.recarray: with a name field and a field for each database, or a pandas DataFrame.
+                            The pI is NaN for sequences that are positively charged up to pH 14
+
+        """
+        pi = solve_isoelectric_points(residue_count_matrix(self.encoded_sequences), pka_databases=pka_databases,
+                                      tolerance=tolerance)
+        if as_dataframe:
+            return pd.DataFrame(pi, index=self.names, columns=list(pka_databases))
+        return np.rec.fromarrays([np.array(self.names, dtype=str)] + list(pi.T),
+                                 names=['name'] + list(pka_databases))
+
+    def titration(self, ph, pka_database=PI_FLAGS.WIKIPEDIA, per_position=False, region='all'):
+        """
+        Computes the titration curves of all the sequences, i.e. the net charge at each pH value, as the product
+        of the residue count matrix with the charge of each amino acid at each pH (see abpytools.core.properties).
+
+        Examples:
+            >>> import numpy as np
+            >>> net_charge, charge = collection.titration(ph=np.arange(4, 9.1, 0.1), per_position=True)
+
+        Args:
+            ph (list): n_ph pH values
+            pka_database (str): one of OPTION_FLAGS.AVAILABLE_PI_VALUES
+            per_position (bool): whether to also return the charge of each position of the numbering table
+            region (str or list): regions of the numbering table of the charge of each position, 'all' or
+                                  the regions to include, i.e. ['CDR1', 'CDR2']
+
+        Returns:
+            numpy.ndarray: net charge with shape (n_chains, n_ph), and if per_position is True a tuple with the
+                           net charge and the charge of each position with shape (n_chains, n_positions, n_ph)
+
+        """
+        ph = np.atleast_1d(np.asarray(ph, dtype=np.float64))
+        net_charge = net_charges(residue_count_matrix(self.encoded_sequences), ph=ph, pka_database=pka_database)
+        if per_position:
+            return net_charge, position_charges(self.numbering_table(region=region, encoded=True), ph=ph,
+                                                pka_database=pka_database)
+        return net_charge
+
+    def hydrophobicity_matrix(self, hydrophobicity_scores=HYDROPHOBICITY_FLAGS.EW):
+        """
+        Returns the hydrophobicity of each position of the numbering scheme for all the sequences.
 
-        for row in range(abs_hydrophobicity_matrix.shape[0]):
-            abs_hydrophobicity_matrix[row] = self.antibody_objects[row].hydrophobicity_matrix
+        Args:
+            hydrophobicity_scores (str): hydrophobicity scale (see OPTION_FLAGS.AVAILABLE_HYDROPHOBITY_SCORES)
+
+        Returns:
+            numpy.ndarray: with shape (n_chains, n_positions)
 
-        return abs_hydrophobicity_matrix
+        """
+        return self.hydrophobicity_tensor(hydrophobicity_scores=[hydrophobicity_scores], dtype=np.float64)[0]
+
+    def hydrophobicity_tensor(self, hydrophobicity_scores=None, dtype=np.float32):
+        """
+        Returns the hydrophobicity of each position of the numbering scheme for all the sequences and
+        hydrophobicity scales, computed from the encoded numbering table in a single lookup. The number of
+        positions is the number of positions of the numbering scheme.
+
+        Examples:
+            >>> from abpytools import ChainCollection
+            >>> from abpytools.core.flags import *
+            >>> collection = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_heavy.json')
+            >>> tensor = collection.hydrophobicity_tensor([HYDROPHOBICITY_FLAGS.EW, HYDROPHOBICITY_FLAGS.KD])
+            >>> tensor.shape
+            (2, 1, 158)
+
+        Args:
+            hydrophobicity_scores (list): hydrophobicity scales, by default all the available scales
+                                          (see OPTION_FLAGS.AVAILABLE_HYDROPHOBITY_SCORES)
+            dtype: dtype of the result
+
+        Returns:
+            numpy.ndarray: with shape (n_scales, n_chains, n_positions)
+
+        """
+        if hydrophobicity_scores is None:
+            hydrophobicity_scores = OPTION_FLAGS.AVAILABLE_HYDROPHOBITY_SCORES
+
+        return hydrophobicity_tensor(self._numbering_matrix(), hydrophobicity_scores, dtype=dtype)
 
     def get_object(self, name=''):
 
@@ -203,31 +616,142 @@ class ChainCollection(CollectionBase):
         'CDR' entry contains dictionaries with CDR1, CDR2 and CDR3 regions
         'FR' entry contains dictionaries with FR1, FR2, FR3 and FR4 regions
         """
-        return {x.name: {'CDR': x.ab_regions()[0], 'FR': x.ab_regions()[1]} for x in self.antibody_objects}
+        if self._is_single_chain_store():
+            # the residues of each region are contiguous, so the indices are the region offsets
+            # relative to the start of each sequence (see ChainCollection.region_offsets)
+            cdrs, frameworks = ['CDR1', 'CDR2', 'CDR3'], ['FR1', 'FR2', 'FR3', 'FR4']
+            offsets = self.region_offsets(regions=cdrs + frameworks) - \
+                self.encoded_sequences.offsets[:-1, np.newaxis, np.newaxis]
+            return {name: {'CDR': {cdr: list(range(*offsets[i, j])) for j, cdr in enumerate(cdrs)},
+                           'FR': {framework: list(range(*offsets[i, j + len(cdrs)]))
+                                  for j, framework in enumerate(frameworks)}}
+                    for i, name in enumerate(self.names)}
+
+        return {x.name: {'CDR': x.ab_regions()[0], 'FR': x.ab_regions()[1]} for x in self._chain_objects()}
+
+    def numbering_table(self, as_array=False, region='all', encoded=False):
+        """
+        Returns the amino acid in each position of the numbering scheme for all the sequences in the collection,
+        where empty positions are '-'.
+
+        The table is built for all the sequences at once as a uint8 matrix of residue codes
+        (see abpytools.utils.encoding), which is only converted to characters or a pandas.DataFrame
+        when required.
 
-    def numbering_table(self, as_array=False, region='all'):
+        Args:
+            as_array (bool): if True returns a numpy.array of str, if False returns a pandas.DataFrame
+            region (str or list): 'all' or the regions to include, i.e. ['CDR1', 'CDR2']
+            encoded (bool): if True returns the uint8 matrix of residue codes, the empty positions
+                            are encoded as GAP_CODE
+
+        Returns:
+            numpy.ndarray or pandas.DataFrame with shape (n_chains, n_positions)
+
+        """
 
-        region = numbering_table_region(region)
+        # the columns and MultiIndex of the table are cached for each numbering scheme, chain and regions
+        layout = get_numbering_table_layout(region, self._numbering_scheme, self.chain)
 
-        table = np.row_stack(
-            [x.ab_numbering_table(as_array=True, region=region) for x in self.antibody_objects])
+        table = self._numbering_matrix()[:, layout.columns]
+
+        if encoded:
+            return table
+
+        table = decode_array(table)
 
         if as_array:
             return table
 
         else:
             # return the data as a pandas.DataFrame -> it's slower but looks nicer and makes it easier to get
-            # the data of interest
-            whole_sequence_dict, whole_sequence = numbering_table_sequences(region, self._numbering_scheme, self._chain)
+            # the data of interest, the columns (pandas.MultiIndex) are cached in the layout
+            return pd.DataFrame(data=table, columns=layout.multi_index, index=self.names)
+
+    def _numbering_matrix(self):
+        # encoded numbering table of all the positions of the numbering scheme
+        if self._store is not None:
+            return self._store.numbering_matrix(self.chain)
+
+        n_positions = len(get_reference_bundle().positions(self._numbering_scheme, self.chain))
+
+        return numbering_matrix(self._numbering_codes(), self.encoded_sequences, n_positions)
+
+    def _numbering_codes(self):
+        # position codes of the numbering of each chain
+        if self._store is not None:
+            return self._store.numbering_codes
+
+        chains = self.antibody_objects
+        for chain in chains:
+            # same as Chain.ab_numbering_table, the chains that have not been loaded are numbered first
+            if chain.status in [NUMBERING_FLAGS.NOT_LOADED, NUMBERING_FLAGS.FAILED]:
+                chain.numbering = chain.ab_numbering()
 
-            multi_index = numbering_table_multiindex(region=region,
-                                                     whole_sequence_dict=whole_sequence_dict)
+        return SegmentedArray.from_arrays([x.numbering_codes for x in chains], dtype=np.int16)
 
-            # create the DataFrame and assign the columns and index names
-            data = pd.DataFrame(data=table)
-            data.columns = multi_index
-            data.index = self.names
-            return data
+    def region_offsets(self, regions=None):
+        """
+        Returns the boundaries of each region of all the sequences as offsets in the buffer of the encoded
+        sequences, so that the sequence of region j of chain i is
+        ChainCollection.encoded_sequences.values[offsets[i, j, 0]:offsets[i, j, 1]]. The offsets are found
+        with a binary search of the position codes of the start and end of each region (see
+        ReferenceBundle.region_slices) in the numbering of all the chains at once.
+
+        Examples:
+            >>> offsets = collection.region_offsets(regions=['CDR1', 'CDR2', 'CDR3'])
+            >>> cdr_lengths = offsets[:, :, 1] - offsets[:, :, 0]
+
+        Args:
+            regions (list): region names, by default all the regions in the order of ReferenceBundle.regions,
+                            i.e. ['FR1', 'CDR1', 'FR2', 'CDR2', 'FR3', 'CDR3', 'FR4']
+
+        Returns:
+            numpy.ndarray: int64 array with shape (n_chains, n_regions, 2)
+
+        """
+        bundle = get_reference_bundle()
+        regions = bundle.regions if regions is None else regions
+        region_slices = bundle.region_slices(self._numbering_scheme, self.chain)
+        unknown = [x for x in regions if x not in region_slices]
+        if unknown:
+            raise ValueError("Unknown regions: {}. Available regions: {}".format(', '.join(unknown),
+                                                                                 ', '.join(bundle.regions)))
+        n_positions = len(bundle.positions(self._numbering_scheme, self.chain))
+        return region_offsets(self._numbering_codes(), self.encoded_sequences, [region_slices[x] for x in regions],
+                              n_positions)
+
+    def region_lengths(self, regions=None):
+        """
+        Returns the number of residues of each region of all the sequences (see ChainCollection.region_offsets).
+
+        Args:
+            regions (list): region names, by default all the regions in the order of ReferenceBundle.regions
+
+        Returns:
+            numpy.ndarray: int64 array with shape (n_chains, n_regions)
+
+        """
+        offsets = self.region_offsets(regions=regions)
+        return offsets[:, :, 1] - offsets[:, :, 0]
+
+    def region_sequences(self, region, encoded=False):
+        """
+        Returns the sequence of a region of all the sequences, which are slices of the buffer of the encoded
+        sequences (see ChainCollection.region_offsets).
+
+        Args:
+            region (str): 'CDR1', 'CDR2', 'CDR3', 'FR1', 'FR2', 'FR3' or 'FR4'
+            encoded (bool): if True returns the encoded sequences as a SegmentedArray
+
+        Returns:
+            list: sequence of the region of each chain
+
+        """
+        offsets = self.region_offsets(regions=[region])[:, 0]
+        sequences = SegmentedArray.from_slices(self.encoded_sequences.values, offsets[:, 0], offsets[:, 1])
+        if encoded:
+            return sequences
+        return [decode_sequence(x) for x in sequences]
 
     def igblast_server_query(self, chunk_size=50, show_progressbar=True, **kwargs):
         """
@@ -244,7 +768,7 @@ class ChainCollection(CollectionBase):
         n_chunks = ceil(len(self) / chunk_size) - 1
 
         if show_progressbar:
-            for query in tqdm(query_list, total=n_chunks):
+            for query in progressbar(query_list, total=n_chunks):
                 self._igblast_server_query(query, **kwargs)
 
         else:
@@ -315,24 +839,52 @@ class ChainCollection(CollectionBase):
 
     @property
     def names(self):
+        if self._store is not None:
+            return self._store.names
         return [x.name for x in self.antibody_objects]
 
     @property
     def sequences(self):
+        if self._store is not None:
+            return self._store.sequences
         return [x.sequence for x in self.antibody_objects]
 
+    @property
+    def encoded_sequences(self):
+        """
+        The sequences in the canonical uint8 residue encoding (see abpytools.utils.encoding). The encoding is
+        cached in each Chain object, or in the ChainStore of columnar collections.
+
+        Returns:
+            SegmentedArray: iterable with the encoded sequence of each chain
+
+        """
+        if self._store is not None:
+            return self._store.encoded_sequences
+        return SegmentedArray.from_arrays([x.encoded_sequence for x in self.antibody_objects])
+
+    def _is_single_chain_store(self):
+        # the numbering table and region offsets of a columnar collection can only be computed at once
+        # for a single chain type
+        return self._store is not None and len(set(self._store.chains)) == 1
+
     @property
     def aligned_sequences(self):
-        return [x.aligned_sequence for x in self.antibody_objects]
+        if self._is_single_chain_store():
+            return self.numbering_table(as_array=True).tolist()
+        return [x.aligned_sequence for x in self._chain_objects()]
 
     @property
     def n_ab(self):
-        return len(self.sequences)
+        return len(self)
 
     @property
     def chain(self):
         if self._chain == '':
-            chains = set([x.chain for x in self.antibody_objects])
+            if self._store is not None:
+                chains = set(self._store.chains)
+            else:
+                chains = set([x.chain for x in self.antibody_objects])
             if len(chains) == 1:
                 self._chain = next(iter(chains))
                 return self._chain
@@ -347,31 +899,43 @@ class ChainCollection(CollectionBase):
 
     @property
     def charge(self):
-        return np.array([x.ab_charge() for x in self.antibody_objects])
+        return self.titration(ph=[7.4], per_position=True)[1][:, :, 0]
 
     @property
     def total_charge(self):
-        return {x.name: x.ab_total_charge() for x in self.antibody_objects}
+        return dict(zip(self.names, net_charges(residue_count_matrix(self.encoded_sequences)).tolist()))
 
     @property
     def germline_identity(self):
+        if self._store is not None:
+            names = self.names
+            return {name: self._store.germline_identity.get(i, dict()) for i, name in enumerate(names)}
         return {x.name: x.germline_identity for x in self.antibody_objects}
 
     @property
     def germline(self):
+        if self._store is not None:
+            names = self.names
+            return {name: self._store.germline.get(i, tuple()) for i, name in enumerate(names)}
         return {x.name: x.germline for x in self.antibody_objects}
 
     def _string_summary_basic(self):
-        return "abpytools.ChainCollection Chain type: {}, Number of sequences: {}".format(self._chain,
-                                                                                          len(self.antibody_objects))
+        return "abpytools.ChainCollection Chain type: {}, Number of sequences: {}".format(self._chain, len(self))
 
     def __repr__(self):
         return "<%s at 0x%02x>" % (self._string_summary_basic(), id(self))
 
     def __len__(self):
+        if self._store is not None:
+            return len(self._store)
         return len(self.antibody_objects)
 
     def __getitem__(self, indices):
+        if self._store is not None:
+            # the Chain objects are copies of the data in the store
+            if isinstance(indices, (int, np.integer)):
+                return self._store.to_chain(range(len(self._store))[indices])
+            return ChainCollection.from_store(self._store.take(list(indices)))
         if isinstance(indices, int):
             return self.antibody_objects[indices]
         else:
@@ -382,15 +946,17 @@ class ChainCollection(CollectionBase):
             if self.numbering_scheme != other.numbering_scheme:
                 raise ValueError("Concatenation requires ChainCollection "
                                  "objects to use the same numbering scheme.")
+            elif self._store is not None and other._store is not None:
+                return ChainCollection.from_store(ChainStore.concatenate([self._store, other._store]))
             else:
-                new_object_list = self.antibody_objects + other.antibody_objects
+                new_object_list = self._chain_objects() + other._chain_objects()
 
         elif isinstance(other, Chain):
             if self.numbering_scheme != other.numbering_scheme:
                 raise ValueError("Concatenation requires Chain object to use "
                                  "the same numbering scheme as ChainCollection.")
             else:
-                new_object_list = self.antibody_objects + [other]
+                new_object_list = self._chain_objects() + [other]
 
         else:
             raise ValueError("Concatenation requires other to be of type "
@@ -417,12 +983,21 @@ class ChainCollection(CollectionBase):
         igblast_result_dict = load_igblast_query(igblast_result, names)
 
         # unpack results
+        if self._store is not None:
+            collection_names = self.names
+            for name in names:
+                self._store.set_germline(collection_names.index(name), igblast_result_dict[name][1],
+                                         igblast_result_dict[name][0])
+            return
+
         for name in names:
             obj_i = self.get_object(name=name)
             obj_i.germline = igblast_result_dict[name][1]
             obj_i.germline_identity = igblast_result_dict[name][0]
 
     def loading_status(self):
+        if self._store is not None:
+            return self._store.status
         return [x.status for x in self.antibody_objects]
 
     def composition(self, method='count'):
@@ -431,14 +1006,17 @@ class ChainCollection(CollectionBase):
         :param method:
         :return:
         """
-        if method == 'count':
-            return [order_seq(aa_composition(seq)) for seq in self.sequences]
-        elif method == 'freq':
-            return [order_seq(aa_frequency(seq)) for seq in self.sequences]
+        if method in ['count', 'freq']:
+            # the amino acid count of all sequences at once, the columns are ordered alphabetically
+            encoded_sequences = self.encoded_sequences
+            counts = residue_count_matrix(encoded_sequences)
+            if method == 'count':
+                return counts.tolist()
+            return (counts / encoded_sequences.lengths[:, np.newaxis]).tolist()
         elif method == 'chou':
-            return chou_pseudo_aa_composition(self.sequences)
+            return chou_pseudo_aa_composition(*self.encoded_sequences)
         elif method == 'triad':
-            return triad_method(self.sequences)
+            return triad_method(*self.encoded_sequences)
         elif method == 'hydrophobicity':
             return self.hydrophobicity_matrix()
         elif method == 'volume':
@@ -446,68 +1024,140 @@ class ChainCollection(CollectionBase):
         else:
             raise ValueError("Unknown method")
 
-    def distance_matrix(self, feature=None, metric='cosine_similarity', multiprocessing=False):
+    def distance_matrix(self, feature=None, metric='cosine_similarity', multiprocessing=False, path=None,
+                        condensed=False, show_progressbar=False):
 
         """
-        Returns the distance matrix using a given feature and distance metric
-        :param feature: string with the name of the feature to use
+        Returns the distance matrix using a given feature and distance metric. The metrics of the pairwise
+        distance engine (see abpytools.analysis.pairwise) are computed in tiles with numpy, levenshtein_distance
+        with an OpenMP kernel and user defined functions are called once for each pair. With multiprocessing
+        the tiles are computed by a process pool with a process per CPU (see ChainCollection.pairwise_distances).
+        :param feature: string with the name of the feature to use (see ChainCollection.composition), 'aligned'
+                        for the encoded numbering table, or a list with a vector for each sequence
         :param metric: string with the name of the metric to use
         :param multiprocessing: bool to turn multiprocessing on/off (True/False)
+        :param path: path to a .npy file, the tiles are written to a float32 numpy memmap which is resumed from
+                     the last completed tile if the computation is interrupted (see ChainCollection.pairwise_distances)
+        :param condensed: whether to write the condensed distance matrix to path instead of the square matrix
+        :param show_progressbar: whether to show the progress of the tiles written to path
         :return: list of lists with distances between all sequences of len(data) with each list of len(data)
-                 when i==j M_i,j = 0
+                 when i==j M_i,j = 0, or a read only numpy memmap if path is given
         """
 
-        if feature is None:
-            transformed_data = self.sequences
-        elif isinstance(feature, str):
-            # in this case the features are calculated using a predefined featurisation method (see self.composition)
-            transformed_data = self.composition(method=feature)
+        if callable(metric):
+            # user defined metric function
+            user_function_signature = signature(metric)
 
-        elif isinstance(feature, list):
-            # a user defined list with vectors
-            if len(feature) != self.n_ab:
-                raise ValueError("Expected a list of size {}, instead got {}.".format(self.n_ab, len(feature)))
-            else:
-                transformed_data = feature
-        else:
-            raise TypeError("Unexpected input for feature argument.")
+            # number of params should be two, can take args with defaults though
+            default_params = sum(['=' in x for x in user_function_signature.parameters])
 
-        if metric == 'cosine_similarity':
-            distances = self._run_distance_matrix(transformed_data, cosine_similarity, multiprocessing=multiprocessing)
+            if len(user_function_signature.parameters) - default_params > 2:
+                raise ValueError("Expected a function with two parameters")
 
-        elif metric == 'cosine_distance':
-            distances = self._run_distance_matrix(transformed_data, cosine_distance, multiprocessing=multiprocessing)
+        elif metric not in AVAILABLE_METRICS and metric != 'levenshtein_distance':
+            raise ValueError("Unknown distance metric.")
 
-        elif metric == 'hamming_distance':
-            # be careful hamming distance only works when all sequences have the same length
-            distances = self._run_distance_matrix(transformed_data, hamming_distance, multiprocessing=multiprocessing)
+        n_processes = None if multiprocessing else 1
 
-        elif metric == 'levenshtein_distance':
-            distances = self._run_distance_matrix(transformed_data, levenshtein_distance,
-                                                  multiprocessing=multiprocessing)
+        if path is not None:
+            return self.pairwise_distances(feature=feature, metric=metric, condensed=condensed,
+                                           n_processes=n_processes, path=path, show_progressbar=show_progressbar)
 
-        elif metric == 'euclidean_distance':
-            distances = self._run_distance_matrix(transformed_data, euclidean_distance, multiprocessing=multiprocessing)
+        if isinstance(metric, str):
+            return self.pairwise_distances(feature=feature, metric=metric, dtype=np.float64,
+                                           n_processes=n_processes).tolist()
 
-        elif metric == 'manhattan_distance':
-            distances = self._run_distance_matrix(transformed_data, manhattan_distance, multiprocessing=multiprocessing)
+        return self._run_distance_matrix(self._distance_features(feature, metric), metric,
+                                         multiprocessing=multiprocessing)
 
-        elif callable(metric):
-            # user defined metric function
-            user_function_signature = signature(metric)
+    def pairwise_distances(self, feature=None, metric='cosine_distance', condensed=False, dtype=np.float32,
+                           block_size=None, n_processes=1, path=None, show_progressbar=False,
+                           max_distance=None):
+        """
+        Returns the pairwise distances of all the sequences with the pairwise distance engine, which computes
+        each pair once in tiles of BLAS and numpy operations (see abpytools.analysis.pairwise).
 
-            # number of params should be two, can take args with defaults though
-            default_params = sum(['=' in x for x in user_function_signature.parameters])
+        Examples:
+            >>> distances = collection.pairwise_distances(feature='chou', metric='euclidean_distance')
+            >>> hamming = collection.pairwise_distances(feature='aligned', metric='hamming_distance', condensed=True)
+            >>> levenshtein = collection.pairwise_distances(metric='levenshtein_distance', condensed=True,
+            ...                                             path='levenshtein.npy', n_processes=None)
+            >>> within_two_edits = collection.pairwise_distances(metric='levenshtein_distance', max_distance=2) <= 2
 
-            if len(user_function_signature.parameters) - default_params > 2:
-                raise ValueError("Expected a function with two parameters")
+        Args:
+            feature (str or list): name of the feature (see ChainCollection.composition), 'aligned' for the encoded
+                                   numbering table, a list with a vector for each sequence, or None for the
+                                   encoded sequences, which must have the same length
+            metric (str or callable): one of abpytools.analysis.pairwise.AVAILABLE_METRICS, 'levenshtein_distance',
+                                      or a function that takes the features of two sequences
+            condensed (bool): whether to return the condensed distance matrix (upper triangle in row-major order,
+                              as scipy.spatial.distance.squareform) instead of the square matrix
+            dtype: dtype of the result
+            block_size (int): number of rows and columns of each tile, by default
+                              abpytools.analysis.pairwise.DEFAULT_BLOCK_SIZE, or smaller with more than one process
+                              so that the tiles are shared by all the processes
+            n_processes (int): number of processes of the pool that computes the tiles, with the features and the
+                               result in shared memory (see abpytools.analysis.pairwise.parallel_pairwise_distances),
+                               None for the number of CPUs
+            path (str): path to a .npy file, the tiles are streamed to a numpy memmap and a checkpoint file
+                        (path + '.checkpoint') so that an interrupted computation resumes from the last completed
+                        tile (see abpytools.analysis.pairwise.memmap_pairwise_distances)
+            show_progressbar (bool): whether to show the progress of the tiles written to path
+            max_distance (int): cutoff of the levenshtein distance, each pair stops as soon as its distance is
+                                greater than max_distance, which is then max_distance + 1 (e.g. to find the
+                                sequences within max_distance edits)
+
+        Returns:
+            numpy.ndarray: with shape (n_ab, n_ab), or (n_ab * (n_ab - 1) / 2,) if condensed is True, which is a
+                           read only numpy.memmap if path is given
+
+        """
+        # the levenshtein distance compares the encoded sequences with the batched OpenMP kernel
+        data = self._distance_features(feature, metric,
+                                       as_array=not callable(metric) and metric != 'levenshtein_distance')
+
+        if path is not None:
+            return memmap_pairwise_distances(data, path, metric=metric, condensed=condensed, block_size=block_size,
+                                             dtype=dtype, n_processes=n_processes,
+                                             show_progressbar=show_progressbar, max_distance=max_distance)
+
+        return pairwise_distances(data, metric=metric, condensed=condensed, block_size=block_size, dtype=dtype,
+                                  n_processes=n_processes, max_distance=max_distance)
+
+    def _distance_features(self, feature, metric, as_array=False):
+        # the data of each sequence that is compared by the distance metric
+        if feature is None:
+            if metric in ['hamming_distance', 'levenshtein_distance']:
+                transformed_data = list(self.encoded_sequences)
+                if as_array:
+                    if len(set(len(x) for x in transformed_data)) > 1:
+                        raise ValueError("The hamming distance requires sequences of the same length, "
+                                         "use feature='aligned' to compare the numbering tables")
+                    transformed_data = np.array(transformed_data, dtype=np.uint8).reshape(self.n_ab, -1)
+            elif as_array:
+                raise ValueError("The {} metric requires a feature".format(metric))
             else:
-                distances = self._run_distance_matrix(transformed_data, metric, multiprocessing=multiprocessing)
+                transformed_data = self.sequences
+
+        elif feature == 'aligned':
+            transformed_data = self.numbering_table(encoded=True)
+
+        elif isinstance(feature, str):
+            # in this case the features are calculated using a predefined featurisation method (see self.composition)
+            transformed_data = self.composition(method=feature)
 
+        elif isinstance(feature, list):
+            # a user defined list with vectors
+            if len(feature) != self.n_ab:
+                raise ValueError("Expected a list of size {}, instead got {}.".format(self.n_ab, len(feature)))
+            else:
+                transformed_data = feature
         else:
-            raise ValueError("Unknown distance metric.")
+            raise TypeError("Unexpected input for feature argument.")
 
-        return distances
+        if as_array:
+            return np.asarray(transformed_data)
+        return transformed_data
 
     def _run_distance_matrix(self, data, metric, multiprocessing=False):
 
@@ -521,70 +1171,95 @@ class ChainCollection(CollectionBase):
         """
 
         if multiprocessing:
-            with Manager() as manager:
-                cache = manager.dict()
-                matrix = manager.dict()
+            # the tiles of the upper triangle are computed by a process pool, see
+            # abpytools.analysis.pairwise.parallel_pairwise_distances
+            return pairwise_distances(data, metric=metric, dtype=np.float64, n_processes=None).tolist()
 
-                jobs = [Process(target=self._distance_matrix,
-                                args=(data, i, metric, cache, matrix)) for i in range(len(data))]
+        else:
+            # each pair is computed once, the matrix is symmetric
+            matrix = [[0] * len(data) for _ in range(len(data))]
+            for i in range(len(data)):
+                for j in range(i + 1, len(data)):
+                    matrix[i][j] = matrix[j][i] = metric(data[i], data[j])
 
-                for j in jobs:
-                    j.start()
-                for j in jobs:
-                    j.join()
+            return matrix
 
-                # order the data
-                return [matrix[x] for x in range(len(data))]
 
-        else:
-            cache = Cache(max_cache_size=(len(data) * (len(data) - 1)) / 2)
-            matrix = Cache(max_cache_size=len(data))
+def file_fingerprint(path, block_size=1 << 20):
+    """
+    Returns a hash of the contents of a file, which identifies the input of a checkpoint file.
 
-            for i in range(len(data)):
-                cache.update(i, self._distance_matrix(data, i, metric, cache, matrix))
+    Args:
+        path (str):
+        block_size (int): number of bytes read at once
 
-            return [matrix[x] for x in range(len(data))]
+    Returns:
+        str: hexadecimal SHA-1 digest
+    """
+    fingerprint = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            fingerprint.update(block)
+    return fingerprint.hexdigest()
 
-    @staticmethod
-    def _distance_matrix(data, i, metric, cache, matrix):
 
-        """
-        Function to calculate distance from the ith sequence of the ith row to the remaining entries in the same row
-        :param data: list with all sequences
-        :param i: int that indicates the matrix row being processed
-        :param metric: function that takes two string and calculates distance
-        :param cache: either a Manager or Cache object to cache results
-        :param matrix: either a Manager or Cache object to store results in a matrix
-        :return: None
-        """
-
-        row = []
-        seq_1 = data[i]
-        for j, seq_2 in enumerate(data):
-
-            if i == j:
-                row.append(0)
-                continue
-
-            keys = ('{}-{}'.format(i, j), '{}-{}'.format(j, i))
-            if keys[0] not in cache or keys[1] not in cache:
-                cache['{}-{}'.format(i, j)] = metric(seq_1, seq_2)
-            if keys[0] in cache:
-                row.append(cache[keys[0]])
-            elif keys[1] in cache:
-                row.append(cache[keys[0]])
-            else:
-                raise ValueError("Bug in row {} and column {}".format(i, j))
+def read_loading_checkpoint(checkpoint_path, header):
+    """
+    Reads the chunks stored in a checkpoint file written by ChainCollection.load_from_fasta_checkpointed.
+    If the file does not exist it is created with header. A chunk that was only partially written
+    (i.e. the process was killed while writing it) is removed from the file. A chunk that was written
+    more than once (i.e. after numbering its failed chains again) is read from its last line.
 
-        matrix[i] = row
+    Args:
+        checkpoint_path (str):
+        header (dict): parameters of the load, which must match the ones stored in the checkpoint
 
+    Returns:
+        dict: maps the index of each completed chunk to its records
+
+    """
+
+    if not os.path.isfile(checkpoint_path):
+        with open(checkpoint_path, 'w') as f:
+            f.write(json.dumps(header) + '\n')
+        return dict()
+
+    completed_chunks = dict()
+
+    with open(checkpoint_path, 'rb+') as f:
+        line = f.readline()
+        try:
+            checkpoint_header = json.loads(line)
+        except ValueError:
+            raise ValueError("{} is not a valid checkpoint file".format(checkpoint_path))
+        if checkpoint_header != header:
+            raise ValueError("Checkpoint file {} was created with different parameters ({}), "
+                             "remove it to start loading from the beginning".format(checkpoint_path,
+                                                                                   checkpoint_header))
+
+        end = f.tell()
+        for line in iter(f.readline, b''):
+            try:
+                chunk = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b'\n'):
+                break
+            completed_chunks[chunk['chunk']] = chunk['records']
+            end = f.tell()
 
-def load_antibody_object(antibody_object):
-    antibody_object.load()
+        f.truncate(end)
+
+    return completed_chunks
+
+
+def load_antibody_object(antibody_object, server=OPTION_FLAGS.ABYSIS):
+    antibody_object.load(server=server)
     return antibody_object
 
 
-def load_from_antibody_object(antibody_objects, show_progressbar=True, n_threads=20, verbose=True):
+def load_from_antibody_object(antibody_objects, show_progressbar=True, n_threads=20, verbose=True,
+                              server=OPTION_FLAGS.ABYSIS):
     """
 
     Args:
@@ -592,6 +1267,7 @@ def load_from_antibody_object(antibody_objects, show_progressbar=True, n_threads
         show_progressbar (bool):
         n_threads (int):
         verbose (bool):
+        server (str): name of the numbering backend
 
     Returns:
 
@@ -600,33 +1276,69 @@ def load_from_antibody_object(antibody_objects, show_progressbar=True, n_threads
     if verbose:
         print("Loading in antibody objects")
 
-    from queue import Queue
-    import threading
+    number_antibody_objects(antibody_objects, show_progressbar=show_progressbar, n_threads=n_threads,
+                            server=server)
+
+    return filter_loaded_antibody_objects(antibody_objects, verbose=verbose)
 
-    q = Queue()
-    for i in range(n_threads):
-        t = threading.Thread(target=worker, args=(q,))
-        t.daemon = True
-        t.start()
+
+def group_antibody_objects(antibody_objects):
+    """
+    Groups Chain objects by (sequence, numbering scheme), keeping the order of the first occurrence of each pair.
+
+    Args:
+        antibody_objects (list):
+
+    Returns:
+        dict: maps each (sequence, numbering scheme) pair to the list of Chain objects with it
+
+    """
+
+    groups = dict()
+    for antibody_object in antibody_objects:
+        groups.setdefault((antibody_object.sequence, antibody_object.numbering_scheme), []).append(antibody_object)
+
+    return groups
+
+
+def number_antibody_objects(antibody_objects, show_progressbar=True, n_threads=20, server=OPTION_FLAGS.ABYSIS):
+    """
+    Loads each Chain object in antibody_objects in place with the executor shared by all loads
+    (see abpytools.utils.get_loading_executor).
+
+    Args:
+        antibody_objects (list):
+        show_progressbar (bool):
+        n_threads (int): maximum number of Chain objects of this call that are loaded concurrently,
+                         which is also bounded by the number of workers of the executor
+        server (str): name of the numbering backend
+
+    Returns:
+
+    """
+
+    results = get_loading_executor().map(partial(load_antibody_object, server=server), antibody_objects,
+                                         max_in_flight=n_threads)
 
     if show_progressbar:
-        for antibody_object in tqdm(antibody_objects):
-            q.put(antibody_object)
+        results = progressbar(results, total=len(antibody_objects))
 
-    else:
-        for antibody_object in antibody_objects:
-            q.put(antibody_object)
+    for _ in results:
+        pass
 
-    q.join()
 
-    # if show_progressbar:
-    #     aprun = parallelexecutor(use_bar='tqdm', n_jobs=n_jobs, timeout=timeout)
-    # else:
-    #     aprun = parallelexecutor(use_bar='None', n_jobs=n_jobs, timeout=timeout)
-    #
-    # # load in objects in parallel
-    # antibody_objects = aprun(total=len(antibody_objects))(
-    #     delayed(load_antibody_object)(obj) for obj in antibody_objects)
+def filter_loaded_antibody_objects(antibody_objects, verbose=True):
+    """
+    Removes the Chain objects that failed to load and determines the chain type of the remaining objects.
+
+    Args:
+        antibody_objects (list):
+        verbose (bool):
+
+    Returns:
+        tuple: the list of loaded objects and their chain type
+
+    """
 
     status = [x.status for x in antibody_objects]
     failed = sum([1 if x == 'Not Loaded' or x == 'Failed' else 0 for x in status])
@@ -734,13 +1446,6 @@ def load_igblast_query(igblast_result, names):
     return result_dict
 
 
-def worker(q):
-    while True:
-        item = q.get()
-        load_antibody_object(item)
-        q.task_done()
-
-
 def make_fasta(names, sequences):
     file_string = ''
     for name, sequence in zip(names, sequences):
@@ -0,0 +1,613 @@
+import numpy as np
+from .chain import Chain
+from .flags import *
+from ..utils import get_reference_bundle
+from ..utils.encoding import encode_ascii, residue_table_from_ascii, ALPHABET_SIZE, GAP_CODE
+
+# the status and chain type of each chain are stored as the index in these tuples
+STATUS_CODES = (NUMBERING_FLAGS.NOT_LOADED, NUMBERING_FLAGS.LOADED, NUMBERING_FLAGS.FAILED,
+                NUMBERING_FLAGS.UNNUMBERED)
+CHAIN_CODES = (None, CHAIN_FLAGS.HEAVY_CHAIN, CHAIN_FLAGS.LIGHT_CHAIN, CHAIN_FLAGS.UNKNOWN_CHAIN)
+
+
+class SegmentedArray:
+    """
+    A list of variable length arrays stored in one contiguous array (values) and the offsets of each segment,
+    so that segment i is values[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, values, offsets):
+        """
+
+        Args:
+            values (numpy.ndarray): concatenated segments
+            offsets (numpy.ndarray): int64 array with n_segments + 1 offsets, starting with 0
+        """
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings, encoding='ascii'):
+        """
+        Returns a SegmentedArray with the encoded bytes of each string in a uint8 array.
+
+        Args:
+            strings (list):
+            encoding (str):
+
+        Returns:
+            SegmentedArray
+        """
+        encoded = [x.encode(encoding) for x in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(x) for x in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    @classmethod
+    def from_arrays(cls, arrays, dtype=np.uint8):
+        """
+        Returns a SegmentedArray with each array as a segment.
+
+        Args:
+            arrays (list): numpy arrays
+            dtype: dtype of the values, used when arrays is empty
+
+        Returns:
+            SegmentedArray
+        """
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum([len(x) for x in arrays], out=offsets[1:])
+        return cls(np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype), offsets)
+
+    @classmethod
+    def concatenate(cls, arrays):
+        """
+        Returns a SegmentedArray with the segments of all arrays.
+
+        Args:
+            arrays (list): SegmentedArray objects with values of the same dtype
+
+        Returns:
+            SegmentedArray
+        """
+        offsets = [np.zeros(1, dtype=np.int64)]
+        shift = 0
+        for array in arrays:
+            offsets.append(array.offsets[1:] + shift)
+            shift += array.offsets[-1]
+        return cls(np.concatenate([x.values for x in arrays]), np.concatenate(offsets))
+
+    @classmethod
+    def from_slices(cls, values, starts, stops):
+        """
+        Returns a SegmentedArray with the slices values[starts[i]:stops[i]] as segments.
+
+        Args:
+            values (numpy.ndarray):
+            starts (numpy.ndarray): int array
+            stops (numpy.ndarray): int array
+
+        Returns:
+            SegmentedArray
+        """
+        lengths = np.asarray(stops, dtype=np.int64) - starts
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(values[np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])], offsets)
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def segment_index(self):
+        """
+        Returns the index of the segment of each value.
+
+        Returns:
+            numpy.ndarray
+        """
+        return np.repeat(np.arange(len(self), dtype=np.int64), self.lengths)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.offsets.nbytes
+
+    def take(self, indices):
+        """
+        Returns a SegmentedArray with the segments in indices, in the same order.
+
+        Args:
+            indices (numpy.ndarray): int array
+
+        Returns:
+            SegmentedArray
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = self.lengths[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # position of each value of the new array in the current array
+        source = np.repeat(self.offsets[:-1][indices] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return SegmentedArray(self.values[source], offsets)
+
+    def segment_sum(self, values=None):
+        """
+        Returns the sum of each segment of values, which by default are the values of the array.
+
+        Args:
+            values (numpy.ndarray): array with the same length as SegmentedArray.values
+
+        Returns:
+            numpy.ndarray
+        """
+        values = self.values if values is None else values
+        # a zero is appended so that empty segments at the end have a valid start index
+        sums = np.add.reduceat(np.append(values, 0), self.offsets[:-1])
+        sums[self.lengths == 0] = 0
+        return sums
+
+    def chunks(self, chunk_size):
+        """
+        Iterates over consecutive blocks of at most chunk_size segments, i.e. to bound the memory of the
+        temporary arrays of an operation over all the values.
+
+        Args:
+            chunk_size (int): number of segments of each block
+
+        Returns:
+            generator: (start, stop, SegmentedArray) with the segments [start, stop)
+        """
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            yield start, stop, SegmentedArray(self.values[self.offsets[start]:self.offsets[stop]],
+                                              self.offsets[start:stop + 1] - self.offsets[start])
+
+    def to_string(self, index, encoding='ascii'):
+        return self[index].tobytes().decode(encoding)
+
+    def __getitem__(self, index):
+        return self.values[self.offsets[index]:self.offsets[index + 1]]
+
+    def prefix_index(self, lengths):
+        """
+        Returns the index in values of the first lengths[i] values of each segment i.
+
+        Args:
+            lengths (numpy.ndarray): int array, with lengths[i] <= self.lengths[i]
+
+        Returns:
+            numpy.ndarray
+        """
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return np.repeat(self.offsets[:-1] - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def numbering_matrix(numbering, sequences, n_positions, fill=GAP_CODE):
+    """
+    Returns the numbering table of a list of sequences as a (n_sequences, n_positions) uint8 matrix with the
+    residue code (see abpytools.utils.encoding) of each position of the numbering scheme, filled with a
+    single scatter.
+
+    Args:
+        numbering (SegmentedArray): position codes of each sequence, negative codes are ignored
+        sequences (SegmentedArray): encoded sequences, the numbering covers the first residues of each sequence
+        n_positions (int): number of positions of the numbering scheme
+        fill (int): code of the positions without a residue
+
+    Returns:
+        numpy.ndarray
+    """
+    matrix = np.full((len(numbering), n_positions), fill, dtype=np.uint8)
+    residues = sequences.values[sequences.prefix_index(numbering.lengths)]
+    numbered = numbering.values >= 0
+    matrix[numbering.segment_index[numbered], numbering.values[numbered]] = residues[numbered]
+    return matrix
+
+
+def region_offsets(numbering, sequences, region_slices, n_positions, chunk_size=1 << 16):
+    """
+    Returns the offsets of the residues of each region in the buffer of the sequences, so that the sequence
+    of region j of chain i is sequences.values[offsets[i, j, 0]:offsets[i, j, 1]]. Since the numbering of each
+    chain is in the order of the numbering scheme, the first residue of a region is found with a binary
+    search of the position code of the start of the region in the numbering of all the chains at once.
+
+    Args:
+        numbering (SegmentedArray): position codes of each sequence, the numbering covers the first residues
+                                    of each sequence
+        sequences (SegmentedArray): encoded sequences
+        region_slices (numpy.ndarray): int array with shape (n_regions, 2) with the [start, stop) position
+                                       codes of each region (see ReferenceBundle.region_slices)
+        n_positions (int): number of positions of the numbering scheme
+        chunk_size (int): number of chains searched at once
+
+    Returns:
+        numpy.ndarray: int64 array with shape (n_chains, n_regions, 2)
+    """
+    region_slices = np.asarray(region_slices, dtype=np.int64)
+    offsets = np.empty((len(numbering), len(region_slices), 2), dtype=np.int64)
+    for start, stop, chunk in numbering.chunks(chunk_size):
+        codes = chunk.values.astype(np.int64)
+        if codes.size > 0 and codes.min() < 0:
+            raise ValueError("Cannot find the regions of a numbering with positions of an unknown numbering scheme")
+        # the keys increase with the position in the chunk as long as the position codes of each chain increase
+        keys = chunk.segment_index * n_positions + codes
+        if np.any(np.diff(keys) <= 0):
+            raise ValueError("The numbering is not in the order of the numbering scheme")
+        chain_keys = np.arange(stop - start, dtype=np.int64)[:, np.newaxis, np.newaxis] * n_positions
+        residues = np.searchsorted(keys, chain_keys + region_slices) - chunk.offsets[:-1, np.newaxis, np.newaxis]
+        offsets[start:stop] = sequences.offsets[start:stop, np.newaxis, np.newaxis] + residues
+    return offsets
+
+
+def hydrophobicity_tensor(matrix, hydrophobicity_scores, dtype=np.float32):
+    """
+    Returns the hydrophobicity of each position of an encoded numbering table (see numbering_matrix) for
+    several hydrophobicity scales at once, by mapping the table through a (n_scales, n_residue_codes) lookup
+    table. The positions without a residue are zero.
+
+    Args:
+        matrix (numpy.ndarray): uint8 numbering table with shape (n_chains, n_positions) filled with GAP_CODE
+        hydrophobicity_scores (list): hydrophobicity scales, i.e. [HYDROPHOBICITY_FLAGS.EW]
+        dtype: dtype of the result
+
+    Returns:
+        numpy.ndarray: with shape (n_scales, n_chains, n_positions)
+    """
+    unavailable = [x for x in hydrophobicity_scores if x not in OPTION_FLAGS.AVAILABLE_HYDROPHOBITY_SCORES]
+    if unavailable:
+        raise ValueError("Chosen hydrophobicity scores ({}) not available. Available hydrophobicity scores: {}".format(
+            ', '.join(unavailable), ' ,'.join(OPTION_FLAGS.AVAILABLE_HYDROPHOBITY_SCORES)))
+
+    bundle = get_reference_bundle()
+    lookup = np.empty((len(hydrophobicity_scores), ALPHABET_SIZE), dtype=dtype)
+    for i, scale in enumerate(hydrophobicity_scores):
+        lookup[i] = residue_table_from_ascii(bundle.amino_acid_table('hydrophobicity', scale + 'Hydrophobicity'))
+    lookup[:, GAP_CODE] = 0
+
+    return lookup[:, matrix]
+
+
+class ChainStore:
+    """
+    Columnar (struct-of-arrays) storage of a list of Chain objects.
+
+    Instead of a Chain object per sequence, a ChainStore keeps one array per attribute:
+        - names and sequences: uint8 buffers with the offsets of each string
+        - numbering: int16 position codes (see ReferenceBundle.position_codes) with the offsets of each chain,
+          the chains that have not been numbered have an empty segment
+        - status and chain type: int8 codes (see STATUS_CODES and CHAIN_CODES)
+        - mw and pI: float64 arrays, NaN for chains that are not loaded
+
+    The hydrophobicity matrix and the CDR/FR indices of a chain are not stored, since they are derived from the
+    numbering. Chain objects are created on demand with ChainStore.to_chain.
+
+    Examples:
+        >>> from abpytools.core.chain_store import ChainStore
+        >>> store = ChainStore.from_chains(chain_collection.antibody_objects)
+        >>> store.to_chain(0)
+    """
+
+    def __init__(self, names, sequences, numbering, status, chains, mw, pI, numbering_scheme,
+                 germline=None, germline_identity=None):
+        """
+
+        Args:
+            names (SegmentedArray): utf-8 encoded names
+            sequences (SegmentedArray): ASCII encoded sequences
+            numbering (SegmentedArray): int16 position codes
+            status (numpy.ndarray): int8 status codes
+            chains (numpy.ndarray): int8 chain type codes
+            mw (numpy.ndarray): float64
+            pI (numpy.ndarray): float64
+            numbering_scheme (str):
+            germline (dict): germline of the chains that have one, by index
+            germline_identity (dict): germline identity of the chains that have one, by index
+        """
+        self._names = names
+        self._sequences = sequences
+        self._numbering = numbering
+        self._status = status
+        self._chains = chains
+        self._mw = mw
+        self._pI = pI
+        self._numbering_scheme = numbering_scheme
+        self._germline = dict() if germline is None else germline
+        self._germline_identity = dict() if germline_identity is None else germline_identity
+        self._encoded_sequences = None
+        self._numbering_matrices = dict()
+
+    @classmethod
+    def from_chains(cls, chains, numbering_scheme=None):
+        """
+        Returns a ChainStore with the data of a list of Chain objects.
+
+        Args:
+            chains (list): Chain objects with the same numbering scheme
+            numbering_scheme (str): numbering scheme of the chains, only required if chains is empty
+
+        Returns:
+            ChainStore
+        """
+        if numbering_scheme is None:
+            numbering_scheme = chains[0].numbering_scheme if len(chains) > 0 else NUMBERING_FLAGS.CHOTHIA
+        if any(x.numbering_scheme != numbering_scheme for x in chains):
+            raise ValueError("ChainStore only supports Chain objects with the same numbering scheme.")
+
+        n = len(chains)
+        status = np.empty(n, dtype=np.int8)
+        chain_types = np.empty(n, dtype=np.int8)
+        mw = np.full(n, np.nan)
+        pI = np.full(n, np.nan)
+        numbering_lengths = np.zeros(n, dtype=np.int64)
+        numbering = []
+        germline = dict()
+        germline_identity = dict()
+
+        for i, chain in enumerate(chains):
+            if chain.status not in STATUS_CODES or chain.chain not in CHAIN_CODES:
+                raise ValueError("Unknown loading status ({}) or chain type ({})".format(chain.status, chain.chain))
+            status[i] = STATUS_CODES.index(chain.status)
+            chain_types[i] = CHAIN_CODES.index(chain.chain)
+            if chain.mw is not None:
+                mw[i] = chain.mw
+            if chain.pI is not None:
+                pI[i] = chain.pI
+            if chain.numbering is not None:
+                # the residues after the numbered region of the sequence (if any) have no position
+                if len(chain.numbering) > len(chain.sequence):
+                    raise ValueError("The numbering of {} is longer than its sequence".format(chain.name))
+                try:
+                    numbering_codes = chain.numbering_codes
+                except ValueError:
+                    numbering_codes = None
+                if numbering_codes is None or np.any(numbering_codes < 0):
+                    raise ValueError("The numbering of {} does not follow the {} numbering scheme".format(
+                        chain.name, numbering_scheme))
+                numbering.append(numbering_codes)
+                numbering_lengths[i] = len(chain.numbering)
+            if chain.germline:
+                germline[i] = chain.germline
+            if chain.germline_identity:
+                germline_identity[i] = chain.germline_identity
+
+        numbering_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(numbering_lengths, out=numbering_offsets[1:])
+        numbering_values = np.concatenate(numbering) if numbering else np.zeros(0, dtype=np.int16)
+
+        return cls(names=SegmentedArray.from_strings([x.name for x in chains], encoding='utf-8'),
+                   sequences=SegmentedArray.from_strings([x.sequence for x in chains]),
+                   numbering=SegmentedArray(numbering_values, numbering_offsets),
+                   status=status, chains=chain_types, mw=mw, pI=pI, numbering_scheme=numbering_scheme,
+                   germline=germline, germline_identity=germline_identity)
+
+    @classmethod
+    def concatenate(cls, stores):
+        """
+        Returns a ChainStore with the chains of all stores.
+
+        Args:
+            stores (list): ChainStore objects with the same numbering scheme
+
+        Returns:
+            ChainStore
+        """
+        if len(set(x.numbering_scheme for x in stores)) != 1:
+            raise ValueError("Concatenation requires ChainStore objects to use the same numbering scheme.")
+
+        germline, germline_identity = dict(), dict()
+        shift = 0
+        for store in stores:
+            germline.update({i + shift: x for i, x in store._germline.items()})
+            germline_identity.update({i + shift: x for i, x in store._germline_identity.items()})
+            shift += len(store)
+
+        return cls(names=SegmentedArray.concatenate([x._names for x in stores]),
+                   sequences=SegmentedArray.concatenate([x._sequences for x in stores]),
+                   numbering=SegmentedArray.concatenate([x._numbering for x in stores]),
+                   status=np.concatenate([x._status for x in stores]),
+                   chains=np.concatenate([x._chains for x in stores]),
+                   mw=np.concatenate([x._mw for x in stores]),
+                   pI=np.concatenate([x._pI for x in stores]),
+                   numbering_scheme=stores[0].numbering_scheme,
+                   germline=germline, germline_identity=germline_identity)
+
+    def take(self, indices):
+        """
+        Returns a ChainStore with the chains in indices, in the same order.
+
+        Args:
+            indices: list or int array
+
+        Returns:
+            ChainStore
+        """
+        indices = np.arange(len(self))[np.asarray(indices, dtype=np.int64)]
+        new_index = {old: new for new, old in enumerate(indices.tolist())}
+        return ChainStore(names=self._names.take(indices), sequences=self._sequences.take(indices),
+                          numbering=self._numbering.take(indices), status=self._status[indices],
+                          chains=self._chains[indices], mw=self._mw[indices], pI=self._pI[indices],
+                          numbering_scheme=self._numbering_scheme,
+                          germline={new_index[i]: x for i, x in self._germline.items() if i in new_index},
+                          germline_identity={new_index[i]: x for i, x in self._germline_identity.items()
+                                             if i in new_index})
+
+    def to_chain(self, index):
+        """
+        Returns a new Chain object with the data of chain index.
+
+        Args:
+            index (int):
+
+        Returns:
+            Chain
+        """
+        chain = Chain(sequence=self.sequence(index), name=self.name(index), numbering_scheme=self._numbering_scheme)
+        chain._loading_status = STATUS_CODES[self._status[index]]
+        chain._chain = CHAIN_CODES[self._chains[index]]
+        chain.numbering = self.numbering(index)
+        if chain.numbering is not None:
+            chain._numbering_codes = ((self._numbering_scheme, chain.chain), self._numbering[index].copy())
+        if not np.isnan(self._mw[index]):
+            chain.mw = float(self._mw[index])
+        if not np.isnan(self._pI[index]):
+            chain.pI = float(self._pI[index])
+        if chain.status == NUMBERING_FLAGS.LOADED:
+            chain.hydrophobicity_matrix = self._hydrophobicity_matrix([index], chain.chain)[0]
+            chain.cdr = chain.ab_regions()
+        chain.germline = self._germline.get(index, tuple())
+        chain.germline_identity = self._germline_identity.get(index, dict())
+        return chain
+
+    def set_germline(self, index, germline, germline_identity):
+        self._germline[index] = germline
+        self._germline_identity[index] = germline_identity
+
+    def name(self, index):
+        return self._names.to_string(index, encoding='utf-8')
+
+    def sequence(self, index):
+        return self._sequences.to_string(index)
+
+    def numbering(self, index):
+        """
+        Returns the numbering of chain index as a list of position names, or None if it has not been numbered.
+
+        Args:
+            index (int):
+
+        Returns:
+            list
+        """
+        if self._numbering.lengths[index] == 0 and len(self._sequences[index]) > 0:
+            return None
+        positions = get_reference_bundle().positions(self._numbering_scheme, CHAIN_CODES[self._chains[index]])
+        return positions[self._numbering[index]].tolist()
+
+    def _hydrophobicity_matrix(self, indices, chain, hydrophobicity_scores=HYDROPHOBICITY_FLAGS.EW):
+        bundle = get_reference_bundle()
+        n_positions = len(bundle.positions(self._numbering_scheme, chain))
+        table = bundle.amino_acid_table('hydrophobicity', hydrophobicity_scores + 'Hydrophobicity')
+
+        sequences = self._sequences.take(indices)
+        numbering = self._numbering.take(indices)
+
+        matrix = np.zeros((len(numbering), n_positions))
+        # the numbered residues are the first numbering.lengths residues of each sequence
+        residues = sequences.prefix_index(numbering.lengths)
+        matrix[numbering.segment_index, numbering.values] = table[sequences.values[residues]]
+        return matrix
+
+    def numbering_matrix(self, chain, fill=GAP_CODE):
+        """
+        Returns the encoded numbering table of all the sequences, which must have been numbered with
+        the same chain type (see abpytools.core.chain_store.numbering_matrix). The table is computed once
+        and cached, so that tables of different regions are column selections of the same matrix.
+
+        Args:
+            chain (str): chain type of the sequences
+            fill (int): code of the positions without a residue
+
+        Returns:
+            numpy.ndarray: read-only uint8 matrix with shape (n_chains, n_positions)
+        """
+        key = (chain, fill)
+        if key not in self._numbering_matrices:
+            n_positions = len(get_reference_bundle().positions(self._numbering_scheme, chain))
+            matrix = numbering_matrix(self._numbering, self.encoded_sequences, n_positions, fill=fill)
+            matrix.setflags(write=False)
+            self._numbering_matrices[key] = matrix
+        return self._numbering_matrices[key]
+
+    @property
+    def names(self):
+        return [self.name(i) for i in range(len(self))]
+
+    @property
+    def sequences(self):
+        values = self._sequences.values.tobytes().decode('ascii')
+        offsets = self._sequences.offsets.tolist()
+        return [values[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+
+    @property
+    def encoded_sequences(self):
+        """
+        The sequences in the canonical uint8 residue encoding (see abpytools.utils.encoding), which are
+        encoded once and cached.
+
+        Returns:
+            SegmentedArray
+        """
+        if self._encoded_sequences is None:
+            self._encoded_sequences = SegmentedArray(encode_ascii(self._sequences.values), self._sequences.offsets)
+        return self._encoded_sequences
+
+    @property
+    def lengths(self):
+        return self._sequences.lengths
+
+    @property
+    def numbering_codes(self):
+        """
+        The int16 position codes of each chain (see ReferenceBundle.position_codes).
+
+        Returns:
+            SegmentedArray
+        """
+        return self._numbering
+
+    @property
+    def status(self):
+        return [STATUS_CODES[x] for x in self._status]
+
+    @property
+    def chains(self):
+        return [CHAIN_CODES[x] for x in self._chains]
+
+    @property
+    def mw(self):
+        return self._mw
+
+    @property
+    def pI(self):
+        return self._pI
+
+    @property
+    def germline(self):
+        return self._germline
+
+    @property
+    def germline_identity(self):
+        return self._germline_identity
+
+    @property
+    def numbering_scheme(self):
+        return self._numbering_scheme
+
+    @property
+    def nbytes(self):
+        """
+        Returns the memory used by the arrays of the store in bytes.
+
+        Returns:
+            int
+        """
+        return self._names.nbytes + self._sequences.nbytes + self._numbering.nbytes + self._status.nbytes + \
+            self._chains.nbytes + self._mw.nbytes + self._pI.nbytes
+
+    def _string_summary_basic(self):
+        return "abpytools.ChainStore Number of sequences: {}, Size: {} bytes".format(len(self), self.nbytes)
+
+    def __repr__(self):
+        return "<%s at 0x%02x>" % (self._string_summary_basic(), id(self))
+
+    def __len__(self):
+        return len(self._status)
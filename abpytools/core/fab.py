@@ -1,7 +1,7 @@
 from .chain_collection import Chain, ChainCollection
 import numpy as np
 from .chain import calculate_charge
-from abpytools.utils import DataLoader
+from .properties import get_pka_values
 from .helper_functions import germline_identity_pd, to_numbering_table
 
 
@@ -87,8 +87,7 @@ class Fab:
             "Selected pI database {} not available. Available databases: {}".format(pka_database,
                                                                                     ', '.join(available_pi_databases))
 
-        data_loader = DataLoader(data_type='AminoAcidProperties', data=['pI', pka_database])
-        pka_data = data_loader.get_data()
+        pka_data = get_pka_values(pka_database)
 
         return calculate_charge(sequence=self.sequence, ph=ph, pka_values=pka_data)
 
@@ -1,8 +1,8 @@
 from .chain_collection import ChainCollection
 import numpy as np
-import pandas as pd
 from .chain import calculate_charge
-from abpytools.utils import DataLoader
+from .properties import get_pka_values
+from abpytools.utils import lazy_import
 from operator import itemgetter
 from .fab import Fab
 from .helper_functions import germline_identity_pd, to_numbering_table
@@ -13,8 +13,7 @@ from .utils import (json_FabCollection_formatter, pb2_FabCollection_formatter, p
                     json_FabCollection_parser)
 from .flags import *
 
-if BACKEND_FLAGS.HAS_PROTO:
-    from abpytools.core.formats import FabCollectionProto
+pd = lazy_import('pandas')
 
 
 class FabCollection(CollectionBase):
@@ -132,8 +131,7 @@ class FabCollection(CollectionBase):
             "Selected pI database {} not available. Available databases: {}".format(pka_database,
                                                                                     ' ,'.join(available_pi_databases))
 
-        data_loader = DataLoader(data_type='AminoAcidProperties', data=['pI', pka_database])
-        pka_data = data_loader.get_data()
+        pka_data = get_pka_values(pka_database)
 
         return [calculate_charge(sequence=seq, ph=ph, pka_values=pka_data) for seq in self.sequences]
 
@@ -192,6 +190,7 @@ class FabCollection(CollectionBase):
             json.dump(fab_data, f, indent=2)
 
     def save_to_pb2(self, path, update=True):
+        from abpytools.core.formats import FabCollectionProto
         proto_parser = FabCollectionProto()
         try:
             with open(os.path.join(path + '.pb2'), 'rb') as f:
@@ -221,6 +220,7 @@ class FabCollection(CollectionBase):
 
     @classmethod
     def load_from_pb2(cls, path, n_threads=20, verbose=True, show_progressbar=True):
+        from abpytools.core.formats import FabCollectionProto
         with open(path, 'rb') as f:
             proto_parser = FabCollectionProto()
             proto_parser.ParseFromString(f.read())
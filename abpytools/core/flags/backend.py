@@ -1,7 +1,18 @@
 import configparser
 from abpytools.home import Home
 
-config = configparser.ConfigParser()
-config.read(f"{Home().homedir}/config.ini")
 
-HAS_PROTO = True if config["PROTOBUF"]['protobuf'] == '1' else False
+def _read_config():
+    config = configparser.ConfigParser()
+    config.read(f"{Home().homedir}/config.ini")
+    return config
+
+
+def __getattr__(name):
+    # config.ini is only read when one of the backend flags is first used
+    if name == 'HAS_PROTO':
+        config = _read_config()
+        value = True if config["PROTOBUF"]['protobuf'] == '1' else False
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
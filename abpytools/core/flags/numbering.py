@@ -11,3 +11,4 @@ CHOTHIA_EXT = "chothia_ext"
 MARTIN = "chothia_ext"
 # servers
 ABYSIS = "abysis"
+LOCAL = "local"
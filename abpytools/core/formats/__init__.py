@@ -1,7 +1,16 @@
-from ..flags.backend import HAS_PROTO
+# the protobuf modules are only imported when they are first used
+_PROTO_MESSAGES = {'ChainProto': ('.chain_pb2', 'Chain'),
+                   'ChainCollectionProto': ('.chain_pb2', 'ChainCollection'),
+                   'FabProto': ('.fab_pb2', 'Fab'),
+                   'FabCollectionProto': ('.fab_pb2', 'FabCollection')}
 
-if HAS_PROTO:
-  from .chain_pb2 import Chain as ChainProto
-  from .chain_pb2 import ChainCollection as ChainCollectionProto
-  from .fab_pb2 import Fab as FabProto
-  from .fab_pb2 import FabCollection as FabCollectionProto
+
+def __getattr__(name):
+    from ..flags.backend import HAS_PROTO
+    if HAS_PROTO and name in _PROTO_MESSAGES:
+        import importlib
+        module_name, message = _PROTO_MESSAGES[name]
+        value = getattr(importlib.import_module(module_name, __name__), message)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -1,6 +1,4 @@
 from ..flags import *
-if BACKEND_FLAGS.HAS_PROTO:
-    from . import ChainProto
 
 def get_protobuf_numbering_scheme(numbering_scheme):
     """
@@ -11,6 +9,7 @@ def get_protobuf_numbering_scheme(numbering_scheme):
     Returns:
 
     """
+    from . import ChainProto
     if numbering_scheme == NUMBERING_FLAGS.KABAT:
         proto_numbering_scheme = ChainProto.KABAT
     elif numbering_scheme == NUMBERING_FLAGS.CHOTHIA:
@@ -33,6 +32,7 @@ def get_numbering_scheme_from_protobuf(proto_numbering_scheme):
     Returns:
 
     """
+    from . import ChainProto
     if proto_numbering_scheme == ChainProto.KABAT:
         numbering_scheme = NUMBERING_FLAGS.KABAT
     elif proto_numbering_scheme == ChainProto.CHOTHIA:
@@ -1,37 +1,151 @@
-from ..utils import DataLoader
+from ..utils import get_reference_bundle, lazy_import
+from .cache import Cache
 import itertools
-import pandas as pd
+import threading
 import numpy as np
 
+pd = lazy_import('pandas')
+
 
 available_regions = ['FR1', 'CDR1', 'FR2', 'CDR2', 'FR3', 'CDR3', 'FR4']
 
 
 def numbering_table_sequences(region, numbering_scheme, chain):
-    # next two conditionals are used to only extract the needed data with FR and CDR positions
-    # it makes the loading of the data quicker when there are only CDRs or FRs
-    if any([True if x.startswith('CDR') else False for x in region]):
-        cdr_list = DataLoader(data_type='CDR_positions',
-                              data=[numbering_scheme, chain])
-        cdrs = cdr_list.get_data()
-    else:
-        cdrs = {}
+    """
+    Returns a dictionary with the positions of each region and a list with the positions of all regions,
+    in the order of the numbering table columns.
+
+    Args:
+        region (list): regions returned by numbering_table_region
+        numbering_scheme (str):
+        chain (str):
+
+    Returns:
+        tuple
+
+    """
+    layout = get_numbering_table_layout(region, numbering_scheme, chain)
+    return layout.whole_sequence_dict, layout.whole_sequence
 
-    if any([True if x.startswith('FR') else False for x in region]):
-        fr_list = DataLoader(data_type='Framework_positions',
-                             data=[numbering_scheme, chain])
-        frs = fr_list.get_data()
-    else:
-        frs = {}
 
-    # pack it all up into a single dictionary
-    whole_sequence_dict = {**cdrs, **frs}
-    # get the sequence list in the correct order (since region has been sorted before)
-    whole_sequence_list = [whole_sequence_dict[x] for x in region]
-    # unpack whole_sequence_list into a single list
-    whole_sequence = list(itertools.chain.from_iterable(whole_sequence_list))
+def numbering_position_codes(numbering, numbering_scheme, chain):
+    """
+    Returns the integer code of each position of numbering, which is its column in the numbering scheme
+    (see ReferenceBundle.position_codes).
+
+    Args:
+        numbering (list): position names, i.e. ['H1', 'H2', ...]
+        numbering_scheme (str):
+        chain (str):
+
+    Returns:
+        numpy.ndarray: int16 codes, -1 for the positions that are not in the numbering scheme
 
-    return whole_sequence_dict, whole_sequence
+    """
+    position_codes = get_reference_bundle().position_codes(numbering_scheme, chain)
+    return np.fromiter((position_codes.get(x, -1) for x in numbering), dtype=np.int16, count=len(numbering))
+
+
+class NumberingTableLayout:
+    """
+    Columns of a numbering table with the positions of some regions of a numbering scheme. The layouts are
+    cached (see get_numbering_table_layout), so that the columns and the pandas.MultiIndex of a numbering table
+    are only computed once for each numbering scheme, chain and regions.
+    """
+
+    def __init__(self, region, numbering_scheme, chain):
+        """
+
+        Args:
+            region (list): regions returned by numbering_table_region
+            numbering_scheme (str):
+            chain (str):
+        """
+        bundle = get_reference_bundle()
+        region_slices = bundle.region_slices(numbering_scheme, chain)
+        positions = bundle.positions(numbering_scheme, chain)
+
+        self._region = tuple(region)
+        self._numbering_scheme = numbering_scheme
+        self._chain = chain
+        self._whole_sequence_dict = {x: positions[slice(*region_slices[x])].tolist() for x in region}
+
+        # position code of each column
+        self._columns = np.concatenate([np.arange(*region_slices[x]) for x in region])
+        self._columns.setflags(write=False)
+
+        self._multi_index = None
+
+    @property
+    def region(self):
+        return list(self._region)
+
+    @property
+    def columns(self):
+        """
+        The position code of each column of the table (see ReferenceBundle.positions).
+
+        Returns:
+            numpy.ndarray
+        """
+        return self._columns
+
+    @property
+    def whole_sequence(self):
+        """
+        The position name of each column of the table.
+
+        Returns:
+            list
+        """
+        return list(itertools.chain.from_iterable(self._whole_sequence_dict.values()))
+
+    @property
+    def whole_sequence_dict(self):
+        return self._whole_sequence_dict
+
+    @property
+    def multi_index(self):
+        # built on first access, since pandas is only imported when a DataFrame is requested
+        if self._multi_index is None:
+            self._multi_index = numbering_table_multiindex(region=list(self._region),
+                                                           whole_sequence_dict=self._whole_sequence_dict)
+        return self._multi_index
+
+    def _string_summary_basic(self):
+        return "abpytools.NumberingTableLayout Numbering scheme: {}, Chain type: {}, Regions: {}".format(
+            self._numbering_scheme, self._chain, ', '.join(self._region))
+
+    def __repr__(self):
+        return "<%s at 0x%02x>" % (self._string_summary_basic(), id(self))
+
+    def __len__(self):
+        return len(self._columns)
+
+
+_NUMBERING_TABLE_LAYOUTS = Cache(max_cache_size=64)
+_NUMBERING_TABLE_LAYOUTS_LOCK = threading.Lock()
+
+
+def get_numbering_table_layout(region, numbering_scheme, chain):
+    """
+    Returns the cached NumberingTableLayout of the numbering table with the positions of region.
+
+    Args:
+        region (str or list): 'all' or the regions to include, i.e. ['CDR1', 'CDR2']
+        numbering_scheme (str):
+        chain (str):
+
+    Returns:
+        NumberingTableLayout
+
+    """
+    region = numbering_table_region(list(region) if isinstance(region, (list, tuple)) else region)
+    key = (numbering_scheme, chain, tuple(region))
+    with _NUMBERING_TABLE_LAYOUTS_LOCK:
+        if key not in _NUMBERING_TABLE_LAYOUTS:
+            _NUMBERING_TABLE_LAYOUTS.update(key, NumberingTableLayout(region, numbering_scheme, chain))
+        return _NUMBERING_TABLE_LAYOUTS[key]
 
 
 def numbering_table_region(region):
@@ -0,0 +1,146 @@
+"""
+Numbering backends used by Chain.ab_numbering.
+
+A numbering backend is a function with the signature
+``backend(sequence, numbering_scheme, **kwargs) -> list`` that returns
+the name of each numbered position of sequence (i.e. ['H1', 'H2', ...]).
+Backends are registered under the name that is later passed as the
+`server` argument of Chain.ab_numbering/Chain.load.
+
+Backends that query a remote server can also register a coroutine function with the signature
+``async backend(sequence, numbering_scheme, client, **kwargs) -> list``, where client is an
+abpytools.utils.AsyncDownload object, which is used by Chain.aload/ChainCollection.aload.
+"""
+
+_NUMBERING_BACKENDS = dict()
+_ASYNC_NUMBERING_BACKENDS = dict()
+_CACHED_NUMBERING_BACKENDS = set()
+
+
+def register_numbering_backend(server, cache=True):
+    """
+    Decorator that registers a numbering backend under a given server name.
+
+    Args:
+        server (str): name used to select the backend, i.e. Chain.ab_numbering(server=server)
+        cache (bool): whether the results of the backend are stored in the numbering cache
+                      (see abpytools.core.numbering.cache)
+
+    Returns:
+        decorator that registers and returns the decorated function
+
+    Examples:
+        >>> from abpytools.core.numbering import register_numbering_backend
+        >>> @register_numbering_backend('my_server')
+        ... def my_numbering(sequence, numbering_scheme, **kwargs):
+        ...     return ['H{}'.format(i + 1) for i in range(len(sequence))]
+    """
+    def decorator(func):
+        _NUMBERING_BACKENDS[server] = func
+        if cache:
+            _CACHED_NUMBERING_BACKENDS.add(server)
+        else:
+            _CACHED_NUMBERING_BACKENDS.discard(server)
+        return func
+    return decorator
+
+
+def register_async_numbering_backend(server):
+    """
+    Decorator that registers the asyncio implementation of a numbering backend under a given server name.
+
+    Args:
+        server (str): name used to select the backend, i.e. Chain.aload(server=server)
+
+    Returns:
+        decorator that registers and returns the decorated coroutine function
+    """
+    def decorator(func):
+        _ASYNC_NUMBERING_BACKENDS[server] = func
+        return func
+    return decorator
+
+
+def unregister_numbering_backend(server):
+    """
+    Removes the numbering backend (and its asyncio implementation) registered under server.
+
+    Args:
+        server (str): name of the backend
+
+    Returns:
+
+    """
+    if server not in _NUMBERING_BACKENDS:
+        raise ValueError("{} numbering server is unknown. Available servers: {}".format(
+            server, ', '.join(available_numbering_backends())))
+    del _NUMBERING_BACKENDS[server]
+    _ASYNC_NUMBERING_BACKENDS.pop(server, None)
+    _CACHED_NUMBERING_BACKENDS.discard(server)
+
+
+def get_numbering_backend(server):
+    """
+    Returns the numbering backend registered under server.
+
+    Args:
+        server (str): name of the backend
+
+    Returns:
+        callable
+    """
+    if server not in _NUMBERING_BACKENDS:
+        raise ValueError("{} numbering server is unknown. Available servers: {}".format(
+            server, ', '.join(available_numbering_backends())))
+    return _NUMBERING_BACKENDS[server]
+
+
+def get_async_numbering_backend(server):
+    """
+    Returns the asyncio implementation of the numbering backend registered under server,
+    or None if the backend only has a synchronous implementation.
+
+    Args:
+        server (str): name of the backend
+
+    Returns:
+        coroutine function or None
+    """
+    # raises a ValueError if the server is unknown
+    get_numbering_backend(server)
+    return _ASYNC_NUMBERING_BACKENDS.get(server)
+
+
+def is_cached_numbering_backend(server):
+    """
+    Returns whether the results of the backend registered under server are cached.
+
+    Args:
+        server (str): name of the backend
+
+    Returns:
+        bool
+    """
+    return server in _CACHED_NUMBERING_BACKENDS
+
+
+def available_numbering_backends():
+    """
+    Returns the names of all the registered numbering backends.
+
+    Returns:
+        list
+    """
+    return list(_NUMBERING_BACKENDS.keys())
+
+
+# register the built-in backends
+from .abysis import abysis_numbering, abysis_numbering_async
+from .local import local_numbering
+from .cache import NumberingCache, get_numbering_cache, set_numbering_cache
+
+__all__ = ["register_numbering_backend", "unregister_numbering_backend", "get_numbering_backend",
+           "available_numbering_backends",
+           "register_async_numbering_backend", "get_async_numbering_backend",
+           "is_cached_numbering_backend", "abysis_numbering", "abysis_numbering_async", "local_numbering", "NumberingCache",
+           "get_numbering_cache", "set_numbering_cache"]
@@ -0,0 +1,114 @@
+import re
+from ...utils import Download, NumberingException
+from ..flags import *
+from . import register_numbering_backend, register_async_numbering_backend
+
+ABNUM_URL = "http://www.bioinf.org.uk/abs/abnum/abnum.cgi"
+
+
+def abysis_scheme(numbering_scheme):
+    """
+    Returns the abnum scheme option of a numbering scheme.
+
+    Args:
+        numbering_scheme (str): name of the numbering scheme
+
+    Returns:
+        str
+    """
+    if numbering_scheme == NUMBERING_FLAGS.CHOTHIA:
+        scheme = '-c'
+    elif numbering_scheme in (NUMBERING_FLAGS.CHOTHIA_EXT, NUMBERING_FLAGS.MARTIN):
+        scheme = '-a'
+    elif numbering_scheme == NUMBERING_FLAGS.KABAT:
+        scheme = '-k'
+    else:
+        raise ValueError("{} numbering scheme is unknown.".format(numbering_scheme.capitalize()))
+    return scheme
+
+
+def parse_abysis_numbering(html):
+    """
+    Parses the plain text output of abnum.
+
+    Args:
+        html (str): abnum output
+
+    Returns:
+        list
+    """
+    # check whether the server returned an error
+    if html.replace("\n", '') == 'Warning: Unable to number sequence' or len(
+            html.replace("\n", '')) == 0:
+        raise NumberingException("Unable to number sequence")
+
+    # parse the results
+    parsed_numbering_table = re.findall(r"[\S| ]+", html)
+
+    # get the numbering from the parsed table
+    return [x[:-2] for x in parsed_numbering_table if x[-1] != '-']
+
+
+def abysis_url(sequence, numbering_scheme, url=ABNUM_URL):
+    """
+    Returns the url of the abnum query of sequence.
+
+    Args:
+        sequence (str): amino acid sequence
+        numbering_scheme (str): name of the numbering scheme
+        url (str): url of the abnum server
+
+    Returns:
+        str
+    """
+    scheme = abysis_scheme(numbering_scheme)
+    return f"{url}?plain=1&aaseq={sequence}&scheme={scheme}"
+
+
+@register_numbering_backend(OPTION_FLAGS.ABYSIS)
+def abysis_numbering(sequence, numbering_scheme, timeout=30, url=ABNUM_URL):
+    """
+    Numbers a sequence by querying the abnum server.
+
+    Args:
+        sequence (str): amino acid sequence
+        numbering_scheme (str): name of the numbering scheme
+        timeout (int): request timeout in seconds
+        url (str): url of the abnum server
+
+    Returns:
+        list
+    """
+    # prepare the url string to query server
+    url = abysis_url(sequence, numbering_scheme, url=url)
+    # use the Download class from utils to get output
+    numbering_table = Download(url, verbose=False, timeout=timeout)
+    try:
+        numbering_table.download()
+    except ValueError:
+        raise ValueError("Check the internet connection.")
+
+    return parse_abysis_numbering(numbering_table.html)
+
+
+@register_async_numbering_backend(OPTION_FLAGS.ABYSIS)
+async def abysis_numbering_async(sequence, numbering_scheme, client, url=ABNUM_URL, **kwargs):
+    """
+    Numbers a sequence by querying the abnum server with an asyncio client.
+
+    Args:
+        sequence (str): amino acid sequence
+        numbering_scheme (str): name of the numbering scheme
+        client (AsyncDownload): client used to query the server
+        url (str): url of the abnum server
+        **kwargs: ignored, the timeout is set by the client
+
+    Returns:
+        list
+    """
+    try:
+        html = await client.download(abysis_url(sequence, numbering_scheme, url=url))
+    except IOError:
+        raise ValueError("Check the internet connection.")
+
+    return parse_abysis_numbering(html)
@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# environment variable with the path of the default numbering cache,
+# an empty string disables the default cache
+NUMBERING_CACHE_ENV = "ABPYTOOLS_NUMBERING_CACHE"
+DEFAULT_NUMBERING_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".abpytools", "numbering_cache.sqlite")
+
+_SCHEMA = """CREATE TABLE IF NOT EXISTS numbering (
+    key TEXT PRIMARY KEY,
+    numbering TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    last_access REAL NOT NULL
+)"""
+
+# the number of entries is maintained by triggers, so that it is not counted on every insert
+_COUNT_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS numbering_count (id INTEGER PRIMARY KEY CHECK (id = 0), n_entries INTEGER NOT NULL)",
+    "CREATE TRIGGER IF NOT EXISTS numbering_insert AFTER INSERT ON numbering "
+    "BEGIN UPDATE numbering_count SET n_entries = n_entries + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS numbering_delete AFTER DELETE ON numbering "
+    "BEGIN UPDATE numbering_count SET n_entries = n_entries - 1; END"
+)
+
+# fraction of max_entries evicted at once when the cache is full, so that the eviction query
+# runs once every max_entries * EVICTION_FRACTION inserts
+EVICTION_FRACTION = 0.01
+
+# number of cache hits whose access time is kept in memory before it is written to the database
+ACCESS_BATCH_SIZE = 256
+
+
+class NumberingCache:
+    """
+    Persistent, content-addressed cache of numbering results stored in a SQLite database.
+
+    Entries are keyed by the hash of (sequence, numbering_scheme, server) and store the numbering
+    and the chain type derived from it. The database is opened in WAL mode with one connection per
+    thread and process, so that the same file can be shared by concurrent jobs on one node.
+    When the number of entries exceeds max_entries the least recently used entries are evicted, in
+    batches of max_entries * EVICTION_FRACTION entries. The access times of cache hits are written to the
+    database in batches (every ACCESS_BATCH_SIZE hits and before each insert), so that reads do not
+    take the write lock.
+
+    Examples:
+        >>> from abpytools.core.numbering import NumberingCache, set_numbering_cache
+        >>> set_numbering_cache(NumberingCache(path='/tmp/numbering.sqlite', max_entries=10000))
+    """
+
+    def __init__(self, path=DEFAULT_NUMBERING_CACHE_PATH, max_entries=1000000, timeout=30):
+        """
+
+        Args:
+            path (str): path to the SQLite database, which is created if it does not exist
+            max_entries (int): maximum number of entries stored in the cache
+            timeout (float): time in seconds to wait for a lock held by another connection
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be a positive integer")
+
+        self._path = path
+        self._max_entries = max_entries
+        self._timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # key -> time of the last cache hit that has not been written to the database yet
+        self._accesses = dict()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(_SCHEMA)
+            connection.execute("CREATE INDEX IF NOT EXISTS numbering_last_access ON numbering (last_access)")
+            for statement in _COUNT_SCHEMA:
+                connection.execute(statement)
+            # the entries of a database created without the counter are counted once
+            connection.execute("INSERT OR IGNORE INTO numbering_count (id, n_entries) "
+                               "SELECT 0, COUNT(*) FROM numbering")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def key(sequence, numbering_scheme, server):
+        """
+        Returns the key of an entry.
+
+        Args:
+            sequence (str):
+            numbering_scheme (str):
+            server (str):
+
+        Returns:
+            str
+        """
+        return hashlib.sha256("{}\x00{}\x00{}".format(sequence, numbering_scheme, server).encode()).hexdigest()
+
+    def _connection(self):
+        # sqlite connections cannot be shared across threads or forked processes
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self._path, timeout=self._timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, sequence, numbering_scheme, server):
+        """
+        Returns the cached (numbering, chain) tuple or None if the entry is not in the cache.
+
+        Args:
+            sequence (str):
+            numbering_scheme (str):
+            server (str):
+
+        Returns:
+            tuple or None
+        """
+        key = self.key(sequence, numbering_scheme, server)
+        connection = self._connection()
+        row = connection.execute("SELECT numbering, chain FROM numbering WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._hits += 1
+            self._accesses[key] = time.time()
+            flush = len(self._accesses) >= ACCESS_BATCH_SIZE
+
+        if flush:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_accesses(connection)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+        return json.loads(row[0]), row[1]
+
+    def _write_accesses(self, connection):
+        # writes the pending access times, must be called in a transaction
+        with self._lock:
+            accesses, self._accesses = self._accesses, dict()
+        if accesses:
+            connection.executemany("UPDATE numbering SET last_access = ? WHERE key = ?",
+                                   [(last_access, key) for key, last_access in accesses.items()])
+
+    def set(self, sequence, numbering_scheme, server, numbering, chain):
+        """
+        Adds an entry to the cache, evicting the least recently used entries if the cache is full.
+
+        Args:
+            sequence (str):
+            numbering_scheme (str):
+            server (str):
+            numbering (list):
+            chain (str):
+
+        Returns:
+
+        """
+        key = self.key(sequence, numbering_scheme, server)
+        connection = self._connection()
+
+        values = (json.dumps(list(numbering)), chain, time.time(), key)
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # the access times are written first, so that the eviction uses the current access order
+            self._write_accesses(connection)
+            # INSERT OR REPLACE would delete the old row without firing the delete trigger
+            if connection.execute("UPDATE numbering SET numbering = ?, chain = ?, last_access = ? WHERE key = ?",
+                                  values).rowcount == 0:
+                connection.execute("INSERT INTO numbering (numbering, chain, last_access, key) "
+                                   "VALUES (?, ?, ?, ?)", values)
+                n_entries = self._count(connection)
+                if n_entries > self._max_entries:
+                    n_evicted = n_entries - self._max_entries + int(self._max_entries * EVICTION_FRACTION)
+                    connection.execute("DELETE FROM numbering WHERE key IN "
+                                       "(SELECT key FROM numbering ORDER BY last_access ASC LIMIT ?)", (n_evicted,))
+                    with self._lock:
+                        self._evictions += n_evicted
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        """
+        Removes all the entries from the cache and resets the counters.
+
+        Returns:
+
+        """
+        self._connection().execute("DELETE FROM numbering")
+        with self._lock:
+            self._accesses = dict()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def max_entries(self):
+        return self._max_entries
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def evictions(self):
+        return self._evictions
+
+    @property
+    def stats(self):
+        """
+        Returns the hit, miss and eviction counters of this process and the number of entries in the cache.
+
+        Returns:
+            dict
+        """
+        return {"hits": self._hits, "misses": self._misses, "evictions": self._evictions,
+                "entries": len(self), "max_entries": self._max_entries}
+
+    def __contains__(self, item):
+        sequence, numbering_scheme, server = item
+        key = self.key(sequence, numbering_scheme, server)
+        return self._connection().execute("SELECT 1 FROM numbering WHERE key = ?", (key,)).fetchone() is not None
+
+    @staticmethod
+    def _count(connection):
+        return connection.execute("SELECT n_entries FROM numbering_count").fetchone()[0]
+
+    def __len__(self):
+        return self._count(self._connection())
+
+    def _string_summary_basic(self):
+        return "abpytools.NumberingCache path: {}, size: {}".format(self._path, len(self))
+
+    def __repr__(self):
+        return "<%s at 0x%02x>" % (self._string_summary_basic(), id(self))
+
+
+_NUMBERING_CACHE = None
+_NUMBERING_CACHE_INITIALISED = False
+_NUMBERING_CACHE_LOCK = threading.Lock()
+
+
+def get_numbering_cache():
+    """
+    Returns the numbering cache used by Chain.ab_numbering.
+    The default cache is created on first use at the path given by the ABPYTOOLS_NUMBERING_CACHE
+    environment variable (or ~/.abpytools/numbering_cache.sqlite). Setting the variable to an
+    empty string disables the default cache.
+
+    Returns:
+        NumberingCache or None
+    """
+    global _NUMBERING_CACHE, _NUMBERING_CACHE_INITIALISED
+
+    if not _NUMBERING_CACHE_INITIALISED:
+        with _NUMBERING_CACHE_LOCK:
+            if not _NUMBERING_CACHE_INITIALISED:
+                path = os.environ.get(NUMBERING_CACHE_ENV, DEFAULT_NUMBERING_CACHE_PATH)
+                if path:
+                    try:
+                        _NUMBERING_CACHE = NumberingCache(path=path)
+                    except (OSError, sqlite3.Error):
+                        # the cache is an optimisation, numbering still works without it
+                        _NUMBERING_CACHE = None
+                _NUMBERING_CACHE_INITIALISED = True
+
+    return _NUMBERING_CACHE
+
+
+def set_numbering_cache(cache):
+    """
+    Sets the numbering cache used by Chain.ab_numbering.
+
+    Args:
+        cache (NumberingCache or None): the new cache, None disables caching
+
+    Returns:
+
+    """
+    global _NUMBERING_CACHE, _NUMBERING_CACHE_INITIALISED
+
+    if cache is not None and not isinstance(cache, NumberingCache):
+        raise TypeError("Expected a NumberingCache object or None, instead got {}".format(type(cache)))
+
+    with _NUMBERING_CACHE_LOCK:
+        _NUMBERING_CACHE = cache
+        _NUMBERING_CACHE_INITIALISED = True
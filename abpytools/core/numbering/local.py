@@ -0,0 +1,294 @@
+import re
+import threading
+from ...utils import DataLoader, NumberingException
+from ..flags import *
+from . import register_numbering_backend
+
+# conserved residues used to anchor the sequence to the numbering scheme templates
+# each anchor is described by:
+#   - the position it is assigned to
+#   - a regular expression of the motif around the anchor
+#   - the offset of the anchor residue in the motif
+#   - the (min, max) distance of the anchor residue to the previous required anchor residue
+#     (or to the start of the sequence for the first anchor)
+#   - whether the anchor is required to number the sequence
+_ANCHORS = {
+    CHAIN_FLAGS.HEAVY_CHAIN: [
+        ('H22', re.compile('C'), 0, (14, 30), True),
+        ('H36', re.compile('W[IVFLMYA][RKQ]'), 0, (9, 25), True),
+        ('H47', re.compile('EW[IVMLF][GAS]'), 1, (8, 14), False),
+        ('H92', re.compile('[YFHWL][YFHWLC]C'), 2, (45, 75), True),
+        ('H103', re.compile('WG.G[TS]'), 0, (5, 40), True)
+    ],
+    CHAIN_FLAGS.LIGHT_CHAIN: [
+        ('L23', re.compile('C'), 0, (14, 30), True),
+        ('L35', re.compile('W[YFLHVIM][QLRKH]'), 0, (8, 25), True),
+        ('L88', re.compile('[YFHWL][YFHWLC]C'), 2, (40, 70), True),
+        ('L98', re.compile('FG.G[TS]'), 0, (5, 30), True)
+    ]
+}
+
+# last position that is numbered, residues after it are considered to be part of the constant region
+_LAST_POSITION = {CHAIN_FLAGS.HEAVY_CHAIN: 'H113',
+                  CHAIN_FLAGS.LIGHT_CHAIN: 'L108'}
+
+# framework insertions that are present in the vast majority of the sequences,
+# i.e. H82A, H82B and H82C in the Chothia and Kabat numbering schemes, which are placed at
+# H72A, H72B and H72C in the extended Chothia (Martin) numbering scheme
+_FRAMEWORK_INSERTIONS = {
+    (NUMBERING_FLAGS.CHOTHIA, CHAIN_FLAGS.HEAVY_CHAIN): {82: 3},
+    (NUMBERING_FLAGS.KABAT, CHAIN_FLAGS.HEAVY_CHAIN): {82: 3},
+    (NUMBERING_FLAGS.CHOTHIA_EXT, CHAIN_FLAGS.HEAVY_CHAIN): {72: 3}
+}
+
+# framework positions that are missing in sequences with a shorter framework region, in the order they
+# are deleted, i.e. H40 in heavy chains with a FR2 one residue shorter (WVRQPGKG instead of WVRQAPGKG)
+_FRAMEWORK_DELETIONS = {
+    CHAIN_FLAGS.HEAVY_CHAIN: [40]
+}
+
+_POSITION_REGEX = re.compile(r'([HL])(\d+)([A-Z]?)')
+
+
+class _Segment:
+    """
+    Positions of a numbering scheme template between two anchors.
+    """
+
+    def __init__(self, positions, variable_sites, framework_insertions, framework_deletions):
+        # positions is a list of (name, base, insertion_code) tuples in template order
+        self.positions = positions
+        self.canonical = [x for x in positions if not x[2]]
+        self.insertions = dict()
+        for name, base, code in positions:
+            if code:
+                self.insertions.setdefault(base, []).append(name)
+        self.variable_sites = [x for x in variable_sites if x in self.insertions]
+        self.framework_sites = [x for x in self.insertions if x not in self.variable_sites]
+        self.framework_insertions = {x: min(n, len(self.insertions[x])) for x, n in framework_insertions.items()
+                                     if x in self.insertions}
+        self.framework_deletions = [x for x in framework_deletions if x in {y[1] for y in self.canonical}]
+        self._cache = dict()
+
+    def fill(self, n_residues):
+        """
+        Returns the names of the positions that n_residues are assigned to.
+        """
+        if n_residues not in self._cache:
+            self._cache[n_residues] = self._fill(n_residues)
+        return self._cache[n_residues]
+
+    def _fill(self, n_residues):
+        used_insertions = dict(self.framework_insertions)
+        extra = n_residues - len(self.canonical) - sum(used_insertions.values())
+        deleted = set()
+
+        if extra > 0:
+            for site in self.variable_sites + self.framework_sites:
+                n_site = min(extra + used_insertions.get(site, 0), len(self.insertions[site]))
+                extra -= n_site - used_insertions.get(site, 0)
+                used_insertions[site] = n_site
+                if extra == 0:
+                    break
+            if extra > 0:
+                raise NumberingException("Unable to number sequence")
+
+        elif extra < 0:
+            for base in self._deletion_order():
+                deleted.add(base)
+                extra += 1
+                if extra == 0:
+                    break
+            if extra < 0:
+                raise NumberingException("Unable to number sequence")
+
+        selected_insertions = set()
+        for site, n_site in used_insertions.items():
+            selected_insertions.update(self.insertions[site][:n_site])
+
+        return [name for name, base, code in self.positions
+                if (code and name in selected_insertions) or (not code and base not in deleted)]
+
+    def _deletion_order(self):
+        # positions are removed starting at the variable insertion site and moving towards the N-terminus
+        # of the segment, followed by the remaining positions towards the C-terminus
+        bases = [x[1] for x in self.canonical]
+        if self.variable_sites:
+            centre = bases.index(self.variable_sites[0]) if self.variable_sites[0] in bases else len(bases) // 2
+            return bases[centre::-1] + bases[centre + 1:]
+        # in framework segments the canonical gap positions of the numbering scheme are removed first
+        centre = len(bases) // 2
+        return self.framework_deletions + [x for x in bases[centre::-1] + bases[centre + 1:]
+                                           if x not in self.framework_deletions]
+
+
+class LocalNumberingEngine:
+    """
+    Numbers sequences in-process by aligning them to templates built from the numbering scheme data
+    (NumberingSchemes.json, CDR_positions.json and Framework_positions.json).
+
+    The sequence is first anchored to the template using the conserved residues of the variable domain
+    (Cys22/23, Trp36/35, Cys92/88 and the W/FGXG motif of FR4). The residues between each pair of anchors
+    are then assigned to the positions of the template, with insertions (or deletions) placed at the
+    insertion sites of the numbering scheme, i.e. H31A, H52A and H100A in Chothia, and framework deletions
+    placed at the canonical gap positions, i.e. H40.
+
+    This is an approximation of the numbering returned by the abnum server, which uses sequence profiles
+    and can therefore place unusual framework insertions/deletions more accurately.
+    """
+
+    def __init__(self, numbering_scheme=NUMBERING_FLAGS.CHOTHIA):
+        if numbering_scheme == NUMBERING_FLAGS.MARTIN:
+            numbering_scheme = NUMBERING_FLAGS.CHOTHIA_EXT
+        if numbering_scheme not in [NUMBERING_FLAGS.CHOTHIA, NUMBERING_FLAGS.KABAT, NUMBERING_FLAGS.CHOTHIA_EXT]:
+            raise ValueError("{} numbering scheme is unknown.".format(numbering_scheme.capitalize()))
+
+        self._numbering_scheme = numbering_scheme
+        self._templates = {chain: self._build_template(chain) for chain in _ANCHORS}
+        # segments are built for each combination of anchors found in the sequences
+        self._segments = dict()
+
+    @property
+    def numbering_scheme(self):
+        return self._numbering_scheme
+
+    def _build_template(self, chain):
+
+        whole_sequence = DataLoader(data_type='NumberingSchemes',
+                                    data=[self._numbering_scheme, chain]).get_data()
+        cdr_positions = DataLoader(data_type='CDR_positions',
+                                   data=[self._numbering_scheme, chain]).get_data()
+
+        whole_sequence = list(whole_sequence)
+        whole_sequence = whole_sequence[:whole_sequence.index(_LAST_POSITION[chain]) + 1]
+
+        positions = []
+        for name in whole_sequence:
+            _, base, code = _POSITION_REGEX.match(name).groups()
+            positions.append((name, int(base), code))
+
+        variable_sites = []
+        for cdr in ['CDR1', 'CDR2', 'CDR3']:
+            variable_sites.extend(int(_POSITION_REGEX.match(x).group(2)) for x in cdr_positions[cdr]
+                                  if _POSITION_REGEX.match(x).group(3) == 'A')
+
+        framework_insertions = _FRAMEWORK_INSERTIONS.get((self._numbering_scheme, chain), {})
+        framework_deletions = _FRAMEWORK_DELETIONS.get(chain, [])
+
+        return positions, variable_sites, framework_insertions, framework_deletions
+
+    def _get_segments(self, chain, anchors):
+
+        key = (chain, anchors)
+
+        if key not in self._segments:
+            positions, variable_sites, framework_insertions, framework_deletions = self._templates[chain]
+            names = [x[0] for x in positions]
+            boundaries = [-1] + [names.index(x) for x in anchors] + [len(positions)]
+
+            # one segment before the first anchor, one between each pair of anchors
+            # and one after the last anchor
+            self._segments[key] = [_Segment(positions[start + 1:end], variable_sites, framework_insertions,
+                                            framework_deletions)
+                                   for start, end in zip(boundaries[:-1], boundaries[1:])]
+
+        return self._segments[key]
+
+    @staticmethod
+    def _find_anchors(sequence, chain):
+
+        anchors = []
+        anchor_residues = []
+        previous = 0
+
+        for position, motif, offset, (min_distance, max_distance), required in _ANCHORS[chain]:
+            start = max(previous + min_distance - offset, 0)
+            match = motif.search(sequence, start)
+            if match is None or match.start() + offset > previous + max_distance:
+                if required:
+                    return None, None
+                continue
+            anchors.append(position)
+            anchor_residues.append(match.start() + offset)
+            if required:
+                previous = match.start() + offset
+
+        return tuple(anchors), anchor_residues
+
+    def number(self, sequence):
+        """
+        Returns the numbering of sequence.
+
+        Args:
+            sequence (str): amino acid sequence
+
+        Returns:
+            list: the name of each numbered position of sequence
+        """
+
+        for chain in [CHAIN_FLAGS.HEAVY_CHAIN, CHAIN_FLAGS.LIGHT_CHAIN]:
+            anchors, anchor_residues = self._find_anchors(sequence, chain)
+            if anchors is not None:
+                break
+        else:
+            raise NumberingException("Unable to number sequence")
+
+        segments = self._get_segments(chain, anchors)
+
+        # residues before the first anchor are aligned to the end of the first segment
+        # (i.e. sequences with a truncated N-terminus start at H2 or H3)
+        n_term = segments[0].canonical
+        if anchor_residues[0] <= len(n_term):
+            numbering = [x[0] for x in n_term[len(n_term) - anchor_residues[0]:]]
+        else:
+            numbering = list(segments[0].fill(anchor_residues[0]))
+
+        for i, (anchor, residue) in enumerate(zip(anchors, anchor_residues)):
+            numbering.append(anchor)
+            if i + 1 < len(anchors):
+                numbering.extend(segments[i + 1].fill(anchor_residues[i + 1] - residue - 1))
+
+        # residues after the last anchor are numbered until the end of the template,
+        # the remaining residues are left unnumbered
+        c_term = segments[-1].canonical
+        numbering.extend(x[0] for x in c_term[:len(sequence) - anchor_residues[-1] - 1])
+
+        return numbering
+
+
+_LOCAL_ENGINES = dict()
+_LOCAL_ENGINES_LOCK = threading.Lock()
+
+
+def get_local_numbering_engine(numbering_scheme):
+    """
+    Returns a LocalNumberingEngine, which is built once per numbering scheme.
+
+    Args:
+        numbering_scheme (str): name of the numbering scheme
+
+    Returns:
+        LocalNumberingEngine
+    """
+    if numbering_scheme not in _LOCAL_ENGINES:
+        with _LOCAL_ENGINES_LOCK:
+            if numbering_scheme not in _LOCAL_ENGINES:
+                _LOCAL_ENGINES[numbering_scheme] = LocalNumberingEngine(numbering_scheme)
+    return _LOCAL_ENGINES[numbering_scheme]
+
+
+# numbering locally is faster than a cache lookup, so the results are not cached
+@register_numbering_backend(OPTION_FLAGS.LOCAL, cache=False)
+def local_numbering(sequence, numbering_scheme, **kwargs):
+    """
+    Numbers a sequence in-process with LocalNumberingEngine.
+
+    Args:
+        sequence (str): amino acid sequence
+        numbering_scheme (str): name of the numbering scheme
+        **kwargs: ignored, accepted for compatibility with the remote backends (i.e. timeout)
+
+    Returns:
+        list
+    """
+    return get_local_numbering_engine(numbering_scheme).number(sequence)
@@ -0,0 +1,360 @@
+import numpy as np
+from .flags import *
+from ..utils import get_reference_bundle, get_reference_data
+from ..utils.encoding import AMINO_ACIDS, N_AMINO_ACIDS, ALPHABET_SIZE, residue_table_from_ascii
+
+# properties computed by calculate_properties, in the order of the columns of ChainCollection.properties
+AVAILABLE_PROPERTIES = ('length', 'mw', 'ec', 'pI', 'charge')
+
+# ionisable residues, the acidic residues have a negative charge when deprotonated
+ACIDIC_RESIDUES = 'DECY'
+BASIC_RESIDUES = 'HKR'
+
+# number of sequences counted at once by residue_count_matrix, which bounds the size of the temporary arrays
+COUNT_CHUNK_SIZE = 1 << 16
+# number of sequences of each block of solve_isoelectric_points
+PI_CHUNK_SIZE = 1 << 12
+
+
+# range of pH values in which the pI is searched
+PI_BRACKET = (0, 14)
+
+
+def _pi_grid():
+    # the pH values of the original implementation of calculate_pi, which added 0.01 to the pH at each step,
+    # so that the pI of Chain.ab_pi and of the batch engine are the same floats as before
+    grid = [0]
+    while grid[-1] < PI_BRACKET[1]:
+        grid.append(grid[-1] + 0.01)
+    return np.array(grid, dtype=np.float64)
+
+
+PI_GRID = _pi_grid()
+
+
+def residue_count_matrix(encoded_sequences, chunk_size=COUNT_CHUNK_SIZE):
+    """
+    Returns the number of each standard amino acid in each sequence, counted with a bincount over
+    blocks of chunk_size sequences.
+
+    Args:
+        encoded_sequences (SegmentedArray): encoded sequences (see abpytools.utils.encoding)
+        chunk_size (int): number of sequences counted at once
+
+    Returns:
+        numpy.ndarray: int32 matrix with shape (n_sequences, N_AMINO_ACIDS), the columns are in the order
+                       of AMINO_ACIDS
+    """
+    counts = np.zeros((len(encoded_sequences), N_AMINO_ACIDS), dtype=np.int32)
+    for start, stop, chunk in encoded_sequences.chunks(chunk_size):
+        standard = chunk.values < N_AMINO_ACIDS
+        counts[start:stop] = np.bincount(chunk.segment_index[standard] * N_AMINO_ACIDS + chunk.values[standard],
+                                         minlength=(stop - start) * N_AMINO_ACIDS).reshape(-1, N_AMINO_ACIDS)
+    return counts
+
+
+def get_pka_values(pka_database=PI_FLAGS.WIKIPEDIA):
+    """
+    Returns the pKa values of pka_database.
+
+    Args:
+        pka_database (str): one of OPTION_FLAGS.AVAILABLE_PI_VALUES
+
+    Returns:
+        dict: pKa of the ionisable residues and of the termini (NH2 and COOH)
+    """
+    if pka_database not in OPTION_FLAGS.AVAILABLE_PI_VALUES:
+        raise ValueError("Selected pI database {} not available. Available databases: {}".format(
+            pka_database, ' ,'.join(OPTION_FLAGS.AVAILABLE_PI_VALUES)))
+    return get_reference_data('AminoAcidProperties')['pI'][pka_database]
+
+
+def residue_charges(ph, pka_values):
+    """
+    Returns the charge of each standard amino acid at each pH, using the Henderson-Hasselbalch equation as
+    calculate_charge. The non ionisable amino acids have no charge.
+
+    Args:
+        ph (float or numpy.ndarray): pH values
+        pka_values (dict): pKa values (see get_pka_values)
+
+    Returns:
+        numpy.ndarray: with shape ph.shape + (N_AMINO_ACIDS,)
+    """
+    ph = np.asarray(ph, dtype=np.float64)[..., np.newaxis]
+    charges = np.zeros(ph.shape[:-1] + (N_AMINO_ACIDS,), dtype=np.float64)
+    for amino_acid in ACIDIC_RESIDUES:
+        charges[..., AMINO_ACIDS.index(amino_acid)] = -1 / (1 + 10 ** (pka_values[amino_acid] - ph[..., 0]))
+    for amino_acid in BASIC_RESIDUES:
+        charges[..., AMINO_ACIDS.index(amino_acid)] = 1 / (1 + 10 ** (ph[..., 0] - pka_values[amino_acid]))
+    return charges
+
+
+def terminal_charges(ph, pka_values):
+    """
+    Returns the sum of the charges of the C-terminus and the N-terminus at each pH.
+
+    Args:
+        ph (float or numpy.ndarray): pH values
+        pka_values (dict): pKa values (see get_pka_values)
+
+    Returns:
+        numpy.ndarray: with the shape of ph
+    """
+    ph = np.asarray(ph, dtype=np.float64)
+    return -1 / (1 + 10 ** (pka_values['COOH'] - ph)) + 1 / (1 + 10 ** (ph - pka_values['NH2']))
+
+
+def net_charges(counts, ph=7.4, pka_database=PI_FLAGS.WIKIPEDIA):
+    """
+    Returns the net charge of each sequence at each pH as a single product of the residue count matrix
+    with the charge of each amino acid at each pH, i.e. the titration curve of each sequence when ph is
+    a list of pH values.
+
+    Args:
+        counts (numpy.ndarray): residue count matrix (see residue_count_matrix)
+        ph (float or list): pH value or list of n_ph pH values
+        pka_database (str): one of OPTION_FLAGS.AVAILABLE_PI_VALUES
+
+    Returns:
+        numpy.ndarray: float64 with shape (n_sequences,) if ph is a float, otherwise (n_sequences, n_ph)
+    """
+    pka_values = get_pka_values(pka_database)
+    return counts @ residue_charges(ph, pka_values).T + terminal_charges(ph, pka_values)
+
+
+def residue_charge_table(ph, pka_database=PI_FLAGS.WIKIPEDIA):
+    """
+    Returns the charge of each residue code (see abpytools.utils.encoding) at each pH, which is zero for the
+    residues that are not ionisable, gaps and non standard residues.
+
+    Args:
+        ph (list): n_ph pH values
+        pka_database (str): one of OPTION_FLAGS.AVAILABLE_PI_VALUES
+
+    Returns:
+        numpy.ndarray: float64 with shape (ALPHABET_SIZE, n_ph)
+    """
+    ph = np.atleast_1d(np.asarray(ph, dtype=np.float64))
+    table = np.zeros((ALPHABET_SIZE, len(ph)), dtype=np.float64)
+    table[:N_AMINO_ACIDS] = residue_charges(ph, get_pka_values(pka_database)).T
+    return table
+
+
+def position_charges(matrix, ph, pka_database=PI_FLAGS.WIKIPEDIA, dtype=np.float64):
+    """
+    Returns the charge of each position of an encoded numbering table (see numbering_matrix) at each pH,
+    with a lookup of each residue code in residue_charge_table, which is the product of the one-hot encoding
+    of the table with the charge of each residue without building the one-hot tensor.
+
+    Args:
+        matrix (numpy.ndarray): uint8 numbering table with shape (n_chains, n_positions)
+        ph (list): n_ph pH values
+        pka_database (str): one of OPTION_FLAGS.AVAILABLE_PI_VALUES
+        dtype: dtype of the result
+
+    Returns:
+        numpy.ndarray: with shape (n_chains, n_positions, n_ph)
+    """
+    return residue_charge_table(ph, pka_database=pka_database).astype(dtype)[matrix]
+
+
+def _ionisable_counts(counts):
+    # the count of each ionisable residue as a float64 column
+    return {x: counts[:, AMINO_ACIDS.index(x)].astype(np.float64) for x in ACIDIC_RESIDUES + BASIC_RESIDUES}
+
+
+def _net_charge(ionisable_counts, ph, pka_values):
+    # net charge with pH values and pKa values that broadcast with the counts
+    charge = terminal_charges(ph, pka_values)
+    for amino_acid in ACIDIC_RESIDUES:
+        charge = charge - ionisable_counts[amino_acid] / (1 + 10 ** (pka_values[amino_acid] - ph))
+    for amino_acid in BASIC_RESIDUES:
+        charge = charge + ionisable_counts[amino_acid] / (1 + 10 ** (ph - pka_values[amino_acid]))
+    return charge
+
+
+def isoelectric_points(counts, pka_database=PI_FLAGS.WIKIPEDIA):
+    """
+    Returns the pI of each sequence with the same result as calculate_pi, which is the step of PI_GRID after
+    the first pH at which the net charge is not positive. Since the net charge decreases with the pH, that step
+    is found with a bisection over PI_GRID for all sequences at once. See solve_isoelectric_points to compute
+    the pI to a given tolerance.
+
+    Args:
+        counts (numpy.ndarray): residue count matrix (see residue_count_matrix)
+        pka_database (str): one of OPTION_FLAGS.AVAILABLE_PI_VALUES
+
+    Returns:
+        numpy.ndarray: float64 with shape (n_sequences,), NaN if the net charge is positive up to pH 14
+    """
+    pka_values = get_pka_values(pka_database)
+    ionisable_counts = _ionisable_counts(counts)
+
+    # the pH values evaluated by calculate_pi are PI_GRID[:n_steps], i.e. the ones below 14
+    n_steps = len(PI_GRID) - 1
+    low = np.zeros(len(counts), dtype=np.int64)
+    high = np.full(len(counts), n_steps, dtype=np.int64)
+    for _ in range(int(np.ceil(np.log2(n_steps + 1)))):
+        middle = (low + high) // 2
+        negative = _net_charge(ionisable_counts, PI_GRID[middle], pka_values) <= 0
+        active = low < high
+        high = np.where(active & negative, middle, high)
+        low = np.where(active & ~negative, middle + 1, low)
+
+    pi = np.full(len(counts), np.nan)
+    found = low < n_steps
+    pi[found] = PI_GRID[low[found] + 1]
+    return pi
+
+
+def solve_isoelectric_points(counts, pka_databases=OPTION_FLAGS.AVAILABLE_PI_VALUES, tolerance=1e-3):
+    """
+    Returns the pI of each sequence with each pKa database, found with a bisection of the net charge in
+    PI_BRACKET that runs on all the sequences and databases at once. The number of iterations is
+    log2(7 / tolerance), i.e. 13 iterations for the default tolerance.
+
+    Examples:
+        >>> from abpytools.core.properties import residue_count_matrix, solve_isoelectric_points
+        >>> pi = solve_isoelectric_points(residue_count_matrix(collection.encoded_sequences), tolerance=1e-6)
+
+    Args:
+        counts (numpy.ndarray): residue count matrix (see residue_count_matrix)
+        pka_databases (list): names of the pKa databases, see OPTION_FLAGS.AVAILABLE_PI_VALUES
+        tolerance (float): maximum absolute error of the pI
+
+    Returns:
+        numpy.ndarray: float64 with shape (n_sequences, n_databases), NaN if the net charge is positive up to pH 14
+    """
+    if tolerance <= 0:
+        raise ValueError("The tolerance has to be positive")
+    if len(pka_databases) == 0:
+        raise ValueError("At least one pKa database is required")
+    pka_tables = [get_pka_values(x) for x in pka_databases]
+    # 10 ** pKa of each database as a column, so that they broadcast with the sequences, and the net charge is
+    # evaluated with a single power per iteration, the proton concentration 10 ** -pH
+    acid_constants = {key: 10 ** np.array([x[key] for x in pka_tables], dtype=np.float64)[:, np.newaxis]
+                      for key in pka_tables[0]}
+    # the midpoint of the final bracket is at most half the bracket width away from the root
+    n_iterations = max(int(np.ceil(np.log2((PI_BRACKET[1] - PI_BRACKET[0]) / (2 * tolerance)))), 0)
+
+    pi = np.empty((len(pka_databases), len(counts)), dtype=np.float64)
+    # blocks of sequences small enough for the temporary arrays to stay in the CPU cache
+    for start in range(0, len(counts), PI_CHUNK_SIZE):
+        stop = min(start + PI_CHUNK_SIZE, len(counts))
+        ionisable_counts = _ionisable_counts(counts[start:stop])
+
+        def net_charge(ph):
+            protons = 10 ** -ph
+            charge = -1 / (1 + acid_constants['COOH'] * protons) + 1 / (1 + 1 / (acid_constants['NH2'] * protons))
+            for amino_acid in ACIDIC_RESIDUES:
+                charge -= ionisable_counts[amino_acid] / (1 + acid_constants[amino_acid] * protons)
+            for amino_acid in BASIC_RESIDUES:
+                charge += ionisable_counts[amino_acid] / (1 + 1 / (acid_constants[amino_acid] * protons))
+            return charge
+
+        low = np.full((len(pka_databases), stop - start), PI_BRACKET[0], dtype=np.float64)
+        high = np.full((len(pka_databases), stop - start), PI_BRACKET[1], dtype=np.float64)
+        for _ in range(n_iterations):
+            middle = (low + high) / 2
+            negative = net_charge(middle) <= 0
+            high = np.where(negative, middle, high)
+            low = np.where(negative, low, middle)
+
+        pi[:, start:stop] = (low + high) / 2
+        pi[:, start:stop][net_charge(np.full_like(low, PI_BRACKET[1])) > 0] = np.nan
+    return pi.T
+
+
+def molecular_weights(counts, encoded_sequences, monoisotopic=False):
+    """
+    Returns the molecular weight of each sequence with the same tables as Chain.ab_molecular_weight, as a
+    matrix-vector product of the residue count matrix with the weight of each amino acid. The weights of the
+    residues that are not standard amino acids (i.e. U and O) are only summed for the sequences that have them.
+
+    Args:
+        counts (numpy.ndarray): residue count matrix of encoded_sequences (see residue_count_matrix)
+        encoded_sequences (SegmentedArray): encoded sequences
+        monoisotopic (bool):
+
+    Returns:
+        numpy.ndarray: float64 with shape (n_sequences,), NaN for sequences with residues without a weight
+    """
+    # the inverted choice of table is intentional: Chain.ab_molecular_weight uses the 'average' table when
+    # monoisotopic is True (and vice versa), and the vectorised weights must match it chain by chain
+    database = 'average' if monoisotopic else 'monoisotopic'
+    water = get_reference_data('AminoAcidProperties')['MolecularWeight'][database]['water']
+    table = residue_table_from_ascii(get_reference_bundle().amino_acid_table('MolecularWeight', database))
+
+    lengths = encoded_sequences.lengths
+    weights = counts @ table[:N_AMINO_ACIDS] - (lengths - 1) * water
+
+    other = np.flatnonzero(counts.sum(axis=1) < lengths)
+    if len(other) > 0:
+        sequences = encoded_sequences.take(other)
+        other_table = table.copy()
+        other_table[:N_AMINO_ACIDS] = 0
+        weights[other] += sequences.segment_sum(other_table[sequences.values])
+    return weights
+
+
+def extinction_coefficients(counts, extinction_coefficient_database='Standard', reduced=False):
+    """
+    Returns the extinction coefficient of each sequence with the same tables as Chain.ab_ec, as a
+    matrix-vector product of the residue count matrix with the extinction coefficient of each amino acid.
+
+    Args:
+        counts (numpy.ndarray): residue count matrix (see residue_count_matrix)
+        extinction_coefficient_database (str):
+        reduced (bool):
+
+    Returns:
+        numpy.ndarray: float64 with shape (n_sequences,)
+    """
+    if reduced:
+        extinction_coefficient_database += '_reduced'
+    table = residue_table_from_ascii(get_reference_bundle().amino_acid_table('ExtinctionCoefficient',
+                                                                             extinction_coefficient_database))
+    return counts @ np.nan_to_num(table[:N_AMINO_ACIDS])
+
+
+def calculate_properties(encoded_sequences, properties=AVAILABLE_PROPERTIES, monoisotopic=False,
+                         extinction_coefficient_database='Standard', reduced=False, ph=7.4,
+                         pka_database=PI_FLAGS.WIKIPEDIA):
+    """
+    Computes several physicochemical properties of a batch of sequences from a single residue count matrix.
+
+    Args:
+        encoded_sequences (SegmentedArray): encoded sequences (see abpytools.utils.encoding)
+        properties (list): properties to compute, any of AVAILABLE_PROPERTIES
+        monoisotopic (bool): molecular weight table (see Chain.ab_molecular_weight)
+        extinction_coefficient_database (str):
+        reduced (bool): whether to consider the cysteines to be reduced in the extinction coefficient
+        ph (float): pH of the net charge
+        pka_database (str): pKa values of the pI and the net charge, one of OPTION_FLAGS.AVAILABLE_PI_VALUES
+
+    Returns:
+        dict: float64 array of each property
+    """
+    unavailable = [x for x in properties if x not in AVAILABLE_PROPERTIES]
+    if unavailable:
+        raise ValueError("Unknown properties: {}. Available properties: {}".format(
+            ', '.join(unavailable), ', '.join(AVAILABLE_PROPERTIES)))
+
+    counts = residue_count_matrix(encoded_sequences)
+
+    result = dict()
+    for name in properties:
+        if name == 'length':
+            result[name] = encoded_sequences.lengths
+        elif name == 'mw':
+            result[name] = molecular_weights(counts, encoded_sequences, monoisotopic=monoisotopic)
+        elif name == 'ec':
+            result[name] = extinction_coefficients(counts,
+                                                   extinction_coefficient_database=extinction_coefficient_database,
+                                                   reduced=reduced)
+        elif name == 'pI':
+            result[name] = isoelectric_points(counts, pka_database=pka_database)
+        elif name == 'charge':
+            result[name] = net_charges(counts, ph=ph, pka_database=pka_database)
+    return result
@@ -243,6 +243,79 @@ def fasta_ChainCollection_parser(raw_fasta, numbering_scheme):
     return antibody_objects
 
 
+def fasta_Chain_iterator(raw_fasta, numbering_scheme):
+    """
+    Lazily parses a FASTA file, yielding one Chain object at a time, so that large files
+    do not have to be read into memory at once. Sequences can span multiple lines.
+
+    Args:
+        raw_fasta: file object or iterable of lines
+        numbering_scheme (str):
+
+    Returns:
+        generator of Chain objects
+    """
+
+    name = None
+    sequence = []
+    for line in raw_fasta:
+        if line.startswith(">"):
+            if name is not None:
+                if len(sequence) == 0:
+                    raise ValueError("Error reading file: make sure it is FASTA format")
+                yield Chain(name=name, sequence=''.join(sequence), numbering_scheme=numbering_scheme)
+            name = line.replace("\n", "")[1:]
+            sequence = []
+        # if line is empty skip line
+        elif line.isspace():
+            pass
+        elif name is None:
+            raise ValueError("Error reading file: make sure it is FASTA format")
+        else:
+            sequence.append(line.replace("\n", ""))
+
+    if name is not None:
+        if len(sequence) == 0:
+            raise ValueError("Error reading file: make sure it is FASTA format")
+        yield Chain(name=name, sequence=''.join(sequence), numbering_scheme=numbering_scheme)
+
+
+def checkpoint_Chain_formatter(chain_object):
+    """
+    Internal function to serialise the numbering of a Chain object in a loading checkpoint.
+
+    Args:
+        chain_object (Chain):
+
+    Returns:
+        list
+    """
+    return [chain_object.name, chain_object.sequence, chain_object.status, chain_object.chain,
+            chain_object.numbering]
+
+
+def checkpoint_Chain_parser(record, numbering_scheme):
+    """
+    Internal function to recreate a Chain object from a loading checkpoint record.
+    The data derived from the numbering is calculated again, without querying the numbering server.
+
+    Args:
+        record (list): record created by checkpoint_Chain_formatter
+        numbering_scheme (str):
+
+    Returns:
+        Chain
+    """
+    name, sequence, status, chain, numbering = record
+    chain_object = Chain(name=name, sequence=sequence, numbering_scheme=numbering_scheme)
+    chain_object.numbering = numbering
+    chain_object._chain = chain
+    chain_object._loading_status = status
+    if status == 'Loaded':
+        chain_object.load()
+    return chain_object
+
+
 def pb2_FabCollection_parser(proto_parser):
     from abpytools.core.fab import Fab
     fab_objects = list()
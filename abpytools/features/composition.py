@@ -1,15 +1,22 @@
 from collections import Counter, defaultdict
-from itertools import  product
-import re
+import numpy as np
+from abpytools.utils.encoding import AMINO_ACIDS, ALPHABET, ALPHABET_SIZE, encode_sequence, residue_counts
 
 
-aa_order = ['A', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'K', 'L', 'M', 'N', 'P', 'Q', 'R', 'S', 'T', 'V', 'W', 'Y']
+aa_order = list(AMINO_ACIDS)
 
 # this classification is based on the Shen paper and takes into account the aa side chain dipole and volume
 # for more information check http://www.pnas.org/content/104/11/4337/suppl/DC1
 aa_group = {'A': '0', 'G': '0', 'V': '0', 'I': '1', 'L': '1', 'F': '1', 'P': '1', 'Y': '2', 'M': '2', 'T': '2',
             'S': '2', 'H': '3', 'N': '3', 'Q': '3', 'W': '3', 'R': '4', 'K': '4', 'D': '5', 'E': '5', 'C': '6'}
 
+# aa_group indexed by residue code, -1 for residues without a group
+_aa_group_codes = np.full(ALPHABET_SIZE, -1, dtype=np.int64)
+for _aa, _group in aa_group.items():
+    _aa_group_codes[ALPHABET.index(_aa)] = int(_group)
+
+N_TRIADS = 7 ** 3
+
 
 def chou_pseudo_aa_composition(*sequences):
 
@@ -21,7 +28,7 @@ def chou_pseudo_aa_composition(*sequences):
     DOI: 10.1080/1062936X.2013.773378
 
     Args:
-        *sequences: amino acid sequences
+        *sequences: amino acid sequences or their encoding (see abpytools.utils.encoding)
 
     Returns:
         list of Chou's pseudo amino acid composition for each sequence
@@ -51,13 +58,14 @@ def aa_composition(seq):
     Number of amino acids in a given sequence.
 
     Args:
-        seq (str): A string representing a sequence
+        seq (str): A string representing a sequence or its encoding (see abpytools.utils.encoding)
 
     Returns:
         Counter with amino acid composition
 
     """
-    return Counter(seq)
+    counts = residue_counts(seq)
+    return Counter({ALPHABET[i]: int(counts[i]) for i in np.flatnonzero(counts)})
 
 
 def aa_frequency(seq):
@@ -66,7 +74,7 @@ def aa_frequency(seq):
     Normalised amino acid composition.
 
     Args:
-        seq (str): A string representing a sequence
+        seq (str): A string representing a sequence or its encoding (see abpytools.utils.encoding)
 
     Returns:
         Dictionary with amino acid frequency
@@ -83,13 +91,15 @@ def distance_to_first(seq):
     Cumulative distance of each of the twenty amino acids to the first residue,
 
     Args:
-        seq (str): A string representing a sequence
+        seq (str): A string representing a sequence or its encoding (see abpytools.utils.encoding)
 
     Returns:
         Dictionary with cumulative
 
     """
-    return {x: sum([m.start() for m in re.finditer(x, seq)]) for x in aa_order}
+    codes = encode_sequence(seq)
+    distance = np.bincount(codes, weights=np.arange(len(codes)), minlength=ALPHABET_SIZE)
+    return {x: int(distance[i]) for i, x in enumerate(aa_order)}
 
 
 def aa_distribution(seq, aa_count, aa_distance_to_first):
@@ -98,7 +108,7 @@ def aa_distribution(seq, aa_count, aa_distance_to_first):
     similarity among protein sequences via the general form of Chou’s pseudo amino acid composition.
 
     Args:
-        seq (str): amino acid sequence
+        seq (str): amino acid sequence or its encoding (see abpytools.utils.encoding)
         aa_count (dict): aminod acid count of sequence
         aa_distance_to_first (dict): distance to first for each amino acid to first position
 
@@ -106,10 +116,20 @@ def aa_distribution(seq, aa_count, aa_distance_to_first):
         dict
 
     """
-    aa_dist_dict = defaultdict(int)
-    for i, aa in enumerate(seq):
-        aa_dist_dict[aa] += (i - (aa_distance_to_first[aa] / aa_count[aa])) ** 2 / aa_count[aa]
-    return aa_dist_dict
+    codes = encode_sequence(seq)
+    present = np.unique(codes)
+
+    # count and distance to first of each residue, indexed by residue code
+    count = np.ones(ALPHABET_SIZE)
+    distance = np.zeros(ALPHABET_SIZE)
+    for code in present.tolist():
+        count[code] = aa_count[ALPHABET[code]]
+        distance[code] = aa_distance_to_first[ALPHABET[code]]
+
+    residue_count = count[codes]
+    aa_dist = np.bincount(codes, weights=(np.arange(len(codes)) - (distance[codes] / residue_count)) ** 2 /
+                          residue_count, minlength=ALPHABET_SIZE)
+    return defaultdict(int, {ALPHABET[code]: aa_dist[code] for code in present.tolist()})
 
 
 def order_seq(seq_dict):
@@ -133,7 +153,7 @@ def triad_method(*sequences):
     only on sequences information. PNAS, 104(11), pp: 4337-4341.
 
     Args:
-        *sequences (list): sequence of amino acids
+        *sequences (list): sequence of amino acids or their encoding (see abpytools.utils.encoding)
 
     Returns:
         list of lists with results of triad method
@@ -143,27 +163,20 @@ def triad_method(*sequences):
 
     for sequence in sequences:
 
-        # start dictionary with all 343 triads/keys (7 classes ** 3)
-        f_keys = [''.join(x) for x in product(['0', '1', '2', '3', '4', '5', '6'],
-                                              ['0', '1', '2', '3', '4', '5', '6'],
-                                              ['0', '1', '2', '3', '4', '5', '6'])]
-
-        f_results = {x: 0 for x in f_keys}
-
         # classify aa in sequence
-        v = [aa_group[aa] for aa in sequence]
-
-        # get triads
-        triads = [''.join(v[x:x + 3]) for x in range(len(v) - 2)]
+        v = _aa_group_codes[encode_sequence(sequence)]
+        if np.any(v < 0):
+            raise ValueError("Triad method is only defined for sequences with the twenty standard amino acids")
 
-        for triad in triads:
-            f_results[triad] += 1
+        # get triads, triad 'abc' of the 343 triads (7 classes ** 3) has index a * 49 + b * 7 + c
+        triads = v[:-2] * 49 + v[1:-1] * 7 + v[2:]
+        f_results = np.bincount(triads, minlength=N_TRIADS)
 
         # normalise values
-        f_max = max(f_results.values())
-        f_min = min(f_results.values())
+        f_max = f_results.max()
+        f_min = f_results.min()
 
-        d = [(f_results[key] - f_min) / f_max for key in f_keys]
+        d = ((f_results - f_min) / f_max).tolist()
 
         # append 343 dimensional vector to d_matrix
         d_matrix.append(d)
@@ -25,14 +25,7 @@ class ChainDomains(ChainCollection):
 
         if 'cdr_lengths' not in self._cache:
 
-            cdr_length_matrix = np.zeros((self.n_ab, 3), dtype=np.int)
-            cdr_sequences = self.cdr_sequences()
-
-            for m, antibody in enumerate(self.antibody_objects):
-                for n, cdr in enumerate(['CDR1', 'CDR2', 'CDR3']):
-                    cdr_length_matrix[m, n] = len(cdr_sequences[antibody.name][cdr])
-
-            self._cache.update(key='cdr_lengths', data=cdr_length_matrix)
+            self._cache.update(key='cdr_lengths', data=self.region_lengths(regions=['CDR1', 'CDR2', 'CDR3']))
 
         return self._cache['cdr_lengths']
 
@@ -45,44 +38,23 @@ class ChainDomains(ChainCollection):
 
         if 'cdr_sequences' not in self._cache:
 
-            cdr_sequences = dict()
-
-            for antibody in self.antibody_objects:
-                dict_i = dict()
-                for cdr in ['CDR1', 'CDR2', 'CDR3']:
-                    self.sequence_splitter_helper(antibody=antibody,
-                                                  region=cdr,
-                                                  index=0,
-                                                  dict_i=dict_i)
-                cdr_sequences[antibody.name] = dict_i
-
-            self._cache.update(key='cdr_sequences', data=cdr_sequences)
+            self._cache.update(key='cdr_sequences', data=self._region_sequences_by_name(['CDR1', 'CDR2', 'CDR3']))
 
         return self._cache['cdr_sequences']
 
     def framework_length(self):
-        framework_length_matrix = np.zeros((self.n_ab, 4), dtype=np.int)
-        fr_sequences = self.framework_sequences()
-        for m, antibody in enumerate(self.antibody_objects):
-            for n, framework in enumerate(['FR1', 'FR2', 'FR3', 'FR4']):
-                framework_length_matrix[m, n] = len(fr_sequences[antibody.name][framework])
 
-        return framework_length_matrix
+        return self.region_lengths(regions=['FR1', 'FR2', 'FR3', 'FR4'])
 
     def framework_sequences(self):
 
-        framework_sequences = dict()
-
-        for antibody in self.antibody_objects:
-            dict_i = dict()
-            for framework in ['FR1', 'FR2', 'FR3', 'FR4']:
-                self.sequence_splitter_helper(antibody=antibody,
-                                              region=framework,
-                                              index=1,
-                                              dict_i=dict_i)
-            framework_sequences[antibody.name] = dict_i
+        return self._region_sequences_by_name(['FR1', 'FR2', 'FR3', 'FR4'])
 
-        return framework_sequences
+    def _region_sequences_by_name(self, regions):
+        # the sequences of all the chains are sliced from the same buffer (see ChainCollection.region_sequences)
+        region_sequences = [self.region_sequences(region) for region in regions]
+        return {name: {region: sequences[i] for region, sequences in zip(regions, region_sequences)}
+                for i, name in enumerate(self.names)}
 
     @staticmethod
     def sequence_splitter_helper(antibody, region, index, dict_i):
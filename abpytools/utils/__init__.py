@@ -1,4 +1,11 @@
-from .data_loader import DataLoader
-from .downloads import Download
-from .python_config import PythonConfig
+from .data_loader import DataLoader, ReferenceDataRegistry, get_reference_data, get_reference_data_registry
+from .reference_bundle import ReferenceBundle, get_reference_bundle
+from .downloads import (Download, DownloadError, RetryPolicy, CircuitBreaker, CircuitBreakerOpen, get_retry_policy,
+                        set_retry_policy, get_circuit_breaker, download_stats)
+from .async_downloads import AsyncDownload
+from .executor import (LoadingExecutor, get_loading_executor, configure_loading_executor,
+                       shutdown_loading_executor)
+from .python_config import PythonConfig, progressbar
+from .lazy_imports import LazyModule, lazy_import
+from .encoding import encode_sequence, decode_sequence, residue_counts
 from .abpytools_exceptions import NumberingException
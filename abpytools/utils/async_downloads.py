@@ -0,0 +1,252 @@
+import asyncio
+import ssl
+import time
+from urllib import parse
+from .downloads import DownloadError, CircuitBreakerOpen, get_retry_policy, get_circuit_breaker
+
+
+class AsyncDownload:
+    """
+    asyncio HTTP client that keeps a pool of keep-alive connections for each host.
+
+    The number of concurrent requests (and therefore of open connections) to the same host
+    is limited by max_connections_per_host. The latency of each request is stored in
+    AsyncDownload.latencies as a (url, seconds) tuple. Failed requests are retried and
+    counted in the same way as Download (see RetryPolicy and CircuitBreaker).
+
+    Examples:
+        >>> import asyncio
+        >>> from abpytools.utils import AsyncDownload
+        >>> async def main(urls):
+        ...     async with AsyncDownload(max_connections_per_host=4) as client:
+        ...         return await asyncio.gather(*[client.download(url) for url in urls])
+    """
+
+    def __init__(self, max_connections_per_host=8, timeout=30, user_agent='wswp', decoding_format='utf-8',
+                 verbose=False, retry_policy=None, circuit_breaker=None):
+        """
+
+        Args:
+            max_connections_per_host (int): maximum number of concurrent requests to the same host
+            timeout (float): timeout of each request in seconds
+            user_agent (str):
+            decoding_format (str):
+            verbose (bool): print out url and errors
+            retry_policy (RetryPolicy): by default get_retry_policy()
+            circuit_breaker (CircuitBreaker): by default the circuit breaker of each host (get_circuit_breaker)
+        """
+        if max_connections_per_host < 1:
+            raise ValueError("max_connections_per_host must be a positive integer")
+
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.decoding_format = decoding_format
+        self.verbose = verbose
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.latencies = []
+        self.n_connections = 0
+        self._semaphores = dict()
+        self._idle_connections = dict()
+
+    async def download(self, url):
+        """
+        Returns the contents of url.
+
+        Args:
+            url (str):
+
+        Returns:
+            str
+
+        """
+        if self.verbose:
+            print('Downloading:', url)
+
+        parsed_url = parse.urlsplit(url)
+        if parsed_url.scheme not in ('http', 'https'):
+            raise ValueError("Expected a http or https url, instead got {}".format(url))
+
+        host = (parsed_url.scheme, parsed_url.hostname,
+                parsed_url.port or (443 if parsed_url.scheme == 'https' else 80))
+        path = parsed_url.path or '/'
+        if parsed_url.query:
+            path += '?' + parsed_url.query
+
+        retry_policy = self.retry_policy or get_retry_policy()
+        circuit_breaker = self.circuit_breaker or get_circuit_breaker(url)
+
+        retry = 0
+        while True:
+            try:
+                html = await self._download(url, host, parsed_url.netloc, path, circuit_breaker)
+                retry_policy._record(retry, False)
+                return html.decode(self.decoding_format)
+            except DownloadError as e:
+                if retry >= retry_policy.num_retries or not retry_policy.is_retryable(e):
+                    retry_policy._record(retry, True)
+                    raise
+                delay = retry_policy.backoff(retry)
+                if self.verbose:
+                    print('Retrying in {:.2f}s'.format(delay))
+                await asyncio.sleep(delay)
+                retry += 1
+
+    async def _download(self, url, host, netloc, path, circuit_breaker):
+
+        if not circuit_breaker.allow_request():
+            raise CircuitBreakerOpen("Too many failed requests to {}, not sending requests until {} s "
+                                     "have passed".format(netloc, circuit_breaker.recovery_timeout))
+
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_connections_per_host)
+
+        try:
+            async with self._semaphores[host]:
+                start = time.perf_counter()
+                status, html = await asyncio.wait_for(self._request(host, netloc, path), self.timeout)
+                self.latencies.append((url, time.perf_counter() - start))
+        except (asyncio.TimeoutError, OSError) as e:
+            reason = 'timed out' if isinstance(e, asyncio.TimeoutError) else str(e)
+            if self.verbose:
+                print('Download error:', reason)
+            circuit_breaker.record_failure()
+            raise DownloadError("Request to {} failed: {}".format(url, reason))
+        except BaseException:
+            # i.e. the task was cancelled (also while waiting for a connection slot), which does not
+            # say anything about the server
+            circuit_breaker.record_cancelled()
+            raise
+
+        if status >= 400:
+            if self.verbose:
+                print('Download error: HTTP Error', status)
+            # client errors (i.e. 404) do not mean that the server is unavailable
+            if 500 <= status < 600 or status == 429:
+                circuit_breaker.record_failure()
+            else:
+                circuit_breaker.record_success()
+            raise DownloadError("HTTP Error {}".format(status), code=status)
+
+        circuit_breaker.record_success()
+
+        return html
+
+    async def _request(self, host, netloc, path):
+
+        # a pooled connection may have been closed by the server since it was last used,
+        # in which case the request is sent again with a new connection
+        while True:
+            reused, reader, writer = await self._acquire(host)
+            try:
+                status, body, keep_alive = await self._send(reader, writer, netloc, path)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                writer.close()
+                if not reused:
+                    raise ConnectionError(str(e))
+            except BaseException:
+                writer.close()
+                raise
+
+        if keep_alive:
+            self._idle_connections.setdefault(host, []).append((reader, writer))
+        else:
+            writer.close()
+
+        return status, body
+
+    async def _acquire(self, host):
+
+        idle_connections = self._idle_connections.get(host, [])
+        while idle_connections:
+            reader, writer = idle_connections.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return True, reader, writer
+            writer.close()
+
+        scheme, hostname, port = host
+        reader, writer = await asyncio.open_connection(hostname, port,
+                                                       ssl=ssl.create_default_context() if scheme == 'https' else None)
+        self.n_connections += 1
+
+        return False, reader, writer
+
+    async def _send(self, reader, writer, netloc, path):
+
+        writer.write("GET {} HTTP/1.1\r\nHost: {}\r\nUser-agent: {}\r\nConnection: keep-alive\r\n\r\n".format(
+            path, netloc, self.user_agent).encode('latin-1'))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by the server")
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+
+        headers = dict()
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+
+        if version == 'HTTP/1.1':
+            keep_alive = headers.get('connection') != 'close'
+        else:
+            keep_alive = headers.get('connection') == 'keep-alive'
+
+        if headers.get('transfer-encoding') == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # skip the trailer
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            # the end of the body is signalled by closing the connection
+            body = await reader.read()
+            keep_alive = False
+
+        return int(status), body, keep_alive
+
+    async def close(self):
+        """
+        Closes all the pooled connections.
+
+        Returns:
+
+        """
+        writers = [writer for connections in self._idle_connections.values() for _, writer in connections]
+        self._idle_connections = dict()
+        for writer in writers:
+            writer.close()
+        for writer in writers:
+            # StreamWriter.wait_closed was added in Python 3.7
+            if not hasattr(writer, 'wait_closed'):
+                continue
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _string_summary_basic(self):
+        return "abpytools.AsyncDownload connections: {}, requests: {}".format(self.n_connections,
+                                                                             len(self.latencies))
+
+    def __repr__(self):
+        return "<%s at 0x%02x>" % (self._string_summary_basic(), id(self))
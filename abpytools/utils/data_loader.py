@@ -1,5 +1,107 @@
-import json
+import threading
+from types import MappingProxyType
 from abpytools.home import Home
+from .reference_bundle import get_reference_bundle
+
+
+def _freeze(data):
+    # returns a read-only view of the parsed JSON data, so that it can be shared between callers
+    if isinstance(data, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in data.items()})
+    elif isinstance(data, list):
+        return tuple(_freeze(x) for x in data)
+    return data
+
+
+def _thaw(data):
+    # returns a copy of the read-only view with the types of the parsed JSON data (dict and list)
+    if isinstance(data, MappingProxyType):
+        return {key: _thaw(value) for key, value in data.items()}
+    elif isinstance(data, tuple):
+        return [_thaw(x) for x in data]
+    return data
+
+
+class ReferenceDataRegistry:
+    """
+    Process-wide registry of the reference data files in abpytools/data.
+    Each file is loaded once, on first use, from the reference bundle of the data directory (see ReferenceBundle)
+    and shared as a read-only view (dictionaries are returned as mappingproxy and lists as tuples).
+    """
+
+    data_files = {'CDR_positions': 'CDR_positions.json',
+                  'Framework_positions': 'Framework_positions.json',
+                  'NumberingSchemes': 'NumberingSchemes.json',
+                  'AminoAcidProperties': 'AminoAcidProperties.json'}
+
+    def __init__(self, directory_name=None):
+        """
+
+        :param directory_name: directory with the data folder, by default the abpytools installation directory
+        """
+        self.directory_name = Home().homedir if directory_name is None else directory_name
+        self._data = dict()
+        self._lock = threading.Lock()
+        self._n_parsed = {data_type: 0 for data_type in self.data_files}
+
+    def get(self, data_type):
+        """
+        Returns a read-only view of the contents of the data file of data_type.
+
+        :param data_type: str, one of ReferenceDataRegistry.data_files
+        :return:
+        """
+        # fast path, the data has already been parsed
+        data = self._data.get(data_type)
+        if data is not None:
+            return data
+
+        if data_type not in self.data_files:
+            raise ValueError("{} is not a valid data type. Available data types: {}".format(
+                data_type, ', '.join(self.data_files)))
+
+        with self._lock:
+            if data_type not in self._data:
+                bundle = get_reference_bundle('{}/data'.format(self.directory_name))
+                self._data[data_type] = _freeze(bundle.reference_data(data_type))
+                self._n_parsed[data_type] += 1
+            return self._data[data_type]
+
+    def clear(self):
+        """
+        Removes all the parsed data, which is parsed again on the next access.
+
+        :return:
+        """
+        with self._lock:
+            self._data = dict()
+
+    @property
+    def stats(self):
+        """
+        Returns the number of times each data file has been parsed.
+
+        :return: dict
+        """
+        return dict(self._n_parsed)
+
+
+_REFERENCE_DATA = ReferenceDataRegistry()
+
+
+def get_reference_data(data_type):
+    """
+    Returns a read-only view of the contents of the data file of data_type from the
+    process-wide ReferenceDataRegistry.
+
+    :param data_type: str, 'CDR_positions', 'Framework_positions', 'NumberingSchemes' or 'AminoAcidProperties'
+    :return:
+    """
+    return _REFERENCE_DATA.get(data_type)
+
+
+def get_reference_data_registry():
+    return _REFERENCE_DATA
 
 
 class DataLoader:
@@ -14,7 +116,7 @@ class DataLoader:
         :param misc: temporary parameter
         """
         self.amino_acid_property = amino_acid_property
-        self.directory_name = Home().homedir
+        self.directory_name = _REFERENCE_DATA.directory_name
         self.data = data
         self.data_types = ['CDR_positions', 'NumberingSchemes', 'AminoAcidProperties', 'Framework_positions']
 
@@ -58,21 +160,13 @@ class DataLoader:
                                                                             ))
 
     def get_data(self):
+        """
+        Returns a copy of the requested data, with the same types as the JSON file (dict and list).
+        For positions data (CDR_positions, Framework_positions and NumberingSchemes) self.data
+        is the numbering scheme and chain type, and for AminoAcidProperties it is the property and database.
+        Use get_reference_data to access the shared read-only view without copying it.
 
-        if self.data_type == 'CDR_positions':
-            with open('{}/data/CDR_positions.json'.format(self.directory_name), 'r') as f:
-                # need to access numbering scheme and chain type
-                data = json.load(f)[self.data[0]][self.data[1]]
-        elif self.data_type == 'Framework_positions':
-            with open('{}/data/Framework_positions.json'.format(self.directory_name), 'r') as f:
-                # need to access numbering scheme and chain type
-                data = json.load(f)[self.data[0]][self.data[1]]
-        elif self.data_type == 'NumberingSchemes':
-            with open('{}/data/NumberingSchemes.json'.format(self.directory_name), 'r') as f:
-                # need to access numbering scheme and chain type
-                data = json.load(f)[self.data[0]][self.data[1]]
-        else:
-            with open('{}/data/AminoAcidProperties.json'.format(self.directory_name), 'r') as f:
-                data = json.load(f)[self.data[0]][self.data[1]]
+        :return:
+        """
 
-        return data
+        return _thaw(get_reference_data(self.data_type)[self.data[0]][self.data[1]])
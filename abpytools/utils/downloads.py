@@ -1,25 +1,302 @@
-from urllib import request, error
+from urllib import request, error, parse
+from http.client import HTTPException
+import random
+import socket
+import threading
+import time
+
+
+class DownloadError(IOError):
+    """
+    Raised when a url could not be downloaded.
+
+    Attributes:
+        reason (str): description of the error
+        code (int): HTTP status code, None if the server did not respond
+    """
+
+    def __init__(self, reason, code=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.code = code
+
+
+class CircuitBreakerOpen(DownloadError):
+    """
+    Raised when a request is rejected because the circuit breaker of the host is open.
+    """
+    pass
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests are retried and how long to wait before each retry.
+
+    The delay before retry n (starting at 0) is backoff_factor * 2 ** n, capped at max_backoff,
+    of which a random fraction (up to jitter) is removed so that concurrent clients do not
+    retry in lockstep. Requests that failed with a status code in retry_status_codes,
+    or without a response (i.e. timeouts and connection errors) are retried.
+
+    Examples:
+        >>> from abpytools.utils import Download, RetryPolicy
+        >>> policy = RetryPolicy(num_retries=5, backoff_factor=1)
+        >>> page = Download('http://www.bioinf.org.uk/abs/abnum/', retry_policy=policy)
+    """
+
+    def __init__(self, num_retries=2, backoff_factor=0.5, max_backoff=30, jitter=0.5,
+                 retry_status_codes=(408, 429, 500, 502, 503, 504)):
+        """
+
+        Args:
+            num_retries (int): default number of times a request is retried
+            backoff_factor (float): delay in seconds before the first retry
+            max_backoff (float): maximum delay in seconds between retries
+            jitter (float): maximum fraction of the delay that is randomly removed, between 0 and 1
+            retry_status_codes (tuple): HTTP status codes that are retried
+        """
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+
+        self.num_retries = num_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_status_codes = frozenset(retry_status_codes)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+
+    def is_retryable(self, download_error):
+        """
+        Returns whether a request that raised download_error should be retried.
+
+        Args:
+            download_error (DownloadError):
+
+        Returns:
+            bool
+        """
+        if isinstance(download_error, CircuitBreakerOpen):
+            return False
+        return download_error.code is None or download_error.code in self.retry_status_codes
+
+    def backoff(self, retry):
+        """
+        Returns the delay in seconds before retry number retry (starting at 0).
+
+        Args:
+            retry (int):
+
+        Returns:
+            float
+        """
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** retry)
+        return delay * (1 - self.jitter * random.random())
+
+    def _record(self, retries, failed):
+        with self._lock:
+            self._requests += 1
+            self._retries += retries
+            self._failures += failed
+
+    @property
+    def stats(self):
+        """
+        Returns the number of requests, retries and requests that failed after all the retries.
+
+        Returns:
+            dict
+        """
+        return {"requests": self._requests, "retries": self._retries, "failures": self._failures}
+
+    def reset_stats(self):
+        with self._lock:
+            self._requests = 0
+            self._retries = 0
+            self._failures = 0
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after failure_threshold consecutive failures.
+
+    Once open, requests are rejected with CircuitBreakerOpen for recovery_timeout seconds.
+    Then a single trial request is let through (half-open state): the breaker closes if it succeeds
+    and opens again if it fails.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        """
+
+        Args:
+            failure_threshold (int): number of consecutive failures that open the breaker
+            recovery_timeout (float): time in seconds before a trial request is let through
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be a positive integer")
+
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.
+        self._trial_in_progress = False
+        self._opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self):
+        """
+        Returns whether a request can be sent to the host.
+
+        Returns:
+            bool
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_progress = False
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and
+                                                 self._consecutive_failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._opened += 1
+
+    def record_cancelled(self):
+        # a cancelled request neither succeeded nor failed, but it frees the trial request slot
+        with self._lock:
+            self._trial_in_progress = False
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_progress = False
+
+    @property
+    def stats(self):
+        """
+        Returns the state of the breaker, the number of times it opened and the number of rejected requests.
+
+        Returns:
+            dict
+        """
+        return {"state": self.state, "opened": self._opened, "rejected": self._rejected,
+                "consecutive_failures": self._consecutive_failures}
+
+
+_RETRY_POLICY = RetryPolicy()
+_CIRCUIT_BREAKERS = dict()
+_CIRCUIT_BREAKERS_LOCK = threading.Lock()
+
+
+def get_retry_policy():
+    """
+    Returns the retry policy used by default by Download and AsyncDownload.
+
+    Returns:
+        RetryPolicy
+    """
+    return _RETRY_POLICY
+
+
+def set_retry_policy(retry_policy):
+    """
+    Sets the retry policy used by default by Download and AsyncDownload.
+
+    Args:
+        retry_policy (RetryPolicy):
+
+    Returns:
+
+    """
+    global _RETRY_POLICY
+    if not isinstance(retry_policy, RetryPolicy):
+        raise TypeError("Expected a RetryPolicy object, instead got {}".format(type(retry_policy)))
+    _RETRY_POLICY = retry_policy
+
+
+def get_circuit_breaker(url):
+    """
+    Returns the circuit breaker of the host of url, which is shared by all the requests to that host.
+
+    Args:
+        url (str):
+
+    Returns:
+        CircuitBreaker
+    """
+    host = parse.urlsplit(url).netloc
+    with _CIRCUIT_BREAKERS_LOCK:
+        if host not in _CIRCUIT_BREAKERS:
+            _CIRCUIT_BREAKERS[host] = CircuitBreaker()
+        return _CIRCUIT_BREAKERS[host]
+
+
+def download_stats():
+    """
+    Returns the counters of the default retry policy and of the circuit breaker of each host.
+
+    Returns:
+        dict
+    """
+    with _CIRCUIT_BREAKERS_LOCK:
+        circuit_breakers = dict(_CIRCUIT_BREAKERS)
+    return {"retry_policy": _RETRY_POLICY.stats,
+            "circuit_breakers": {host: breaker.stats for host, breaker in circuit_breakers.items()}}
 
 
 class Download:
-    def __init__(self, url='', verbose=False, timeout=5):
+    def __init__(self, url='', verbose=False, timeout=5, retry_policy=None, circuit_breaker=None):
         self.url = url
         self.verbose = verbose
         self.html = ''
         self.error = False
         self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
 
-    def download(self, user_agent='wswp', num_retries=2):
-        # self.html, self.error = download(self.url, self.verbose, user_agent=user_agent, num_retries=num_retries,
-        #                                  timeout=self.timeout)
+    def download(self, user_agent='wswp', num_retries=None):
         try:
             self.html = download(self.url, self.verbose, user_agent=user_agent, num_retries=num_retries,
-                                 timeout=self.timeout)
+                                 timeout=self.timeout, retry_policy=self.retry_policy,
+                                 circuit_breaker=self.circuit_breaker)
         except IOError:
+            self.error = True
             raise ValueError("Could not download requested page.")
 
 
-def download(url, verbose, user_agent='wswp', num_retries=2, decoding_format='utf-8', timeout=5):
+def download(url, verbose, user_agent='wswp', num_retries=None, decoding_format='utf-8', timeout=5,
+             retry_policy=None, circuit_breaker=None):
     """
     Function to download contents from a given url
 
@@ -32,37 +309,80 @@ def download(url, verbose, user_agent='wswp', num_retries=2, decoding_format='ut
 
             num_retries: int
             Number of times to retry downloading
-            if there is an error
+            if there is a retryable error, by default
+            retry_policy.num_retries
 
             verbose: bool
             Print out url and errors
 
             decoding: "utf-8"
 
+            retry_policy: RetryPolicy
+            Default get_retry_policy()
+
+            circuit_breaker: CircuitBreaker
+            Default get_circuit_breaker(url)
+
     Output:
             returns: str
             string with contents of given url
     """
 
-    # html_error = False
+    retry_policy = retry_policy or get_retry_policy()
+    circuit_breaker = circuit_breaker or get_circuit_breaker(url)
+    if num_retries is None:
+        num_retries = retry_policy.num_retries
+
+    retry = 0
+    while True:
+        try:
+            html = _download(url, verbose, user_agent, timeout, circuit_breaker)
+            retry_policy._record(retry, False)
+            return html.decode(decoding_format)
+        except DownloadError as e:
+            if retry >= num_retries or not retry_policy.is_retryable(e):
+                retry_policy._record(retry, True)
+                raise
+            delay = retry_policy.backoff(retry)
+            if verbose:
+                print('Retrying in {:.2f}s'.format(delay))
+            time.sleep(delay)
+            retry += 1
+
+
+def _download(url, verbose, user_agent, timeout, circuit_breaker):
+
+    if not circuit_breaker.allow_request():
+        raise CircuitBreakerOpen("Too many failed requests to {}, not sending requests until {} s have passed".format(
+            parse.urlsplit(url).netloc, circuit_breaker.recovery_timeout))
+
     if verbose:
         print('Downloading:', url)
     headers = {'User-agent': user_agent}
-    request_obj = request.Request(url, headers=headers)
     try:
+        request_obj = request.Request(url, headers=headers)
         with request.urlopen(request_obj, timeout=timeout) as response:
             html = response.read()
-    except error.URLError as e:
+    except error.HTTPError as e:
         if verbose:
             print('Download error:', e.reason)
-        # html = None
-        # if num_retries > 0:
-        #     if hasattr(e, 'code') and 500 <= e.code < 600:
-        #         # retry 5XX HTTP errors
-        #         return download(url, user_agent, num_retries - 1)[0]
-        #     # elif hasattr(e, 'code') and e.code == 404:
-        #     else:
-        #         html_error = True
-        raise IOError(e.reason)
-
-    return html.decode(decoding_format)
+        # client errors (i.e. 404) do not mean that the server is unavailable
+        if 500 <= e.code < 600 or e.code == 429:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+        raise DownloadError(e.reason, code=e.code)
+    except (error.URLError, socket.timeout, ConnectionError, HTTPException) as e:
+        if verbose:
+            print('Download error:', getattr(e, 'reason', e))
+        circuit_breaker.record_failure()
+        raise DownloadError(str(getattr(e, 'reason', e)))
+    except BaseException:
+        # i.e. an invalid url or KeyboardInterrupt, which does not say anything about the server,
+        # but the trial request slot of a half-open breaker has to be freed
+        circuit_breaker.record_cancelled()
+        raise
+
+    circuit_breaker.record_success()
+
+    return html
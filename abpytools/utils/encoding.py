@@ -0,0 +1,127 @@
+import numpy as np
+
+# the twenty standard amino acids in alphabetical order, which is also the order used by the composition features
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+N_AMINO_ACIDS = len(AMINO_ACIDS)
+
+# the remaining ASCII characters (gaps, non standard residues, etc) are encoded after the standard amino acids, so
+# that the encoding is a bijection and sequences can be compared (i.e. edit distances) in their encoded form
+ALPHABET = AMINO_ACIDS + ''.join(chr(x) for x in range(128) if chr(x) not in AMINO_ACIDS)
+ALPHABET_SIZE = len(ALPHABET)
+
+INVALID_CODE = 255
+
+# code of the positions of a numbering table that are not occupied by a residue
+GAP_CODE = ALPHABET.index('-')
+
+_ENCODING_TABLE = np.full(256, INVALID_CODE, dtype=np.uint8)
+_ENCODING_TABLE[np.frombuffer(ALPHABET.encode('ascii'), dtype=np.uint8)] = np.arange(ALPHABET_SIZE, dtype=np.uint8)
+_ENCODING_TABLE.setflags(write=False)
+
+_DECODING_TABLE = np.frombuffer(ALPHABET.encode('ascii'), dtype=np.uint8)
+_DECODING_CHARACTERS = np.array(list(ALPHABET), dtype='<U1')
+
+
+def encode_ascii(values):
+    """
+    Encodes an array of ASCII bytes with the canonical residue encoding.
+
+    Args:
+        values (numpy.ndarray): uint8 ASCII codes
+
+    Returns:
+        numpy.ndarray: uint8 residue codes
+
+    """
+    codes = _ENCODING_TABLE[values]
+    if codes.size > 0 and codes.max() == INVALID_CODE:
+        raise ValueError("Sequences can only contain ASCII characters")
+    return codes
+
+
+def encode_sequence(sequence):
+    """
+    Returns the canonical uint8 encoding of a sequence, where the standard amino acids are encoded as
+    0-19 in alphabetical order (see AMINO_ACIDS) and any other ASCII character as 20-127.
+
+    Encoded sequences (numpy arrays) are returned as they are, so that the functions that consume encoded
+    sequences can also be called with str.
+
+    Examples:
+        >>> from abpytools.utils import encode_sequence
+        >>> encode_sequence('ACDY')
+        array([ 0,  1,  2, 19], dtype=uint8)
+
+    Args:
+        sequence (str): amino acid sequence
+
+    Returns:
+        numpy.ndarray: uint8 residue codes
+
+    """
+    if isinstance(sequence, np.ndarray):
+        if sequence.dtype != np.uint8:
+            raise ValueError("Expected an encoded sequence with dtype uint8, instead got {}".format(sequence.dtype))
+        return sequence
+    try:
+        values = np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        raise ValueError("Sequences can only contain ASCII characters")
+    return _ENCODING_TABLE[values]
+
+
+def decode_sequence(codes):
+    """
+    Returns the sequence of an encoded sequence.
+
+    Args:
+        codes (numpy.ndarray): uint8 residue codes
+
+    Returns:
+        str
+
+    """
+    return _DECODING_TABLE[codes].tobytes().decode('ascii')
+
+
+def decode_array(codes):
+    """
+    Returns an array with the character of each residue code, i.e. to decode an encoded numbering table.
+
+    Args:
+        codes (numpy.ndarray): uint8 residue codes
+
+    Returns:
+        numpy.ndarray: array of str with the same shape as codes
+
+    """
+    return _DECODING_CHARACTERS[codes]
+
+
+def residue_counts(sequence):
+    """
+    Number of each residue in a sequence.
+
+    Args:
+        sequence (str or numpy.ndarray): sequence or its encoding
+
+    Returns:
+        numpy.ndarray: counts with shape (ALPHABET_SIZE,), the first N_AMINO_ACIDS are the standard amino acids
+
+    """
+    return np.bincount(encode_sequence(sequence), minlength=ALPHABET_SIZE)
+
+
+def residue_table_from_ascii(table):
+    """
+    Returns a lookup table indexed by residue code from a lookup table indexed by ASCII code,
+    i.e. the amino acid tables of the reference bundle (see ReferenceBundle.amino_acid_table).
+
+    Args:
+        table (numpy.ndarray): with shape (128,)
+
+    Returns:
+        numpy.ndarray: with shape (ALPHABET_SIZE,)
+
+    """
+    return table[_DECODING_TABLE]
@@ -0,0 +1,235 @@
+import atexit
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LoadingExecutor:
+    """
+    Bounded thread pool shared by all the ChainCollection loads.
+
+    The worker threads are created once and reused by every load, instead of starting new threads
+    for each call. LoadingExecutor.stats reports the number of tasks waiting in the queue and how busy
+    the workers are.
+
+    Examples:
+        >>> from abpytools.utils import configure_loading_executor
+        >>> executor = configure_loading_executor(max_workers=8)
+        >>> executor.stats['max_workers']
+        8
+    """
+
+    def __init__(self, max_workers=20):
+        """
+
+        Args:
+            max_workers (int): number of worker threads
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be a positive integer")
+
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='abpytools-loader')
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._busy_time = 0.
+        self._start_time = time.monotonic()
+        # futures that have not finished, so that they can be cancelled on shutdown
+        self._futures = set()
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        start = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._busy_time += time.monotonic() - start
+
+    def _done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+            # a cancelled task never runs, so it is removed from the queue here
+            if future.cancelled():
+                self._queued -= 1
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedules fn(*args, **kwargs) to be run by one of the workers.
+
+        Args:
+            fn (callable):
+            *args:
+            **kwargs:
+
+        Returns:
+            concurrent.futures.Future
+        """
+        with self._lock:
+            self._queued += 1
+        try:
+            future = self._executor.submit(self._run, fn, args, kwargs)
+        except RuntimeError:
+            with self._lock:
+                self._queued -= 1
+            raise
+        with self._lock:
+            self._futures.add(future)
+        # called immediately if the future is already done
+        future.add_done_callback(self._done)
+        return future
+
+    def map(self, fn, iterable, max_in_flight=None):
+        """
+        Returns an iterator over fn(item) for each item of iterable, in the same order as iterable.
+        At most max_in_flight items are submitted at any time, so that large iterables are not
+        loaded into the queue at once.
+
+        Args:
+            fn (callable):
+            iterable:
+            max_in_flight (int): maximum number of items submitted and not yet returned,
+                                 by default twice the number of workers
+
+        Returns:
+            generator
+        """
+        if max_in_flight is None:
+            max_in_flight = 2 * self._max_workers
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be a positive integer")
+
+        futures = deque()
+        try:
+            for item in iterable:
+                if len(futures) >= max_in_flight:
+                    yield futures.popleft().result()
+                futures.append(self.submit(fn, item))
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            # cancel the remaining items if the caller stops iterating or an item raised an exception
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """
+        Stops the worker threads once the submitted tasks are done.
+
+        Args:
+            wait (bool): if True blocks until all the workers have stopped
+            cancel_pending (bool): if True the tasks that have not started are cancelled
+
+        Returns:
+
+        """
+        if cancel_pending:
+            with self._lock:
+                futures = list(self._futures)
+            for future in futures:
+                future.cancel()
+        # ThreadPoolExecutor.shutdown only accepts cancel_futures from python 3.9
+        if sys.version_info >= (3, 9):
+            self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+        else:
+            self._executor.shutdown(wait=wait)
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @property
+    def stats(self):
+        """
+        Returns the executor counters:
+            - max_workers: number of worker threads
+            - queue_depth: number of tasks waiting for a worker
+            - active_workers: number of workers running a task
+            - completed: number of tasks that have finished
+            - utilisation: fraction of the worker time spent running tasks since the executor was created
+
+        Returns:
+            dict
+        """
+        with self._lock:
+            elapsed_time = time.monotonic() - self._start_time
+            return {"max_workers": self._max_workers,
+                    "queue_depth": self._queued,
+                    "active_workers": self._active,
+                    "completed": self._completed,
+                    "utilisation": self._busy_time / (self._max_workers * elapsed_time) if elapsed_time > 0 else 0.}
+
+    def _string_summary_basic(self):
+        return "abpytools.LoadingExecutor workers: {}, queue depth: {}".format(self._max_workers, self._queued)
+
+    def __repr__(self):
+        return "<%s at 0x%02x>" % (self._string_summary_basic(), id(self))
+
+
+_LOADING_EXECUTOR = None
+_LOADING_EXECUTOR_LOCK = threading.Lock()
+DEFAULT_LOADING_WORKERS = 20
+
+
+def get_loading_executor():
+    """
+    Returns the executor shared by all the ChainCollection loads, which is created on first use
+    with DEFAULT_LOADING_WORKERS workers.
+
+    Returns:
+        LoadingExecutor
+    """
+    global _LOADING_EXECUTOR
+    with _LOADING_EXECUTOR_LOCK:
+        if _LOADING_EXECUTOR is None:
+            _LOADING_EXECUTOR = LoadingExecutor(max_workers=DEFAULT_LOADING_WORKERS)
+        return _LOADING_EXECUTOR
+
+
+def configure_loading_executor(max_workers):
+    """
+    Replaces the shared executor with a new one with max_workers workers.
+    The previous executor finishes the tasks that were already submitted.
+
+    Args:
+        max_workers (int):
+
+    Returns:
+        LoadingExecutor
+    """
+    global _LOADING_EXECUTOR
+    executor = LoadingExecutor(max_workers=max_workers)
+    with _LOADING_EXECUTOR_LOCK:
+        previous_executor, _LOADING_EXECUTOR = _LOADING_EXECUTOR, executor
+    if previous_executor is not None:
+        previous_executor.shutdown(wait=False)
+    return executor
+
+
+def shutdown_loading_executor(wait=True, cancel_pending=False):
+    """
+    Stops the shared executor. A new executor is created if it is needed again.
+
+    Args:
+        wait (bool): if True blocks until all the workers have stopped
+        cancel_pending (bool): if True the tasks that have not started are cancelled
+
+    Returns:
+
+    """
+    global _LOADING_EXECUTOR
+    with _LOADING_EXECUTOR_LOCK:
+        executor, _LOADING_EXECUTOR = _LOADING_EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_pending=cancel_pending)
+
+
+atexit.register(shutdown_loading_executor, wait=True, cancel_pending=True)
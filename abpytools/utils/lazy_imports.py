@@ -0,0 +1,62 @@
+import importlib
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Placeholder for a module that is imported on first attribute access.
+
+    Heavy optional dependencies (matplotlib, seaborn, pandas, scipy and sklearn) are only needed by
+    the plotting, table and clustering methods, so they are bound to a LazyModule at import time
+    instead of being imported, and `import abpytools` stays cheap for code that only numbers chains.
+
+    Examples:
+        >>> from abpytools.utils.lazy_imports import lazy_import
+        >>> pd = lazy_import('pandas')  # pandas is not imported yet
+        >>> df = pd.DataFrame()  # pandas is imported here
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_lock'] = threading.Lock()
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with self.__dict__['_lazy_lock']:
+                if self.__dict__['_lazy_module'] is None:
+                    self.__dict__['_lazy_module'] = importlib.import_module(self.__name__)
+                module = self.__dict__['_lazy_module']
+        return module
+
+    def __getattr__(self, item):
+        # only called for attributes that are not set on the placeholder itself
+        return getattr(self._load(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self._load(), key, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def is_loaded(self):
+        return self.__dict__['_lazy_module'] is not None
+
+    def __repr__(self):
+        return "<abpytools.LazyModule {} ({})>".format(self.__name__, 'loaded' if self.is_loaded else 'not loaded')
+
+
+def lazy_import(name):
+    """
+    Returns a placeholder that imports module name on first attribute access.
+
+    Args:
+        name (str): full name of the module, i.e. 'matplotlib.pyplot'
+
+    Returns:
+        LazyModule
+    """
+    return LazyModule(name)
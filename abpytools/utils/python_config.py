@@ -1,11 +1,13 @@
 import sys
-from matplotlib import pyplot as plt
+from .lazy_imports import lazy_import
+
+plt = lazy_import('matplotlib.pyplot')
 
 
 class PythonConfig:
     def __init__(self):
         self._backend = get_ipython_info()
-        self._matplotlib_interactive = plt.isinteractive()
+        self._matplotlib_interactive = None
 
     @property
     def ipython_info(self):
@@ -13,6 +15,9 @@ class PythonConfig:
 
     @property
     def matplotlib_interactive(self):
+        # matplotlib is only imported when this is needed
+        if self._matplotlib_interactive is None:
+            self._matplotlib_interactive = plt.isinteractive()
         return self._matplotlib_interactive  # pragma: no cover
 
 
@@ -25,3 +30,22 @@ def get_ipython_info():
     elif 'IPython' in sys.modules:
         ip = 'terminal'
     return ip
+
+
+def progressbar(iterable=None, **kwargs):
+    """
+    Returns a tqdm progress bar, or a tqdm_notebook progress bar when running in a notebook.
+    tqdm is imported on the first call.
+
+    Args:
+        iterable:
+        **kwargs: keyword arguments passed on to tqdm
+
+    Returns:
+        tqdm
+    """
+    if get_ipython_info() == 'notebook':
+        from tqdm import tqdm_notebook as tqdm  # pragma: no cover
+    else:
+        from tqdm import tqdm
+    return tqdm(iterable, **kwargs)
@@ -0,0 +1,235 @@
+"""
+Array views of the reference data in abpytools/data.
+
+The JSON files (NumberingSchemes, CDR_positions, Framework_positions and AminoAcidProperties)
+are parsed on first use, and the arrays derived from them are built on first use and cached:
+
+    - positions: position names of a numbering scheme, the index of a position is its integer code
+    - region slices: [start, stop) slice of the position codes of each region of a numbering scheme
+    - amino acid tables: float64 lookup table of an amino acid property indexed by the ASCII code of
+      the amino acid (NaN for missing amino acids)
+
+The arrays are read-only, so that they can be shared by all the callers.
+"""
+import json
+import os
+import pickle
+import threading
+import numpy as np
+
+REGIONS = ('FR1', 'CDR1', 'FR2', 'CDR2', 'FR3', 'CDR3', 'FR4')
+
+JSON_SOURCES = {'CDR_positions': 'CDR_positions.json',
+                'Framework_positions': 'Framework_positions.json',
+                'NumberingSchemes': 'NumberingSchemes.json',
+                'AminoAcidProperties': 'AminoAcidProperties.json'}
+
+SUBSTITUTION_MATRIX_SOURCES = {'BLOSUM45': 'BLOSUM45.txt',
+                               'BLOSUM62': 'BLOSUM62.txt',
+                               'BLOSUM80': 'BLOSUM80.txt'}
+
+DEFAULT_DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def _is_amino_acid_table(data):
+    # a table maps single letter amino acids (and optionally other keys, i.e. water) to numbers
+    return isinstance(data, dict) and len(data) > 0 and \
+        all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in data.values()) and \
+        any(len(x) == 1 for x in data)
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+class ReferenceBundle:
+    """
+    Read-only array views of the reference data files in a data directory.
+    Each file is parsed once and each array is built once, on first use.
+
+    Examples:
+        >>> from abpytools.utils import get_reference_bundle
+        >>> bundle = get_reference_bundle()
+        >>> bundle.positions('chothia', 'heavy')[:3]
+        array(['H1', 'H2', 'H3'], dtype='<U5')
+    """
+
+    def __init__(self, data_directory=None):
+        """
+
+        Args:
+            data_directory (str): directory with the reference data files, by default abpytools/data
+        """
+        self.data_directory = DEFAULT_DATA_DIRECTORY if data_directory is None else data_directory
+        self._cache = dict()
+        self._lock = threading.RLock()
+
+    def _cached(self, key, build):
+        value = self._cache.get(key)
+        if value is None:
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = build()
+                value = self._cache[key]
+        return value
+
+    @property
+    def regions(self):
+        return REGIONS
+
+    def reference_data(self, data_type):
+        """
+        Returns the contents of the JSON file of data_type. The file is parsed once and the data
+        is shared by all the callers, so it must not be modified.
+
+        Args:
+            data_type (str): 'CDR_positions', 'Framework_positions', 'NumberingSchemes' or 'AminoAcidProperties'
+
+        Returns:
+            dict
+        """
+        if data_type not in JSON_SOURCES:
+            raise ValueError("{} is not a valid data type. Available data types: {}".format(
+                data_type, ', '.join(JSON_SOURCES)))
+        return self._cached(('reference_data', data_type), lambda: self._parse(data_type))
+
+    def _parse(self, data_type):
+        with open(os.path.join(self.data_directory, JSON_SOURCES[data_type]), 'r') as f:
+            return json.load(f)
+
+    def _check_scheme(self, numbering_scheme, chain):
+        numbering_schemes = self.reference_data('NumberingSchemes')
+        if numbering_scheme not in numbering_schemes:
+            raise ValueError("Got {}, but only {} are available".format(numbering_scheme,
+                                                                        ', '.join(numbering_schemes)))
+        if chain not in numbering_schemes[numbering_scheme]:
+            raise ValueError("Got {}, but only light and heavy are available".format(chain))
+
+    def positions(self, numbering_scheme, chain):
+        """
+        Returns the position names of numbering_scheme, the index of each position is its integer code.
+
+        Args:
+            numbering_scheme (str): 'chothia', 'chothia_ext' or 'kabat'
+            chain (str): 'heavy' or 'light'
+
+        Returns:
+            numpy.ndarray: read-only array of str
+        """
+        self._check_scheme(numbering_scheme, chain)
+        return self._cached(('positions', numbering_scheme, chain), lambda: _read_only(
+            np.array(self.reference_data('NumberingSchemes')[numbering_scheme][chain], dtype=np.str_)))
+
+    def position_codes(self, numbering_scheme, chain):
+        """
+        Returns a dictionary with the integer code of each position name of numbering_scheme.
+
+        Args:
+            numbering_scheme (str): 'chothia', 'chothia_ext' or 'kabat'
+            chain (str): 'heavy' or 'light'
+
+        Returns:
+            dict
+        """
+        self._check_scheme(numbering_scheme, chain)
+        return self._cached(('position_codes', numbering_scheme, chain), lambda: {
+            position: code for code, position in
+            enumerate(self.reference_data('NumberingSchemes')[numbering_scheme][chain])})
+
+    def region_slices(self, numbering_scheme, chain):
+        """
+        Returns the [start, stop) slice of the position codes of each region of numbering_scheme.
+
+        Args:
+            numbering_scheme (str): 'chothia', 'chothia_ext' or 'kabat'
+            chain (str): 'heavy' or 'light'
+
+        Returns:
+            dict
+        """
+        self._check_scheme(numbering_scheme, chain)
+        return self._cached(('region_slices', numbering_scheme, chain),
+                            lambda: self._build_region_slices(numbering_scheme, chain))
+
+    def _build_region_slices(self, numbering_scheme, chain):
+        position_codes = self.position_codes(numbering_scheme, chain)
+        region_slices = dict()
+        for data_type in ('Framework_positions', 'CDR_positions'):
+            for region, positions in self.reference_data(data_type)[numbering_scheme][chain].items():
+                codes = [position_codes[position] for position in positions]
+                if codes != list(range(codes[0], codes[0] + len(codes))):
+                    raise ValueError("{} {} {} positions are not contiguous in the numbering scheme".format(
+                        numbering_scheme, chain, region))
+                region_slices[region] = (codes[0], codes[-1] + 1)
+        return region_slices
+
+    def amino_acid_table(self, amino_acid_property, database):
+        """
+        Returns the values of amino_acid_property from database as a lookup table indexed by the
+        ASCII code of each amino acid, i.e. table[ord('A')]. Missing amino acids are NaN.
+
+        Args:
+            amino_acid_property (str): i.e. 'hydrophobicity'
+            database (str): i.e. 'kdHydrophobicity'
+
+        Returns:
+            numpy.ndarray: read-only array of float64 with shape (128,)
+        """
+        data = self.reference_data('AminoAcidProperties').get(amino_acid_property, {}).get(database)
+        if not _is_amino_acid_table(data):
+            raise ValueError("{} {} is not an amino acid table".format(amino_acid_property, database))
+
+        def build():
+            table = np.full(128, np.nan, dtype=np.float64)
+            for amino_acid, value in data.items():
+                if len(amino_acid) == 1:
+                    table[ord(amino_acid)] = value
+            return _read_only(table)
+
+        return self._cached(('amino_acid_table', amino_acid_property, database), build)
+
+    def substitution_matrix_dict(self, name):
+        """
+        Returns the substitution matrix as a dictionary with (residue_1, residue_2) keys.
+
+        Args:
+            name (str): 'BLOSUM45', 'BLOSUM62' or 'BLOSUM80'
+
+        Returns:
+            dict
+        """
+        if name not in SUBSTITUTION_MATRIX_SOURCES:
+            raise ValueError("Unknown substitution matrix")
+        with open(os.path.join(self.data_directory, SUBSTITUTION_MATRIX_SOURCES[name]), 'rb') as f:
+            return pickle.load(f)
+
+    def _string_summary_basic(self):
+        return "abpytools.ReferenceBundle data directory: {}".format(self.data_directory)
+
+    def __repr__(self):
+        return "<%s at 0x%02x>" % (self._string_summary_basic(), id(self))
+
+
+_REFERENCE_BUNDLES = dict()
+_REFERENCE_BUNDLES_LOCK = threading.Lock()
+
+
+def get_reference_bundle(data_directory=None):
+    """
+    Returns the reference bundle of data_directory, which is created once per process.
+
+    Args:
+        data_directory (str): directory with the reference data files, by default abpytools/data
+
+    Returns:
+        ReferenceBundle
+    """
+    data_directory = DEFAULT_DATA_DIRECTORY if data_directory is None else os.path.abspath(data_directory)
+    bundle = _REFERENCE_BUNDLES.get(data_directory)
+    if bundle is None:
+        with _REFERENCE_BUNDLES_LOCK:
+            if data_directory not in _REFERENCE_BUNDLES:
+                _REFERENCE_BUNDLES[data_directory] = ReferenceBundle(data_directory)
+            bundle = _REFERENCE_BUNDLES[data_directory]
+    return bundle
@@ -56,6 +56,8 @@ if use_cython:
                                    language='c++'),
                          Extension("abpytools.analysis.distance_metrics_",
                                    ["abpytools/analysis/distance_metrics_.pyx"],
+                                   extra_compile_args=['-fopenmp'],
+                                   extra_link_args=['-fopenmp'],
                                    language='c++')
                          ]
 
@@ -240,10 +242,12 @@ setup(
               'abpytools.core',
               'abpytools.core.flags',
               'abpytools.core.formats',
+              'abpytools.core.numbering',
               'abpytools.analysis',
               'abpytools.features',
               'abpytools.cython_extensions'],
     package_data={'abpytools': ['data/*.json',
+                                'data/*.txt',
                                 'config.ini']},
     url='https://github.com/gf712/AbPyTools',
     license=about['__license__'],
@@ -1,5 +1,14 @@
+import atexit
+import os
+import shutil
+import tempfile
 from urllib import request
 
+# the tests use a numbering cache in a temporary directory instead of ~/.abpytools
+_NUMBERING_CACHE_DIRECTORY = tempfile.mkdtemp(prefix='abpytools-tests-')
+atexit.register(shutil.rmtree, _NUMBERING_CACHE_DIRECTORY, True)
+os.environ['ABPYTOOLS_NUMBERING_CACHE'] = os.path.join(_NUMBERING_CACHE_DIRECTORY, 'numbering_cache.sqlite')
+
 ABNUM_URL = 'http://www.bioinf.org.uk/abs/abnum'
 IGBLAST_URL = 'https://www.ncbi.nlm.nih.gov/igblast/'
 
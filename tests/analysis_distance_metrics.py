@@ -1,5 +1,8 @@
 import unittest
 from abpytools.analysis.distance_metrics import *
+from abpytools.analysis.distance_metrics_ import levenshtein_tile_, levenshtein_distance_
+from parameterized import parameterized
+import numpy as np
 
 
 class DistanceMetricsTest(unittest.TestCase):
@@ -11,6 +14,7 @@ class DistanceMetricsTest(unittest.TestCase):
 
         cls.seq1 = 'Python'
         cls.seq2 = 'Peithen'
+        cls.sequences = ['Python', 'Peithen', '', 'CARDYW', 'CARDGYFDYW', 'P', 'Python', 'nohtyP']
 
     def test_cosine_distance_1(self):
         self.assertAlmostEqual(cosine_distance(self.vector1, self.vector2),
@@ -32,6 +36,73 @@ class DistanceMetricsTest(unittest.TestCase):
     def test_levenshtein_distance(self):
         self.assertEqual(levenshtein_distance(self.seq1, self.seq2), 3)
 
+    @parameterized.expand([
+        ("empty", '', 'CARDYW', 6),
+        ("insertion", 'CARDYW', 'CARDGYFDYW', 4),
+        ("identical", 'CARDYW', 'CARDYW', 0)
+    ])
+    def test_levenshtein_distance_edge_cases(self, name, seq1, seq2, expected):
+        self.assertEqual(levenshtein_distance(seq1, seq2), expected)
+        self.assertEqual(levenshtein_distance(seq2, seq1), expected)
+
+    @parameterized.expand([
+        ("one_word", 40),
+        ("word_boundary", 64),
+        ("two_words", 100),
+        ("three_words", 150)
+    ])
+    def test_levenshtein_distance_bit_parallel(self, name, length):
+        # compared with the dynamic programming backend
+        random_state = np.random.RandomState(length)
+        seq1 = random_state.randint(0, 4, size=length).astype(np.uint8)
+        seq2 = np.concatenate([seq1[:length // 3], random_state.randint(0, 4, size=7),
+                               seq1[length // 2:]]).astype(np.uint8)
+        for x, y in [(seq1, seq2), (seq2, seq1), (seq1, seq1[::-1].copy())]:
+            self.assertEqual(levenshtein_distance(x, y), levenshtein_distance_(x, y))
+
+    @parameterized.expand([
+        ("within", 3, 3),
+        ("exceeded", 2, 3),
+        ("zero", 0, 1),
+        ("length_difference", 1, 2)
+    ])
+    def test_levenshtein_distance_max_distance(self, name, max_distance, expected):
+        seq2 = self.seq2 if name != "length_difference" else 'Pyt'
+        self.assertEqual(levenshtein_distance(self.seq1, seq2, max_distance=max_distance), expected)
+
+    def test_levenshtein_distance_max_distance_exception(self):
+        self.assertRaises(ValueError, levenshtein_distance, self.seq1, self.seq2, max_distance=-1)
+
+    def test_levenshtein_distances(self):
+        self.assertEqual(levenshtein_distances(self.seq1, self.sequences).tolist(),
+                         [levenshtein_distance(self.seq1, x) for x in self.sequences])
+
+    def test_levenshtein_distance_matrix(self):
+        self.assertEqual(levenshtein_distance_matrix(self.sequences, n_threads=2).tolist(),
+                         [[levenshtein_distance(x, y) for y in self.sequences] for x in self.sequences])
+
+    def test_levenshtein_distance_matrix_max_distance(self):
+        self.assertEqual(levenshtein_distance_matrix(self.sequences, max_distance=4).tolist(),
+                         [[min(levenshtein_distance(x, y), 5) for y in self.sequences] for x in self.sequences])
+        self.assertEqual(levenshtein_distances(self.seq1, self.sequences, max_distance=4).tolist(),
+                         [min(levenshtein_distance(self.seq1, x), 5) for x in self.sequences])
+
+    @parameterized.expand([
+        ("diagonal", (2, 6, 2, 6)),
+        ("overlap", (1, 5, 3, 8)),
+        ("off_diagonal", (0, 3, 4, 8))
+    ])
+    def test_levenshtein_tile(self, name, tile):
+        values, offsets = concatenate_sequences(self.sequences)
+        row_start, row_stop, column_start, column_stop = tile
+        self.assertEqual(levenshtein_tile_(values, offsets, *tile).tolist(),
+                         [[levenshtein_distance(self.sequences[i], self.sequences[j])
+                           for j in range(column_start, column_stop)] for i in range(row_start, row_stop)])
+
+    def test_levenshtein_tile_exception(self):
+        values, offsets = concatenate_sequences(self.sequences)
+        self.assertRaises(ValueError, levenshtein_tile_, values, offsets, 0, 9, 0, 8)
+
     def test_euclidean_distance(self):
         self.assertAlmostEqual(euclidean_distance(self.vector1, self.vector2),
                                4.4721359549995796)
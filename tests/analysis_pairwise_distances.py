@@ -0,0 +1,262 @@
+import unittest
+from abpytools import ChainCollection
+from abpytools.analysis.distance_metrics import *
+from abpytools.analysis.pairwise import (DistanceEngine, FunctionDistanceEngine, pairwise_distances,
+                                         parallel_pairwise_distances, memmap_pairwise_distances, condensed_size,
+                                         write_condensed_tile, parallel_block_size, upper_triangle_tiles,
+                                         AVAILABLE_METRICS, TILES_PER_PROCESS)
+from abpytools.analysis import pairwise
+from unittest import mock
+from parameterized import parameterized
+import numpy as np
+import tempfile
+import os
+
+
+class PairwiseDistancesTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        random_state = np.random.RandomState(0)
+        cls.features = random_state.rand(40, 20)
+        # orthogonal and identical vectors
+        cls.features[3] = 0
+        cls.features[3, 0] = 1
+        cls.features[4] = 0
+        cls.features[4, 1] = 1
+        cls.features[6] = cls.features[5]
+        cls.sequences = random_state.randint(0, 21, size=(40, 30)).astype(np.uint8)
+
+    @parameterized.expand([
+        ("cosine_distance", cosine_distance),
+        ("cosine_similarity", cosine_similarity),
+        ("euclidean_distance", euclidean_distance),
+        ("manhattan_distance", manhattan_distance)
+    ])
+    def test_pairwise_distances_same_values(self, metric, function):
+        expected = [[0 if i == j else function(list(x), list(y)) for j, y in enumerate(self.features)]
+                    for i, x in enumerate(self.features)]
+        np.testing.assert_allclose(pairwise_distances(self.features, metric=metric, block_size=16, dtype=np.float64),
+                                   expected, atol=1e-6)
+
+    def test_pairwise_distances_hamming(self):
+        expected = [[hamming_distance(x, y) for y in self.sequences] for x in self.sequences]
+        np.testing.assert_array_equal(pairwise_distances(self.sequences, metric='hamming_distance', block_size=16),
+                                      expected)
+
+    @parameterized.expand([(x,) for x in AVAILABLE_METRICS])
+    def test_pairwise_distances_condensed(self, metric):
+        data = self.sequences if metric == 'hamming_distance' else self.features
+        square = pairwise_distances(data, metric=metric, block_size=16)
+        condensed = pairwise_distances(data, metric=metric, block_size=16, condensed=True)
+        self.assertEqual(condensed.dtype, np.float32)
+        self.assertEqual(condensed.shape, (condensed_size(40),))
+        np.testing.assert_array_equal(condensed, square[np.triu_indices(40, k=1)])
+        np.testing.assert_array_equal(square, square.T)
+
+    def test_DistanceEngine_tiles(self):
+        # the tiles cover each pair of the upper triangle once
+        engine = DistanceEngine(self.features, metric='euclidean_distance')
+        covered = np.zeros((40, 40), dtype=int)
+        for row_start, row_stop, column_start, column_stop in engine.tiles(block_size=16):
+            covered[row_start:row_stop, column_start:column_stop] += 1
+        self.assertTrue(np.all(covered[np.triu_indices(40)] == 1))
+
+    def test_write_condensed_tile(self):
+        distances = np.zeros(condensed_size(4))
+        write_condensed_tile(distances, 4, np.arange(8).reshape(2, 4), 0, 0)
+        self.assertEqual(distances.tolist(), [1, 2, 3, 6, 7, 0])
+
+    @parameterized.expand([
+        ("metric", np.zeros((2, 2)), dict(metric='levenshtein_distance')),
+        ("shape", np.zeros(2), dict())
+    ])
+    def test_DistanceEngine_exception(self, name, data, kwargs):
+        self.assertRaises(ValueError, DistanceEngine, data, **kwargs)
+
+    @parameterized.expand([
+        ("square", False),
+        ("condensed", True)
+    ])
+    def test_parallel_pairwise_distances(self, name, condensed):
+        for metric in AVAILABLE_METRICS:
+            data = self.sequences if metric == 'hamming_distance' else self.features
+            expected = pairwise_distances(data, metric=metric, condensed=condensed, block_size=16)
+            distances = parallel_pairwise_distances(data, metric=metric, condensed=condensed, block_size=16,
+                                                    n_processes=2)
+            np.testing.assert_array_equal(distances, expected)
+
+    @parameterized.expand([
+        ("small", 40, 2),
+        ("one_default_block", 1000, 2),
+        ("many_processes", 1000, 16),
+        ("large", 100000, 4)
+    ])
+    def test_parallel_block_size(self, name, n, n_processes):
+        self.assertGreaterEqual(len(upper_triangle_tiles(n, parallel_block_size(n, n_processes))),
+                                min(TILES_PER_PROCESS * n_processes, n * (n + 1) // 2))
+        self.assertLessEqual(parallel_block_size(n, n_processes), 1024)
+
+    def test_parallel_pairwise_distances_tiles(self):
+        # the observations fit in a single tile of DEFAULT_BLOCK_SIZE, but each process gets several tiles
+        with mock.patch.object(pairwise, 'run_parallel_tiles', wraps=pairwise.run_parallel_tiles) as run:
+            distances = parallel_pairwise_distances(self.features, metric='euclidean_distance', n_processes=2)
+        tiles = run.call_args[0][2]
+        self.assertGreaterEqual(len(tiles), 2 * TILES_PER_PROCESS)
+        np.testing.assert_array_equal(distances, pairwise_distances(self.features, metric='euclidean_distance'))
+
+    def test_parallel_pairwise_distances_without_shared_memory(self):
+        # before python 3.8 the shared arrays are memmaps of temporary files
+        with mock.patch.object(pairwise, '_get_shared_memory', return_value=None):
+            distances = parallel_pairwise_distances(self.sequences, metric='hamming_distance', condensed=True,
+                                                    n_processes=2)
+        np.testing.assert_array_equal(distances, pairwise_distances(self.sequences, metric='hamming_distance',
+                                                                    condensed=True))
+
+    def test_parallel_pairwise_distances_function(self):
+        sequences = ['QVQL' * i for i in range(1, 12)]
+        expected = [[levenshtein_distance(x, y) for y in sequences] for x in sequences]
+        distances = pairwise_distances(sequences, metric=levenshtein_distance, block_size=4, n_processes=2)
+        np.testing.assert_array_equal(distances, expected)
+
+    @parameterized.expand([
+        ("serial", 1),
+        ("parallel", 2)
+    ])
+    def test_pairwise_distances_levenshtein(self, name, n_processes):
+        sequences = ['QVQL' * i for i in range(1, 12)] + ['', 'EVQL']
+        expected = pairwise_distances(sequences, metric=levenshtein_distance, block_size=4, condensed=True)
+        distances = pairwise_distances(sequences, metric='levenshtein_distance', block_size=4, condensed=True,
+                                       n_processes=n_processes)
+        np.testing.assert_array_equal(distances, expected)
+
+    def test_pairwise_distances_levenshtein_max_distance(self):
+        sequences = ['CARDYW', 'CARDGYW', 'CARDGYFDYW', 'CTTGYW', '']
+        expected = np.minimum(pairwise_distances(sequences, metric='levenshtein_distance'), 3)
+        np.testing.assert_array_equal(pairwise_distances(sequences, metric='levenshtein_distance', max_distance=2),
+                                      expected)
+        self.assertRaises(ValueError, pairwise_distances, self.features, metric='euclidean_distance',
+                          max_distance=2)
+
+    def test_FunctionDistanceEngine_tile(self):
+        sequences = ['QVQL' * i for i in range(1, 6)]
+        engine = FunctionDistanceEngine(sequences, metric=levenshtein_distance)
+        self.assertEqual(engine.tile(0, 2, 0, 2).tolist(), [[0, 4], [4, 0]])
+        self.assertEqual(engine.tile(0, 1, 3, 5).tolist(), [[12, 16]])
+
+    def test_parallel_pairwise_distances_exception(self):
+        self.assertRaises(ValueError, parallel_pairwise_distances, self.features, n_processes=0)
+
+    @parameterized.expand([
+        ("square", False, 1),
+        ("condensed", True, 1),
+        ("square_parallel", False, 2),
+        ("condensed_parallel", True, 2)
+    ])
+    def test_memmap_pairwise_distances(self, name, condensed, n_processes):
+        expected = pairwise_distances(self.features, metric='euclidean_distance', condensed=condensed, block_size=16)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'distances.npy')
+            distances = memmap_pairwise_distances(self.features, path, metric='euclidean_distance',
+                                                  condensed=condensed, block_size=16, n_processes=n_processes)
+            self.assertIsInstance(distances, np.memmap)
+            np.testing.assert_array_equal(distances, expected)
+            np.testing.assert_array_equal(np.load(path), expected)
+            del distances
+
+    def test_memmap_pairwise_distances_resume(self):
+        calls = []
+
+        def distance(x, y):
+            # simulate a crash in the fourth tile, after the 120 + 256 + 128 pairs of the first three tiles
+            calls.append((x, y))
+            if interrupt and len(calls) > 504:
+                raise RuntimeError
+            return np.abs(x - y).sum()
+
+        features = list(self.features)
+        expected = pairwise_distances(self.features, metric='manhattan_distance', condensed=True, block_size=16,
+                                      dtype=np.float64)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'distances.npy')
+            interrupt = True
+            self.assertRaises(RuntimeError, memmap_pairwise_distances, features, path, metric=distance,
+                              condensed=True, block_size=16, dtype=np.float64)
+            with open(path + '.checkpoint', 'r') as f:
+                self.assertEqual(len(f.readlines()), 4)
+
+            # the checkpoint cannot be used with different parameters or data
+            self.assertRaises(ValueError, memmap_pairwise_distances, features, path, metric=distance,
+                              condensed=True, block_size=8, dtype=np.float64)
+            self.assertRaises(ValueError, memmap_pairwise_distances, features[::-1], path, metric=distance,
+                              condensed=True, block_size=16, dtype=np.float64)
+
+            # the first three tiles are not computed again
+            interrupt = False
+            del calls[:]
+            distances = memmap_pairwise_distances(features, path, metric=distance, condensed=True, block_size=16,
+                                                  dtype=np.float64)
+            self.assertEqual(len(calls), condensed_size(40) - 504)
+            np.testing.assert_allclose(distances, expected)
+            del distances
+            # the checkpoint is removed once all the tiles are written
+            self.assertFalse(os.path.isfile(path + '.checkpoint'))
+
+    def test_memmap_pairwise_distances_different_data(self):
+        random_state = np.random.RandomState(1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'distances.npy')
+            for _ in range(2):
+                features = random_state.rand(50, 10)
+                distances = memmap_pairwise_distances(features, path, metric='euclidean_distance', block_size=16)
+                np.testing.assert_array_equal(distances, pairwise_distances(features, metric='euclidean_distance',
+                                                                            block_size=16))
+                del distances
+
+
+class ChainCollectionDistanceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.collection = ChainCollection.load_from_file(path='./tests/Data/chain_collection_light_2_sequences.json',
+                                                        show_progressbar=False, verbose=False)
+
+    def test_ChainCollection_distance_matrix(self):
+        features = self.collection.composition(method='chou')
+        distances = self.collection.distance_matrix(feature='chou', metric='cosine_distance')
+        self.assertEqual(distances[0][0], 0)
+        self.assertAlmostEqual(distances[0][1], cosine_distance(features[0], features[1]))
+        self.assertEqual(distances[0][1], distances[1][0])
+
+    def test_ChainCollection_distance_matrix_levenshtein(self):
+        distances = self.collection.distance_matrix(metric='levenshtein_distance')
+        expected = levenshtein_distance(*self.collection.sequences)
+        self.assertEqual(distances, [[0, expected], [expected, 0]])
+
+    @parameterized.expand([
+        ("cosine_distance", 'chou'),
+        ("levenshtein_distance", None)
+    ])
+    def test_ChainCollection_distance_matrix_multiprocessing(self, metric, feature):
+        self.assertEqual(self.collection.distance_matrix(feature=feature, metric=metric, multiprocessing=True),
+                         self.collection.distance_matrix(feature=feature, metric=metric))
+
+    def test_ChainCollection_pairwise_distances_aligned(self):
+        distances = self.collection.pairwise_distances(feature='aligned', metric='hamming_distance', condensed=True)
+        self.assertEqual(distances.tolist(), [hamming_distance(*self.collection.numbering_table(encoded=True))])
+
+    def test_ChainCollection_pairwise_distances_max_distance(self):
+        distances = self.collection.pairwise_distances(metric='levenshtein_distance', condensed=True, max_distance=1)
+        self.assertEqual(distances.tolist(), [min(levenshtein_distance(*self.collection.sequences), 2)])
+
+    def test_ChainCollection_distance_matrix_path(self):
+        expected = self.collection.distance_matrix(feature='chou', metric='cosine_distance')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'distances.npy')
+            distances = self.collection.distance_matrix(feature='chou', metric='cosine_distance', path=path,
+                                                        condensed=True)
+            np.testing.assert_allclose(distances, [expected[0][1]], rtol=1e-6)
+            del distances
+
+    def test_ChainCollection_pairwise_distances_exception(self):
+        self.assertRaises(ValueError, self.collection.pairwise_distances, metric='euclidean_distance')
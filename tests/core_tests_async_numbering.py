@@ -0,0 +1,189 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib import parse
+from abpytools import Chain, ChainCollection
+from abpytools.core.flags import *
+from abpytools.core.numbering import local_numbering, get_numbering_cache, set_numbering_cache, NumberingCache
+from abpytools.utils import (AsyncDownload, NumberingException, RetryPolicy, get_retry_policy, set_retry_policy,
+                             get_circuit_breaker)
+from parameterized import parameterized
+
+
+class AbnumStubHandler(BaseHTTPRequestHandler):
+    """
+    Mimics the plain text output of the abnum server using the local numbering engine.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.n_active += 1
+            server.max_active = max(server.max_active, server.n_active)
+            server.connections.add(self.client_address)
+
+        query = parse.parse_qs(parse.urlsplit(self.path).query)
+        sequence = query['aaseq'][0]
+        time.sleep(server.delay)
+
+        if sequence == 'ERROR':
+            status, body = 500, ''
+        else:
+            try:
+                numbering = local_numbering(sequence, NUMBERING_FLAGS.CHOTHIA)
+                body = ''.join('{} {}\n'.format(position, aa) for position, aa in zip(numbering, sequence))
+            except NumberingException:
+                body = 'Warning: Unable to number sequence\n'
+            status = 200
+
+        with server.lock:
+            server.n_active -= 1
+
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AsyncNumberingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open('./tests/Data/chain_collection_1_heavy.json', 'r') as f:
+            cls.heavy_data = json.load(f)['test']
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), AbnumStubHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = 'http://127.0.0.1:{}/abnum.cgi'.format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.n_active = 0
+        self.server.max_active = 0
+        self.server.delay = 0.
+        self.server.connections = set()
+        self.cache = get_numbering_cache()
+        set_numbering_cache(None)
+        self.retry_policy = get_retry_policy()
+        set_retry_policy(RetryPolicy(backoff_factor=0))
+        get_circuit_breaker(self.url).reset()
+
+    def tearDown(self):
+        set_numbering_cache(self.cache)
+        set_retry_policy(self.retry_policy)
+
+    def get_collection(self, n):
+        return ChainCollection(antibody_objects=[Chain(sequence=self.heavy_data['sequence'], name=str(i))
+                                                 for i in range(n)], load=False)
+
+    def test_AsyncDownload_download(self):
+        async def download():
+            async with AsyncDownload() as client:
+                return await client.download(self.url + '?aaseq=TEST&scheme=-c'), client
+
+        html, client = asyncio.run(download())
+        self.assertEqual(html, 'Warning: Unable to number sequence\n')
+        self.assertEqual(len(client.latencies), 1)
+
+    def test_AsyncDownload_error(self):
+        async def download():
+            async with AsyncDownload() as client:
+                return await client.download(self.url + '?aaseq=ERROR&scheme=-c')
+
+        self.assertRaises(IOError, asyncio.run, download())
+
+    def test_AsyncDownload_invalid_url(self):
+        self.assertRaises(ValueError, asyncio.run, AsyncDownload().download('ftp://127.0.0.1/abnum.cgi'))
+
+    def test_AsyncDownload_close_without_wait_closed(self):
+        # python < 3.7 stream writers do not have wait_closed
+        writer = mock.Mock(spec=['close'])
+        client = AsyncDownload()
+        client._idle_connections = {('127.0.0.1', 80, False): [(None, writer)]}
+        asyncio.run(client.close())
+        writer.close.assert_called_once_with()
+        self.assertEqual(client._idle_connections, dict())
+
+    def test_Chain_aload(self):
+        chain = Chain(sequence=self.heavy_data['sequence'])
+        asyncio.run(chain.aload(url=self.url))
+        self.assertEqual(chain.status, NUMBERING_FLAGS.LOADED)
+        self.assertEqual(chain.numbering, self.heavy_data['numbering'])
+        self.assertEqual(chain.chain, CHAIN_FLAGS.HEAVY_CHAIN)
+
+    @parameterized.expand([
+        ("unnumbered", 'TEST', NUMBERING_FLAGS.UNNUMBERED),
+        ("failed", 'ERROR', NUMBERING_FLAGS.FAILED)
+    ])
+    def test_Chain_aload_status(self, name, sequence, expected):
+        chain = Chain(sequence=sequence)
+        asyncio.run(chain.aload(url=self.url))
+        self.assertEqual(chain.status, expected)
+
+    def test_Chain_aload_sync_backend(self):
+        chain = Chain(sequence=self.heavy_data['sequence'])
+        asyncio.run(chain.aload(server=OPTION_FLAGS.LOCAL))
+        self.assertEqual(chain.numbering, self.heavy_data['numbering'])
+
+    def test_Chain_aload_cache(self):
+        threads = []
+
+        def record_thread(method):
+            def wrapper(*args):
+                threads.append(threading.get_ident())
+                return method(*args)
+            return wrapper
+
+        async def aload():
+            chain = Chain(sequence=self.heavy_data['sequence'])
+            await chain.aload(url=self.url)
+            return chain, threading.get_ident()
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = NumberingCache(path=os.path.join(directory, 'cache.sqlite'))
+            set_numbering_cache(cache)
+            with mock.patch.object(cache, 'get', record_thread(cache.get)), \
+                    mock.patch.object(cache, 'set', record_thread(cache.set)):
+                asyncio.run(aload())
+                chain, loop_thread = asyncio.run(aload())
+
+        self.assertEqual(chain.numbering, self.heavy_data['numbering'])
+        self.assertEqual(cache.hits, 1)
+        # get, set and get, none of them blocks the event loop
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(loop_thread, threads)
+
+    def test_ChainCollection_aload(self):
+        collection = self.get_collection(20)
+        stats = asyncio.run(collection.aload(url=self.url, verbose=False))
+        self.assertEqual(collection.n_ab, 20)
+        self.assertEqual(collection.chain, CHAIN_FLAGS.HEAVY_CHAIN)
+        self.assertEqual(stats['n_requests'], 20)
+        self.assertEqual(len(stats['latencies']), 20)
+
+    def test_ChainCollection_aload_concurrency_limit(self):
+        self.server.delay = 0.02
+        collection = self.get_collection(12)
+        stats = asyncio.run(collection.aload(url=self.url, verbose=False, max_connections_per_host=3))
+        self.assertLessEqual(self.server.max_active, 3)
+        # connections are kept alive and reused
+        self.assertLessEqual(stats['n_connections'], 3)
+        self.assertLessEqual(len(self.server.connections), 3)
@@ -1,7 +1,9 @@
 import unittest
+from unittest import mock
 from abpytools import Chain, ChainCollection
 from abpytools.core.flags import *
 from parameterized import parameterized
+import numpy as np
 from . import read_sequence, check_connection, ABNUM_URL
 
 
@@ -95,6 +97,21 @@ class ChainCore(unittest.TestCase):
     def test_Chain_extinction_coefficient(self, name, input, expected):
         self.assertAlmostEqual(self.heavy_chain_object.ab_ec(reduced=input[0], normalise=input[1]), expected)
 
+    @parameterized.expand([
+        ("molecular_weight", lambda x: x.ab_molecular_weight()),
+        ("pi", lambda x: x.ab_pi()),
+        ("ec", lambda x: x.ab_ec(normalise=True)),
+        ("charge", lambda x: x.ab_charge()),
+        ("total_charge", lambda x: x.ab_total_charge())
+    ])
+    def test_Chain_properties_no_copy(self, name, method):
+        # the amino acid properties are read from the shared reference data, without copying them
+        with mock.patch('abpytools.utils.data_loader._thaw', side_effect=AssertionError):
+            method(self.heavy_chain_object)
+
+    def test_Chain_extinction_coefficient_database(self):
+        self.assertRaises(ValueError, self.heavy_chain_object.ab_ec, extinction_coefficient_database='TEST')
+
     def test_Chain_sequence_len(self):
         self.assertEqual(len(self.heavy_chain_object), 184)
 
@@ -131,3 +148,17 @@ class ChainCore(unittest.TestCase):
         test = Chain.load_from_string(sequence=self.test_sequence, name="test",
                                       numbering_scheme=NUMBERING_FLAGS.CHOTHIA)
         self.assertEqual(test.ab_numbering()[82], "H82A")
+
+    def test_Chain_numbering_codes(self):
+        numbering_codes = self.heavy_chain_object.numbering_codes
+        self.assertEqual(numbering_codes.dtype, np.int16)
+        self.assertEqual(len(numbering_codes), len(self.heavy_chain_object.numbering))
+        self.assertIs(numbering_codes, self.heavy_chain_object.numbering_codes)
+
+    def test_Chain_numbering_codes_unknown_position(self):
+        chain = Chain(sequence='QVQ')
+        chain._chain = CHAIN_FLAGS.HEAVY_CHAIN
+        chain._loading_status = NUMBERING_FLAGS.LOADED
+        chain.numbering = ['H1', 'H2', 'H2000']
+        self.assertEqual(chain.numbering_codes.tolist(), [0, 1, -1])
+        self.assertEqual(chain.ab_hydrophobicity_matrix()[:3].tolist(), [-0.69, 0.54, 0])
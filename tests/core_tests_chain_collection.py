@@ -1,7 +1,11 @@
 import unittest
 from abpytools import ChainCollection, Chain
+from abpytools.core.numbering import register_numbering_backend, unregister_numbering_backend, local_numbering
+from abpytools.utils.encoding import decode_sequence
 import operator
+import numpy as np
 import os
+import tempfile
 from glob import glob
 from . import read_sequence, check_connection, ABNUM_URL, IGBLAST_URL
 
@@ -99,6 +103,16 @@ class ChainCollectionCore(unittest.TestCase):
         # if this fails it means that abysis has been updated
         self.assertEqual(antibody_collection_1.hydrophobicity_matrix().shape, (1, 158))
 
+    def test_ChainCollection_hydrophobicity_tensor(self):
+        antibody_collection_1 = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_light.json',
+                                                               show_progressbar=False, verbose=False)
+        tensor = antibody_collection_1.hydrophobicity_tensor()
+        self.assertEqual(tensor.shape, (5, 1, 138))
+        self.assertEqual(tensor.dtype, np.float32)
+        np.testing.assert_allclose(tensor[1], antibody_collection_1.hydrophobicity_matrix('ww'), rtol=1e-6)
+        np.testing.assert_array_equal(antibody_collection_1.hydrophobicity_matrix()[0],
+                                      antibody_collection_1[0].hydrophobicity_matrix)
+
     @unittest.skipUnless(check_connection(URL=ABNUM_URL), 'No internet connection, skipping test.')
     def test_ChainCollection_Hmatrix_calculation(self):
         antibody_collection_1 = ChainCollection.load_from_file(path='./tests/Data/chain_collection_fasta_test.fasta',
@@ -151,6 +165,33 @@ class ChainCollectionCore(unittest.TestCase):
         self.assertCountEqual(antibody_collection_1.ab_region_index()[self.antibody_collection_1_name]['FR'],
                               ['FR1', 'FR2', 'FR3', 'FR4'])
 
+    def test_ChainCollection_region_offsets(self):
+        antibody_collection_1 = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_heavy.json',
+                                                               show_progressbar=False, verbose=False)
+        offsets = antibody_collection_1.region_offsets()
+        cdrs, frameworks = antibody_collection_1[0].ab_regions()
+        regions = dict(cdrs, **frameworks)
+        for j, region in enumerate(['FR1', 'CDR1', 'FR2', 'CDR2', 'FR3', 'CDR3', 'FR4']):
+            self.assertEqual(list(range(*offsets[0, j])), regions[region])
+
+    def test_ChainCollection_region_lengths(self):
+        antibody_collection_1 = ChainCollection.load_from_file(
+            path='./tests/Data/chain_collection_heavy_2_sequences.json', show_progressbar=False, verbose=False)
+        self.assertEqual(antibody_collection_1.region_lengths(regions=['CDR1', 'CDR2', 'CDR3']).tolist(),
+                         [[len(x.ab_regions()[0][cdr]) for cdr in ['CDR1', 'CDR2', 'CDR3']]
+                          for x in antibody_collection_1])
+
+    def test_ChainCollection_region_sequences(self):
+        antibody_collection_1 = ChainCollection.load_from_file(
+            path='./tests/Data/chain_collection_heavy_2_sequences.json', show_progressbar=False, verbose=False)
+        self.assertEqual(antibody_collection_1.region_sequences('CDR3'),
+                         [''.join(x.sequence[i] for i in x.ab_regions()[0]['CDR3']) for x in antibody_collection_1])
+
+    def test_ChainCollection_region_exception(self):
+        antibody_collection_1 = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_heavy.json',
+                                                               show_progressbar=False, verbose=False)
+        self.assertRaises(ValueError, antibody_collection_1.region_offsets, ['CDR4'])
+
     def test_ChainCollection_total_charge(self):
         antibody_collection_1 = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_heavy.json',
                                                                show_progressbar=False, verbose=False)
@@ -245,6 +286,21 @@ class ChainCollectionCore(unittest.TestCase):
                                                                show_progressbar=False, verbose=False)
         self.assertEqual(antibody_collection_1.numbering_table(region='FR1').loc['test'].values[0], 'Q')
 
+    def test_ChainCollection_numbering_table_encoded(self):
+        antibody_collection_1 = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_heavy.json',
+                                                               show_progressbar=False, verbose=False)
+        table = antibody_collection_1.numbering_table(encoded=True, region='CDR1')
+        self.assertEqual(table.dtype, np.uint8)
+        self.assertEqual(decode_sequence(table[0]), ''.join(antibody_collection_1[0].ab_numbering_table(
+            as_array=True, region='CDR1')[0]))
+
+    def test_ChainCollection_numbering_table_layout_cache(self):
+        antibody_collection_1 = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_heavy.json',
+                                                               show_progressbar=False, verbose=False)
+        table_1 = antibody_collection_1.numbering_table(region=['CDR1', 'FR1'])
+        table_2 = antibody_collection_1.numbering_table(region=['FR1', 'CDR1'])
+        self.assertIs(table_1.columns, table_2.columns)
+
     def test_ChainCollection_molecular_weight(self):
         antibody_collection_1 = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_heavy.json',
                                                                show_progressbar=False, verbose=False)
@@ -357,6 +413,118 @@ class ChainCollectionCore(unittest.TestCase):
         antibody_collection_1.append(antibody_collection_2)
         self.assertEqual(antibody_collection_1.hydrophobicity_matrix().shape, (2, 158))
 
+    def test_ChainCollection_number_batch(self):
+        test_collection = ChainCollection(antibody_objects=[Chain(sequence=self.chain_test_sequence, name=str(i))
+                                                            for i in range(4)], load=False)
+        stats = test_collection.number_batch(server='local', show_progressbar=False, verbose=False)
+        self.assertEqual(stats['n_numbered'], 1)
+        self.assertAlmostEqual(stats['dedup_ratio'], 0.75)
+        self.assertEqual(test_collection.chain, 'heavy')
+        self.assertEqual(test_collection.names, ['0', '1', '2', '3'])
+        self.assertEqual(test_collection[3].numbering, test_collection[0].numbering)
+        self.assertAlmostEqual(test_collection[3].pI, test_collection[0].pI)
+
+    def test_ChainCollection_number_batch_loaded(self):
+        test_collection = ChainCollection(antibody_objects=[Chain(sequence=self.chain_test_sequence),
+                                                            Chain(sequence=self.chain_test_sequence)], load=False)
+        test_collection[1].load(server='local')
+        stats = test_collection.number_batch(server='local', show_progressbar=False, verbose=False)
+        self.assertEqual(stats['n_numbered'], 0)
+        self.assertEqual(test_collection[0].status, 'Loaded')
+        self.assertEqual(test_collection[0].hydrophobicity_matrix.shape, (158,))
+
+    def test_ChainCollection_load_from_fasta_checkpointed(self):
+        calls = []
+
+        @register_numbering_backend('test_checkpoint_backend', cache=False)
+        def test_backend(sequence, numbering_scheme, **kwargs):
+            calls.append(sequence)
+            return local_numbering(sequence, numbering_scheme)
+        self.addCleanup(unregister_numbering_backend, 'test_checkpoint_backend')
+
+        with open('./tests/Data/chain_collection_light_2_sequences.fasta', 'r') as f:
+            sequences = [x.strip() for x in f.readlines()[1::2]]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.fasta')
+            with open(path, 'w') as f:
+                for i in range(10):
+                    # write the sequences over multiple lines
+                    sequence = sequences[i % 2]
+                    f.write('>Seq{}\n{}\n{}\n'.format(i, sequence[:50], sequence[50:]))
+
+            test_collection = ChainCollection.load_from_fasta_checkpointed(path, chunk_size=3,
+                                                                           server='test_checkpoint_backend',
+                                                                           show_progressbar=False, verbose=False)
+            self.assertEqual(test_collection.n_ab, 10)
+            self.assertEqual(test_collection.names, ['Seq{}'.format(i) for i in range(10)])
+            self.assertEqual(len(calls), 10)
+
+            # simulate a crash while writing the third chunk
+            with open(path + '.checkpoint', 'r') as f:
+                lines = f.readlines()
+            self.assertEqual(len(lines), 5)
+            with open(path + '.checkpoint', 'w') as f:
+                f.write(''.join(lines[:3]) + lines[3][:20])
+
+            test_collection_resumed = ChainCollection.load_from_fasta_checkpointed(
+                path, chunk_size=3, server='test_checkpoint_backend', show_progressbar=False, verbose=False)
+            self.assertEqual(len(calls), 14)
+            self.assertEqual(test_collection_resumed.names, test_collection.names)
+            self.assertEqual(test_collection_resumed.sequences, test_collection.sequences)
+            self.assertEqual(test_collection_resumed[1].numbering, test_collection[1].numbering)
+            self.assertAlmostEqual(test_collection_resumed[1].pI, test_collection[1].pI)
+
+            # the checkpoint cannot be used with different parameters
+            self.assertRaises(ValueError, ChainCollection.load_from_fasta_checkpointed, path, chunk_size=4,
+                              server='test_checkpoint_backend', show_progressbar=False, verbose=False)
+
+            # or with a FASTA file that was modified, even if it has the same name and size
+            with open(path, 'r') as f:
+                fasta = f.read()
+            with open(path, 'w') as f:
+                f.write(fasta.replace('>Seq9', '>Seq8'))
+            self.assertRaises(ValueError, ChainCollection.load_from_fasta_checkpointed, path, chunk_size=3,
+                              server='test_checkpoint_backend', show_progressbar=False, verbose=False)
+
+    def test_ChainCollection_load_from_fasta_checkpointed_failed(self):
+        calls = []
+
+        @register_numbering_backend('test_checkpoint_failed_backend', cache=False)
+        def test_backend(sequence, numbering_scheme, **kwargs):
+            calls.append(sequence)
+            # the first request of the second sequence fails, i.e. the server could not be reached
+            if sequence == sequences[1] and calls.count(sequence) == 1:
+                raise ValueError("Could not download requested page.")
+            return local_numbering(sequence, numbering_scheme)
+        self.addCleanup(unregister_numbering_backend, 'test_checkpoint_failed_backend')
+
+        with open('./tests/Data/chain_collection_light_2_sequences.fasta', 'r') as f:
+            sequences = [x.strip() for x in f.readlines()[1::2]]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.fasta')
+            with open(path, 'w') as f:
+                for i in range(4):
+                    f.write('>Seq{}\n{}\n'.format(i, sequences[0] if i != 2 else sequences[1]))
+
+            test_collection = ChainCollection.load_from_fasta_checkpointed(
+                path, chunk_size=3, server='test_checkpoint_failed_backend', show_progressbar=False, verbose=False)
+            self.assertEqual(test_collection.names, ['Seq0', 'Seq1', 'Seq3'])
+            self.assertEqual(len(calls), 4)
+
+            # only the failed chain is numbered again
+            test_collection_resumed = ChainCollection.load_from_fasta_checkpointed(
+                path, chunk_size=3, server='test_checkpoint_failed_backend', show_progressbar=False, verbose=False)
+            self.assertEqual(test_collection_resumed.names, ['Seq0', 'Seq1', 'Seq2', 'Seq3'])
+            self.assertEqual(calls[4:], [sequences[1]])
+            self.assertEqual(test_collection_resumed[2].numbering, local_numbering(sequences[1], 'chothia'))
+
+            # the chunk was checkpointed again with the chain that is now loaded
+            ChainCollection.load_from_fasta_checkpointed(
+                path, chunk_size=3, server='test_checkpoint_failed_backend', show_progressbar=False, verbose=False)
+            self.assertEqual(len(calls), 5)
+
     @classmethod
     def tearDownClass(cls):
         for name in glob('./tests/*'):
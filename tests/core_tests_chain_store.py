@@ -0,0 +1,142 @@
+import unittest
+from unittest import mock
+from abpytools import ChainCollection, Chain
+from abpytools.core.chain_store import ChainStore, SegmentedArray, region_offsets
+from parameterized import parameterized
+import numpy as np
+
+
+class SegmentedArrayCore(unittest.TestCase):
+
+    def test_SegmentedArray_from_strings(self):
+        array = SegmentedArray.from_strings(['AB', '', 'CDE'])
+        self.assertEqual(array.lengths.tolist(), [2, 0, 3])
+        self.assertEqual([array.to_string(i) for i in range(len(array))], ['AB', '', 'CDE'])
+
+    def test_SegmentedArray_take(self):
+        array = SegmentedArray.from_strings(['AB', '', 'CDE']).take([2, 0, 1])
+        self.assertEqual([array.to_string(i) for i in range(len(array))], ['CDE', 'AB', ''])
+
+    def test_SegmentedArray_from_slices(self):
+        array = SegmentedArray.from_slices(np.arange(10), np.array([2, 0, 7]), np.array([5, 0, 10]))
+        self.assertEqual([x.tolist() for x in array], [[2, 3, 4], [], [7, 8, 9]])
+
+    @parameterized.expand([
+        ("unknown_position", [0, -1, 2]),
+        ("unordered", [0, 2, 1])
+    ])
+    def test_region_offsets_exception(self, name, codes):
+        numbering = SegmentedArray.from_arrays([np.array(codes, dtype=np.int16)])
+        sequences = SegmentedArray.from_arrays([np.zeros(3, dtype=np.uint8)])
+        self.assertRaises(ValueError, region_offsets, numbering, sequences, [[0, 2]], 3)
+
+    def test_region_offsets(self):
+        numbering = SegmentedArray.from_arrays([np.array([0, 1, 3], dtype=np.int16), np.array([2], dtype=np.int16)])
+        sequences = SegmentedArray.from_arrays([np.zeros(4, dtype=np.uint8), np.zeros(2, dtype=np.uint8)])
+        self.assertEqual(region_offsets(numbering, sequences, [[0, 2], [2, 4]], 4).tolist(),
+                         [[[0, 2], [2, 3]], [[4, 4], [4, 5]]])
+
+    def test_SegmentedArray_segment_sum(self):
+        array = SegmentedArray(np.array([1, 2, 3, 4, 5]), np.array([0, 2, 2, 5]))
+        self.assertEqual(array.segment_sum().tolist(), [3, 0, 12])
+
+
+class ChainStoreCore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open('./tests/Data/chain_collection_light_2_sequences.fasta', 'r') as f:
+            sequences = [x.strip() for x in f.readlines()[1::2]]
+        chains = [Chain(sequence=sequences[i % 2], name='Seq{}'.format(i)) for i in range(6)]
+        cls.collection = ChainCollection(antibody_objects=chains, load=False)
+        cls.collection.number_batch(server='local', show_progressbar=False, verbose=False)
+        cls.columnar_collection = cls.collection.to_columnar()
+
+    def test_ChainStore_is_columnar(self):
+        self.assertFalse(self.collection.is_columnar)
+        self.assertTrue(self.columnar_collection.is_columnar)
+        self.assertIsInstance(self.columnar_collection.store, ChainStore)
+
+    @parameterized.expand([
+        ("names", lambda x: x.names),
+        ("sequences", lambda x: x.sequences),
+        ("chain", lambda x: x.chain),
+        ("numbering_scheme", lambda x: x.numbering_scheme),
+        ("loading_status", lambda x: x.loading_status()),
+        ("n_ab", lambda x: x.n_ab),
+        ("numbering", lambda x: [x[i].numbering for i in range(len(x))]),
+        ("region_offsets", lambda x: x.region_offsets().tolist()),
+        ("region_sequences", lambda x: x.region_sequences('CDR2')),
+        ("aligned_sequences", lambda x: x.aligned_sequences),
+        ("ab_region_index", lambda x: x.ab_region_index())
+    ])
+    def test_ChainStore_same_api(self, name, attribute):
+        self.assertEqual(attribute(self.columnar_collection), attribute(self.collection))
+
+    @parameterized.expand([
+        ("molecular_weights", lambda x: x.molecular_weights()),
+        ("molecular_weights_monoisotopic", lambda x: x.molecular_weights(monoisotopic=True)),
+        ("extinction_coefficients", lambda x: x.extinction_coefficients()),
+        ("extinction_coefficients_reduced", lambda x: x.extinction_coefficients(reduced=True)),
+        ("hydrophobicity_matrix", lambda x: x.hydrophobicity_matrix())
+    ])
+    def test_ChainStore_same_values(self, name, attribute):
+        np.testing.assert_allclose(attribute(self.columnar_collection), attribute(self.collection))
+
+    @parameterized.expand([
+        ("aligned_sequences", lambda x: x.aligned_sequences),
+        ("ab_region_index", lambda x: x.ab_region_index())
+    ])
+    def test_ChainStore_no_chain_objects(self, name, attribute):
+        collection = self.collection.to_columnar()
+        with mock.patch.object(ChainStore, 'to_chain', side_effect=AssertionError):
+            attribute(collection)
+        self.assertTrue(collection.is_columnar)
+
+    def test_ChainStore_to_chain(self):
+        chain = self.columnar_collection[1]
+        self.assertIsInstance(chain, Chain)
+        self.assertEqual(chain.name, 'Seq1')
+        self.assertAlmostEqual(chain.pI, self.collection[1].pI)
+        self.assertEqual(chain.ab_regions(), self.collection[1].ab_regions())
+        self.assertEqual(self.columnar_collection[-1].name, 'Seq5')
+
+    def test_ChainStore_take(self):
+        subset = self.columnar_collection[[4, 1]]
+        self.assertTrue(subset.is_columnar)
+        self.assertEqual(subset.names, ['Seq4', 'Seq1'])
+        np.testing.assert_allclose(subset.molecular_weights(), self.collection[[4, 1]].molecular_weights())
+
+    def test_ChainStore_concatenate(self):
+        collection = self.columnar_collection + self.columnar_collection[[0]]
+        self.assertTrue(collection.is_columnar)
+        self.assertEqual(collection.n_ab, 7)
+        self.assertEqual(collection.names[-1], 'Seq0')
+
+    def test_ChainStore_to_objects(self):
+        collection = self.collection.to_columnar()
+        collection.append(self.collection[[0, 1]])
+        self.assertFalse(collection.is_columnar)
+        self.assertEqual(collection.n_ab, 8)
+
+    def test_ChainStore_memory(self):
+        # the numbering of each Chain object is a list of str objects of ~50 bytes each
+        numbering_bytes = sum(len(x.numbering) * 50 for x in self.collection)
+        self.assertLess(self.columnar_collection.store.nbytes, numbering_bytes / 10)
+
+    def test_ChainStore_unknown_position(self):
+        chain = Chain(sequence='AC', name='test')
+        chain._loading_status = 'Loaded'
+        chain._chain = 'heavy'
+        chain.numbering = ['H1', 'H1000']
+        self.assertRaises(ValueError, ChainStore.from_chains, [chain], 'chothia')
+
+    def test_ChainStore_partial_numbering(self):
+        # only the first 123 residues of the sequence in chain_collection_1_heavy.json are numbered
+        collection = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_heavy.json',
+                                                    show_progressbar=False, verbose=False)
+        columnar_collection = collection.to_columnar()
+        self.assertEqual(columnar_collection[0].numbering, collection[0].numbering)
+        self.assertEqual(columnar_collection.ab_region_index(), collection.ab_region_index())
+        self.assertEqual(columnar_collection.aligned_sequences, collection.aligned_sequences)
+        np.testing.assert_allclose(columnar_collection.hydrophobicity_matrix(), collection.hydrophobicity_matrix())
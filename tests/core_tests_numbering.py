@@ -0,0 +1,270 @@
+import unittest
+import json
+import os
+import sqlite3
+from glob import glob
+import tempfile
+import threading
+from abpytools import Chain, ChainCollection
+from abpytools.core.flags import *
+from abpytools.core.numbering import (register_numbering_backend, unregister_numbering_backend, get_numbering_backend,
+                                      available_numbering_backends, local_numbering, NumberingCache,
+                                      get_numbering_cache, set_numbering_cache)
+from abpytools.utils import NumberingException
+from parameterized import parameterized
+from . import read_sequence
+
+
+def reference_numberings():
+    # (name, sequence, numbering_scheme, numbering) of each sequence numbered by the abnum server in tests/Data
+    numberings = []
+    for path in sorted(glob('./tests/Data/*.json')):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        for name in data['ordered_names']:
+            numberings.append(('{}_{}'.format(os.path.basename(path).split('.')[0], name), data[name]['sequence'],
+                               data[name]['numbering_scheme'], data[name]['numbering']))
+    return numberings
+
+
+class LocalNumberingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_sequence = read_sequence('./tests/Data/chain_collection_fasta_test.fasta').strip()
+        with open('./tests/Data/chain_collection_1_heavy.json', 'r') as f:
+            cls.heavy_data = json.load(f)['test']
+        with open('./tests/Data/chain_collection_light_2_sequences.json', 'r') as f:
+            cls.light_data = json.load(f)
+
+    def test_local_numbering_heavy(self):
+        self.assertEqual(local_numbering(self.heavy_data['sequence'], NUMBERING_FLAGS.CHOTHIA),
+                         self.heavy_data['numbering'])
+
+    @parameterized.expand([
+        ("light_seq_1", "LightSeq1"),
+        ("light_seq_2", "LightSeq2")
+    ])
+    def test_local_numbering_light(self, name, input):
+        self.assertEqual(local_numbering(self.light_data[input]['sequence'], NUMBERING_FLAGS.CHOTHIA),
+                         self.light_data[input]['numbering'])
+
+    @parameterized.expand([
+        (f"{NUMBERING_FLAGS.CHOTHIA}_numbering", NUMBERING_FLAGS.CHOTHIA, "H82A"),
+        (f"{NUMBERING_FLAGS.KABAT}_numbering", NUMBERING_FLAGS.KABAT, "H82A")
+    ])
+    def test_local_numbering_scheme(self, name, input, expected):
+        test = Chain(sequence=self.test_sequence, name="test", numbering_scheme=input)
+        self.assertEqual(test.ab_numbering(server=OPTION_FLAGS.LOCAL)[82], expected)
+
+    @parameterized.expand(reference_numberings())
+    def test_local_numbering_reference(self, name, sequence, numbering_scheme, numbering):
+        self.assertEqual(local_numbering(sequence, numbering_scheme), numbering)
+
+    @parameterized.expand([x for x in reference_numberings() if x[3][0].startswith('H')])
+    def test_local_numbering_chothia_ext(self, name, sequence, numbering_scheme, numbering):
+        # the extended Chothia numbering places the FR3 insertions (H82A-H82C in Chothia) at H72A-H72C,
+        # the other insertions are the same
+        numbering_ext = local_numbering(sequence, NUMBERING_FLAGS.CHOTHIA_EXT)
+        self.assertEqual(len(numbering_ext), len(numbering))
+        self.assertEqual([x for x in numbering_ext if x[-1].isalpha()],
+                         [x.replace('H82', 'H72') for x in numbering if x[-1].isalpha()])
+
+    def test_local_numbering_framework_deletion(self):
+        # the heavy chain FR2 of Seq2 (WFRQPGQG) is one residue shorter and has no residue at H40
+        with open('./tests/Data/chain_collection_heavy_2_sequences.json', 'r') as f:
+            data = json.load(f)['Seq2']
+        numbering = local_numbering(data['sequence'], NUMBERING_FLAGS.CHOTHIA)
+        self.assertNotIn('H40', numbering)
+        self.assertEqual(numbering[36:42], ['H37', 'H38', 'H39', 'H41', 'H42', 'H43'])
+
+    def test_local_numbering_exception(self):
+        self.assertRaises(NumberingException, local_numbering, 'TEST', NUMBERING_FLAGS.CHOTHIA)
+
+    def test_local_numbering_unknown_scheme(self):
+        self.assertRaises(ValueError, local_numbering, self.test_sequence, "MyNumberingScheme123")
+
+    def test_Chain_load_local(self):
+        chain = Chain.load_from_string(sequence=self.test_sequence, server=OPTION_FLAGS.LOCAL)
+        self.assertEqual(chain.status, NUMBERING_FLAGS.LOADED)
+        self.assertEqual(chain.chain, CHAIN_FLAGS.HEAVY_CHAIN)
+
+    def test_Chain_load_local_unnumbered(self):
+        chain = Chain(sequence='TEST')
+        chain.load(server=OPTION_FLAGS.LOCAL)
+        self.assertEqual(chain.status, NUMBERING_FLAGS.UNNUMBERED)
+
+    def test_ChainCollection_load_local(self):
+        collection = ChainCollection.load_from_file(path='./tests/Data/chain_collection_light_2_sequences.fasta',
+                                                    server=OPTION_FLAGS.LOCAL, show_progressbar=False,
+                                                    verbose=False)
+        self.assertEqual(collection.n_ab, 2)
+        self.assertEqual(collection.chain, CHAIN_FLAGS.LIGHT_CHAIN)
+
+
+class NumberingBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = get_numbering_cache()
+        set_numbering_cache(None)
+
+    def tearDown(self):
+        set_numbering_cache(self.cache)
+
+    def test_available_backends(self):
+        self.assertCountEqual(available_numbering_backends()[:2], OPTION_FLAGS.AVAILABLE_SERVERS)
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, get_numbering_backend, "MyServer123")
+
+    def test_register_backend(self):
+        @register_numbering_backend("test_backend")
+        def test_backend(sequence, numbering_scheme, **kwargs):
+            return ['L{}'.format(i + 1) for i in range(len(sequence))]
+        self.addCleanup(unregister_numbering_backend, "test_backend")
+
+        chain = Chain(sequence='TEST')
+        self.assertEqual(chain.ab_numbering(server="test_backend"), ['L1', 'L2', 'L3', 'L4'])
+        self.assertEqual(chain.chain, CHAIN_FLAGS.LIGHT_CHAIN)
+
+    def test_unregister_backend(self):
+        @register_numbering_backend("test_unregistered_backend")
+        def test_backend(sequence, numbering_scheme, **kwargs):
+            return []
+
+        unregister_numbering_backend("test_unregistered_backend")
+        self.assertNotIn("test_unregistered_backend", available_numbering_backends())
+        self.assertRaises(ValueError, get_numbering_backend, "test_unregistered_backend")
+        self.assertRaises(ValueError, unregister_numbering_backend, "test_unregistered_backend")
+
+
+class NumberingCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = NumberingCache(path=os.path.join(self.directory.name, 'cache.sqlite'), max_entries=3)
+        self.default_cache = get_numbering_cache()
+        set_numbering_cache(self.cache)
+
+    def tearDown(self):
+        set_numbering_cache(self.default_cache)
+        self.directory.cleanup()
+
+    def test_cache_get_set(self):
+        self.cache.set('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS, ['L1', 'L2', 'L3', 'L4'],
+                       CHAIN_FLAGS.LIGHT_CHAIN)
+        self.assertEqual(self.cache.get('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS),
+                         (['L1', 'L2', 'L3', 'L4'], CHAIN_FLAGS.LIGHT_CHAIN))
+
+    @parameterized.expand([
+        ("numbering_scheme", 'TEST', NUMBERING_FLAGS.KABAT, OPTION_FLAGS.ABYSIS),
+        ("server", 'TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.LOCAL),
+        ("sequence", 'TESTS', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS)
+    ])
+    def test_cache_key(self, name, sequence, numbering_scheme, server):
+        self.cache.set('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS, ['L1', 'L2', 'L3', 'L4'],
+                       CHAIN_FLAGS.LIGHT_CHAIN)
+        self.assertIsNone(self.cache.get(sequence, numbering_scheme, server))
+
+    def test_cache_counters(self):
+        self.cache.get('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS)
+        self.cache.set('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS, ['L1', 'L2', 'L3', 'L4'],
+                       CHAIN_FLAGS.LIGHT_CHAIN)
+        self.cache.get('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS)
+        self.assertEqual(self.cache.stats, {"hits": 1, "misses": 1, "evictions": 0, "entries": 1,
+                                            "max_entries": 3})
+
+    def test_cache_eviction(self):
+        for sequence in ['A', 'B', 'C']:
+            self.cache.set(sequence, NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS, ['L1'], CHAIN_FLAGS.LIGHT_CHAIN)
+        # A becomes the most recently used entry, so B is evicted
+        self.cache.get('A', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS)
+        self.cache.set('D', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS, ['L1'], CHAIN_FLAGS.LIGHT_CHAIN)
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertNotIn(('B', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS), self.cache)
+        self.assertIn(('A', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS), self.cache)
+
+    def test_cache_replace(self):
+        for numbering in [['L1'], ['L1', 'L2', 'L3', 'L4']]:
+            self.cache.set('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS, numbering, CHAIN_FLAGS.LIGHT_CHAIN)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.get('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS)[0],
+                         ['L1', 'L2', 'L3', 'L4'])
+
+    def test_cache_eviction_batch(self):
+        # 1% of the entries are evicted at once
+        cache = NumberingCache(path=os.path.join(self.directory.name, 'batch.sqlite'), max_entries=200)
+        for i in range(201):
+            cache.set('A' * (i + 1), NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS, ['L1'], CHAIN_FLAGS.LIGHT_CHAIN)
+        self.assertEqual(len(cache), 198)
+        self.assertEqual(cache.evictions, 3)
+        self.assertNotIn(('AAA', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS), cache)
+        self.assertIn(('A' * 4, NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS), cache)
+        # the number of entries of an existing database is kept
+        self.assertEqual(len(NumberingCache(path=cache.path)), 198)
+
+    def test_cache_get_without_write_lock(self):
+        self.cache.set('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS, ['L1'], CHAIN_FLAGS.LIGHT_CHAIN)
+        cache = NumberingCache(path=self.cache.path, timeout=0.1)
+        # another connection holds the write lock, cache hits are still served
+        connection = sqlite3.connect(self.cache.path, isolation_level=None)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.assertEqual(cache.get('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS)[0], ['L1'])
+        finally:
+            connection.execute("ROLLBACK")
+            connection.close()
+
+    def test_cache_persistent(self):
+        self.cache.set('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS, ['L1', 'L2', 'L3', 'L4'],
+                       CHAIN_FLAGS.LIGHT_CHAIN)
+        cache = NumberingCache(path=self.cache.path)
+        self.assertEqual(cache.get('TEST', NUMBERING_FLAGS.CHOTHIA, OPTION_FLAGS.ABYSIS)[0],
+                         ['L1', 'L2', 'L3', 'L4'])
+
+    def test_cache_threads(self):
+        cache = NumberingCache(path=self.cache.path, max_entries=1000)
+
+        def worker(i):
+            for j in range(20):
+                sequence = 'A' * (j + 1)
+                cache.set(sequence, NUMBERING_FLAGS.CHOTHIA, str(i), ['L1'] * len(sequence),
+                          CHAIN_FLAGS.LIGHT_CHAIN)
+                cache.get(sequence, NUMBERING_FLAGS.CHOTHIA, str(i))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(cache), 80)
+        self.assertEqual(cache.hits, 80)
+
+    def test_cache_invalid_max_entries(self):
+        self.assertRaises(ValueError, NumberingCache, os.path.join(self.directory.name, 'test.sqlite'), 0)
+
+    def test_Chain_ab_numbering_cache(self):
+        calls = []
+
+        @register_numbering_backend("test_cached_backend")
+        def test_backend(sequence, numbering_scheme, **kwargs):
+            calls.append(sequence)
+            return ['H{}'.format(i + 1) for i in range(len(sequence))]
+        self.addCleanup(unregister_numbering_backend, "test_cached_backend")
+
+        for _ in range(3):
+            chain = Chain(sequence='TEST')
+            chain.load(server="test_cached_backend")
+
+        self.assertEqual(calls, ['TEST'])
+        self.assertEqual(chain.chain, CHAIN_FLAGS.HEAVY_CHAIN)
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(self.cache.get('TEST', NUMBERING_FLAGS.CHOTHIA, "test_cached_backend")[1],
+                         CHAIN_FLAGS.HEAVY_CHAIN)
+
+    def test_Chain_ab_numbering_local_not_cached(self):
+        chain = Chain(sequence='TEST')
+        chain.load(server=OPTION_FLAGS.LOCAL)
+        self.assertEqual(len(self.cache), 0)
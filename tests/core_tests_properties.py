@@ -0,0 +1,152 @@
+import unittest
+from abpytools import ChainCollection, Chain
+from abpytools.core.flags import OPTION_FLAGS
+from abpytools.core.properties import residue_count_matrix, isoelectric_points, solve_isoelectric_points, net_charges
+from abpytools.core.chain_store import SegmentedArray
+from parameterized import parameterized
+import numpy as np
+
+
+class ChainCollectionPropertiesCore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.collection = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_light.json',
+                                                        show_progressbar=False, verbose=False)
+
+    def test_residue_count_matrix(self):
+        encoded_sequences = SegmentedArray.from_arrays(
+            [Chain(sequence=x).encoded_sequence for x in ['CCY', '', 'AXW']])
+        counts = residue_count_matrix(encoded_sequences, chunk_size=2)
+        self.assertEqual(counts.shape, (3, 20))
+        self.assertEqual(counts[:, [0, 1, 18, 19]].tolist(), [[0, 2, 0, 1], [0, 0, 0, 0], [1, 0, 1, 0]])
+
+    @parameterized.expand([
+        ("mw", dict(), lambda x: x.ab_molecular_weight()),
+        ("mw_monoisotopic", dict(monoisotopic=True), lambda x: x.ab_molecular_weight(monoisotopic=True)),
+        ("ec", dict(), lambda x: x.ab_ec()),
+        ("ec_reduced", dict(reduced=True), lambda x: x.ab_ec(reduced=True)),
+        ("charge", dict(ph=6.5), lambda x: x.ab_total_charge(ph=6.5)),
+        ("pI", dict(), lambda x: x.ab_pi())
+    ])
+    def test_ChainCollection_properties_same_values(self, name, kwargs, method):
+        column = name.split('_')[0]
+        result = self.collection.properties(properties=[column], **kwargs)
+        np.testing.assert_allclose(result[column], [method(x) for x in self.collection])
+
+    @parameterized.expand([(x,) for x in OPTION_FLAGS.AVAILABLE_PI_VALUES])
+    def test_ChainCollection_properties_pI_database(self, pka_database):
+        # the batch pI is on the same pH grid as Chain.ab_pi
+        result = self.collection.properties(properties=['pI'], pka_database=pka_database)
+        self.assertEqual(result['pI'].tolist(), [x.ab_pi(pi_database=pka_database) for x in self.collection])
+
+    def test_ChainCollection_properties_record_array(self):
+        result = self.collection.properties()
+        self.assertEqual(result.dtype.names, ('name', 'length', 'mw', 'ec', 'pI', 'charge'))
+        self.assertEqual(result.name.tolist(), self.collection.names)
+        self.assertEqual(result.length.tolist(), [len(x) for x in self.collection.sequences])
+
+    def test_ChainCollection_properties_dataframe(self):
+        result = self.collection.properties(properties=['mw', 'pI'], as_dataframe=True)
+        self.assertEqual(list(result.columns), ['mw', 'pI'])
+        self.assertEqual(list(result.index), self.collection.names)
+
+    def test_ChainCollection_properties_columnar(self):
+        np.testing.assert_allclose(self.collection.to_columnar().properties(properties=['mw', 'charge'])['mw'],
+                                   self.collection.properties(properties=['mw'])['mw'])
+
+    def test_ChainCollection_properties_non_standard_residue(self):
+        collection = ChainCollection(antibody_objects=[Chain(sequence='ACU', name='U'),
+                                                       Chain(sequence='ACX', name='X')], load=False)
+        mw = collection.properties(properties=['mw'])['mw']
+        self.assertAlmostEqual(mw[0], Chain(sequence='ACU').ab_molecular_weight())
+        self.assertTrue(np.isnan(mw[1]))
+
+    def test_isoelectric_points_not_found(self):
+        # the net charge of a sequence with 100 arginines is positive up to pH 14
+        counts = np.zeros((1, 20), dtype=np.int32)
+        counts[0, 14] = 100
+        self.assertTrue(np.isnan(isoelectric_points(counts)[0]))
+
+    @parameterized.expand([
+        ("property", dict(properties=['hydrophobicity'])),
+        ("pka_database", dict(pka_database='unknown'))
+    ])
+    def test_ChainCollection_properties_exception(self, name, kwargs):
+        self.assertRaises(ValueError, self.collection.properties, **kwargs)
+
+
+class IsoelectricPointSolverCore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.collection = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_light.json',
+                                                        show_progressbar=False, verbose=False)
+
+    @parameterized.expand([
+        ("default", 1e-3),
+        ("fine", 1e-8)
+    ])
+    def test_solve_isoelectric_points_tolerance(self, name, tolerance):
+        counts = residue_count_matrix(self.collection.encoded_sequences)
+        pi = solve_isoelectric_points(counts, tolerance=tolerance)
+        self.assertEqual(pi.shape, (len(counts), len(OPTION_FLAGS.AVAILABLE_PI_VALUES)))
+        for i, pka_database in enumerate(OPTION_FLAGS.AVAILABLE_PI_VALUES):
+            # the net charge changes sign within the tolerance of the pI
+            for j, x in enumerate(pi[:, i]):
+                self.assertGreater(net_charges(counts[j], ph=x - tolerance, pka_database=pka_database), 0)
+                self.assertLessEqual(net_charges(counts[j], ph=x + tolerance, pka_database=pka_database), 0)
+
+    def test_solve_isoelectric_points_grid(self):
+        # Chain.ab_pi returns the step of 0.01 pH units after the first step at which the net charge is not positive
+        pi = self.collection.isoelectric_points(pka_databases=['Wikipedia'], tolerance=1e-6)['Wikipedia']
+        difference = np.array([x.ab_pi() for x in self.collection]) - pi
+        self.assertTrue(np.all((difference > 0.01 - 1e-6) & (difference <= 0.02 + 1e-6)))
+
+    def test_ChainCollection_isoelectric_points(self):
+        result = self.collection.isoelectric_points(as_dataframe=True)
+        self.assertEqual(list(result.columns), OPTION_FLAGS.AVAILABLE_PI_VALUES)
+        self.assertEqual(list(result.index), self.collection.names)
+
+    def test_solve_isoelectric_points_not_found(self):
+        counts = np.zeros((1, 20), dtype=np.int32)
+        counts[0, 14] = 1000
+        self.assertTrue(np.all(np.isnan(solve_isoelectric_points(counts))))
+
+    @parameterized.expand([
+        ("tolerance", dict(tolerance=0)),
+        ("no_database", dict(pka_databases=[])),
+        ("pka_database", dict(pka_databases=['unknown']))
+    ])
+    def test_solve_isoelectric_points_exception(self, name, kwargs):
+        self.assertRaises(ValueError, solve_isoelectric_points, np.zeros((1, 20), dtype=np.int32), **kwargs)
+
+
+class TitrationCore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.collection = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_light.json',
+                                                        show_progressbar=False, verbose=False)
+        cls.ph = np.linspace(2, 12, 21)
+
+    def test_ChainCollection_titration_shape(self):
+        self.assertEqual(self.collection.titration(ph=self.ph).shape, (self.collection.n_ab, 21))
+
+    @parameterized.expand([(x,) for x in [2, 7.5, 12]])
+    def test_ChainCollection_titration_net_charge(self, ph):
+        net_charge = self.collection.titration(ph=self.ph)[:, list(self.ph).index(ph)]
+        np.testing.assert_allclose(net_charge, [x.ab_total_charge(ph=ph) for x in self.collection])
+
+    def test_ChainCollection_titration_per_position(self):
+        net_charge, charge = self.collection.titration(ph=self.ph, per_position=True)
+        self.assertEqual(charge.shape, (self.collection.n_ab, len(self.collection[0].ab_charge()), 21))
+        np.testing.assert_allclose(charge[0, :, 11], self.collection[0].ab_charge(ph=7.5))
+
+    def test_ChainCollection_titration_region(self):
+        _, charge = self.collection.titration(ph=self.ph, per_position=True, region='CDR3')
+        table = self.collection.numbering_table(as_array=True, region='CDR3')
+        self.assertEqual(charge.shape[:2], table.shape)
+
+    def test_ChainCollection_charge(self):
+        np.testing.assert_allclose(self.collection.charge, [x.ab_charge() for x in self.collection])
@@ -0,0 +1,85 @@
+import unittest
+import json
+import pickle
+import threading
+from abpytools import Chain
+from abpytools.utils import DataLoader, ReferenceDataRegistry, get_reference_data_registry
+from parameterized import parameterized
+
+
+class ReferenceDataRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = ReferenceDataRegistry()
+
+    @parameterized.expand([
+        ("CDR_positions", "CDR_positions"),
+        ("Framework_positions", "Framework_positions"),
+        ("NumberingSchemes", "NumberingSchemes"),
+        ("AminoAcidProperties", "AminoAcidProperties")
+    ])
+    def test_parsed_once(self, name, data_type):
+        for _ in range(10):
+            data = self.registry.get(data_type)
+        self.assertIs(self.registry.get(data_type), data)
+        self.assertEqual(self.registry.stats[data_type], 1)
+
+    def test_thread_safe(self):
+        results = []
+
+        def worker():
+            results.append(self.registry.get('NumberingSchemes'))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(x is results[0] for x in results))
+        self.assertEqual(self.registry.stats['NumberingSchemes'], 1)
+
+    def test_read_only(self):
+        data = self.registry.get('AminoAcidProperties')
+        with self.assertRaises(TypeError):
+            data['pI']['Wikipedia']['D'] = 0
+        self.assertIsInstance(self.registry.get('NumberingSchemes')['chothia']['heavy'], tuple)
+
+    def test_clear(self):
+        self.registry.get('CDR_positions')
+        self.registry.clear()
+        self.registry.get('CDR_positions')
+        self.assertEqual(self.registry.stats['CDR_positions'], 2)
+
+    def test_unknown_data_type(self):
+        self.assertRaises(ValueError, self.registry.get, 'MyData')
+
+    def test_DataLoader(self):
+        data = DataLoader(data_type='NumberingSchemes', data=['chothia', 'heavy']).get_data()
+        self.assertEqual(len(data), 158)
+        self.assertEqual(data[0], 'H1')
+
+    @parameterized.expand([
+        ("NumberingSchemes", "NumberingSchemes", ['chothia', 'heavy'], list),
+        ("CDR_positions", "CDR_positions", ['kabat', 'light'], dict),
+        ("AminoAcidProperties", "AminoAcidProperties", ['pI', 'EMBOSS'], dict)
+    ])
+    def test_DataLoader_types(self, name, data_type, data, expected):
+        result = DataLoader(data_type=data_type, data=data).get_data()
+        self.assertIsInstance(result, expected)
+        self.assertEqual(json.loads(json.dumps(result)), result)
+        self.assertEqual(pickle.loads(pickle.dumps(result)), result)
+        # the caller gets a copy, the shared data is not modified
+        result.clear()
+        self.assertNotEqual(len(DataLoader(data_type=data_type, data=data).get_data()), 0)
+
+    def test_Chain_load_does_not_parse(self):
+        registry = get_reference_data_registry()
+        sequence = ('QVQLQQSGAELARPGASVKMSCKASGYTFTRYTMHWVKQRPGQGLEWIGYINPSRGYTNYNQKFKDKATLTTDKSSSTAYMQ'
+                    'LSSLTSEDSAVYYCARYYDDHYCLDYWGQGTTLTVSS')
+        Chain.load_from_string(sequence=sequence, server='local')
+        stats = registry.stats
+        for _ in range(5):
+            Chain.load_from_string(sequence=sequence, server='local')
+        self.assertTrue(all(x <= 1 for x in registry.stats.values()))
+        self.assertEqual(registry.stats, stats)
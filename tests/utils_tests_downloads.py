@@ -0,0 +1,147 @@
+import unittest
+import asyncio
+import ssl
+import threading
+import time
+from unittest import mock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from abpytools.utils import (Download, AsyncDownload, DownloadError, RetryPolicy, CircuitBreaker, CircuitBreakerOpen,
+                             get_circuit_breaker)
+from parameterized import parameterized
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """
+    Fails the first n_failures requests to /<status>/<n_failures>/<key> with the given status code.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        _, status, n_failures, key = self.path.split('/')
+        with self.server.lock:
+            count = self.server.counts.get(key, 0)
+            self.server.counts[key] = count + 1
+
+        if count < int(n_failures):
+            status, body = int(status), b'error'
+        else:
+            status, body = 200, b'ok'
+
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DownloadTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.server.counts = dict()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = 'http://127.0.0.1:{}'.format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.retry_policy = RetryPolicy(num_retries=2, backoff_factor=0)
+        self.circuit_breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+
+    def download(self, path):
+        page = Download(self.url + path, retry_policy=self.retry_policy, circuit_breaker=self.circuit_breaker)
+        page.download()
+        return page.html
+
+    def adownload(self, path):
+        async def download():
+            async with AsyncDownload(retry_policy=self.retry_policy, circuit_breaker=self.circuit_breaker) as client:
+                return await client.download(self.url + path)
+        return asyncio.run(download())
+
+    @parameterized.expand([
+        ("sync", "download"),
+        ("async", "adownload")
+    ])
+    def test_retry_transient_error(self, name, method):
+        self.assertEqual(getattr(self, method)('/503/2/{}_transient'.format(name)), 'ok')
+        self.assertEqual(self.retry_policy.stats, {"requests": 1, "retries": 2, "failures": 0})
+
+    @parameterized.expand([
+        ("sync", "download", ValueError),
+        ("async", "adownload", DownloadError)
+    ])
+    def test_retry_exhausted(self, name, method, exception):
+        self.assertRaises(exception, getattr(self, method), '/500/5/{}_exhausted'.format(name))
+        self.assertEqual(self.retry_policy.stats, {"requests": 1, "retries": 2, "failures": 1})
+
+    @parameterized.expand([
+        ("sync", "download", ValueError),
+        ("async", "adownload", DownloadError)
+    ])
+    def test_no_retry_client_error(self, name, method, exception):
+        self.assertRaises(exception, getattr(self, method), '/404/1/{}_client_error'.format(name))
+        self.assertEqual(self.retry_policy.stats["retries"], 0)
+        self.assertEqual(self.circuit_breaker.stats["consecutive_failures"], 0)
+
+    @parameterized.expand([
+        ("sync", "download", ValueError),
+        ("async", "adownload", CircuitBreakerOpen)
+    ])
+    def test_circuit_breaker_open(self, name, method, exception):
+        # 3 failed attempts open the circuit breaker
+        self.assertRaises(Exception, getattr(self, method), '/503/10/{}_dead'.format(name))
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.OPEN)
+        self.assertRaises(exception, getattr(self, method), '/503/0/{}_alive'.format(name))
+        self.assertEqual(self.circuit_breaker.stats["opened"], 1)
+        self.assertEqual(self.circuit_breaker.stats["rejected"], 1)
+
+    def test_circuit_breaker_half_open(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+        circuit_breaker.record_failure()
+        self.assertFalse(circuit_breaker.allow_request())
+        time.sleep(0.05)
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.HALF_OPEN)
+        # only one trial request is let through
+        self.assertTrue(circuit_breaker.allow_request())
+        self.assertFalse(circuit_breaker.allow_request())
+        circuit_breaker.record_success()
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.CLOSED)
+
+    @parameterized.expand([
+        ("invalid_url", "not a url", None, ValueError),
+        ("ssl_error", "/200/0/ssl_error", ssl.SSLError, ValueError),
+        ("keyboard_interrupt", "/200/0/keyboard_interrupt", KeyboardInterrupt, KeyboardInterrupt)
+    ])
+    def test_circuit_breaker_half_open_cancelled(self, name, path, side_effect, exception):
+        self.circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        self.circuit_breaker.record_failure()
+        # the invalid url is rejected before the request is sent
+        url = path if side_effect is None else self.url + path
+        with mock.patch('abpytools.utils.downloads.request.urlopen', side_effect=side_effect):
+            page = Download(url, retry_policy=self.retry_policy, circuit_breaker=self.circuit_breaker)
+            self.assertRaises(exception, page.download)
+        # the trial request slot is freed, so the next request is let through
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(self.download('/200/0/{}_trial'.format(name)), 'ok')
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+    def test_backoff(self):
+        retry_policy = RetryPolicy(backoff_factor=1, max_backoff=3, jitter=0.5)
+        for retry, (lower, upper) in enumerate([(0.5, 1), (1, 2), (1.5, 3), (1.5, 3)]):
+            self.assertTrue(lower <= retry_policy.backoff(retry) <= upper)
+
+    def test_backoff_invalid_jitter(self):
+        self.assertRaises(ValueError, RetryPolicy, jitter=2)
+
+    def test_get_circuit_breaker(self):
+        self.assertIs(get_circuit_breaker(self.url + '/a'), get_circuit_breaker(self.url + '/b'))
@@ -0,0 +1,52 @@
+import unittest
+from abpytools import ChainCollection, Chain
+from abpytools.utils.encoding import (AMINO_ACIDS, ALPHABET_SIZE, encode_sequence, decode_sequence, encode_ascii,
+                                      residue_counts)
+from abpytools.features.composition import order_seq, aa_composition, chou_pseudo_aa_composition
+from parameterized import parameterized
+import numpy as np
+
+
+class EncodingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.chain_collection = ChainCollection.load_from_file(path='./tests/Data/chain_collection_1_light.json')
+
+    def test_encode_amino_acids(self):
+        self.assertEqual(encode_sequence(AMINO_ACIDS).tolist(), list(range(20)))
+
+    @parameterized.expand([
+        ("amino_acids", AMINO_ACIDS),
+        ("gaps", "QV-QL*X"),
+        ("empty", "")
+    ])
+    def test_decode_sequence(self, name, sequence):
+        encoded = encode_sequence(sequence)
+        self.assertEqual(encoded.dtype, np.uint8)
+        self.assertTrue(np.all(encoded < ALPHABET_SIZE))
+        self.assertEqual(decode_sequence(encoded), sequence)
+
+    def test_encode_exception(self):
+        self.assertRaises(ValueError, encode_sequence, 'QVQé')
+        self.assertRaises(ValueError, encode_ascii, np.array([65, 200], dtype=np.uint8))
+
+    def test_residue_counts(self):
+        self.assertEqual(residue_counts('CCY')[[1, 19]].tolist(), [2, 1])
+
+    def test_Chain_encoded_sequence(self):
+        chain = Chain(sequence='QVQLQ')
+        self.assertIs(chain.encoded_sequence, chain.encoded_sequence)
+        self.assertEqual(decode_sequence(chain.encoded_sequence), 'QVQLQ')
+
+    def test_ChainCollection_encoded_sequences(self):
+        self.assertEqual([decode_sequence(x) for x in self.chain_collection.encoded_sequences],
+                         self.chain_collection.sequences)
+
+    def test_ChainCollection_composition(self):
+        self.assertEqual(self.chain_collection.composition(method='count'),
+                         [order_seq(aa_composition(x)) for x in self.chain_collection.sequences])
+
+    def test_ChainCollection_chou(self):
+        self.assertEqual(self.chain_collection.composition(method='chou'),
+                         chou_pseudo_aa_composition(*self.chain_collection.sequences))
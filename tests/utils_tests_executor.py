@@ -0,0 +1,107 @@
+import unittest
+import threading
+import time
+from unittest import mock
+from abpytools import ChainCollection
+from abpytools.utils import executor as executor_module
+from abpytools.utils import (LoadingExecutor, get_loading_executor, configure_loading_executor,
+                             shutdown_loading_executor)
+from parameterized import parameterized
+
+
+def delayed_identity(x):
+    # later items finish first
+    time.sleep(0.001 * (10 - x))
+    return x
+
+
+class LoadingExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = LoadingExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    @parameterized.expand([
+        ("bounded", 2),
+        ("unbounded", None)
+    ])
+    def test_map_order(self, name, max_in_flight):
+        self.assertEqual(list(self.executor.map(delayed_identity, range(10), max_in_flight=max_in_flight)),
+                         list(range(10)))
+
+    def test_map_exception(self):
+        def fail(x):
+            if x == 3:
+                raise KeyError(x)
+            return x
+        self.assertRaises(KeyError, list, self.executor.map(fail, range(10)))
+
+    def test_stats(self):
+        event = threading.Event()
+        futures = [self.executor.submit(event.wait) for _ in range(6)]
+        time.sleep(0.05)
+        stats = self.executor.stats
+        self.assertEqual(stats['active_workers'], 4)
+        self.assertEqual(stats['queue_depth'], 2)
+        event.set()
+        for future in futures:
+            future.result()
+        stats = self.executor.stats
+        self.assertEqual(stats['completed'], 6)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertGreater(stats['utilisation'], 0)
+
+    def test_shutdown(self):
+        self.executor.shutdown()
+        self.assertRaises(RuntimeError, self.executor.submit, time.sleep, 0)
+
+    @parameterized.expand([
+        ("python_3_6", (3, 6)),
+        ("python_3_9", (3, 9))
+    ])
+    def test_shutdown_cancel_pending(self, name, version_info):
+        event = threading.Event()
+        futures = [self.executor.submit(event.wait) for _ in range(6)]
+        time.sleep(0.05)
+        shutdown = self.executor._executor.shutdown
+        # ThreadPoolExecutor.shutdown has no cancel_futures argument before python 3.9
+        with mock.patch.object(executor_module.sys, 'version_info', version_info), \
+                mock.patch.object(self.executor._executor, 'shutdown',
+                                  side_effect=(lambda wait=True: shutdown(wait=wait)) if version_info < (3, 9)
+                                  else shutdown):
+            self.executor.shutdown(wait=False, cancel_pending=True)
+        event.set()
+        self.assertEqual([x.cancelled() for x in futures], [False] * 4 + [True] * 2)
+        self.assertEqual(self.executor.stats['queue_depth'], 0)
+
+    def test_invalid_max_workers(self):
+        self.assertRaises(ValueError, LoadingExecutor, 0)
+
+
+class SharedLoadingExecutorTest(unittest.TestCase):
+
+    def tearDown(self):
+        shutdown_loading_executor()
+
+    def test_configure_loading_executor(self):
+        executor = configure_loading_executor(max_workers=3)
+        self.assertIs(get_loading_executor(), executor)
+        self.assertEqual(executor.max_workers, 3)
+
+    def test_shutdown_loading_executor(self):
+        executor = get_loading_executor()
+        shutdown_loading_executor()
+        self.assertIsNot(get_loading_executor(), executor)
+
+    def test_ChainCollection_load_reuses_threads(self):
+        configure_loading_executor(max_workers=4)
+        path = './tests/Data/chain_collection_light_2_sequences.fasta'
+        ChainCollection.load_from_fasta(path, server='local', show_progressbar=False, verbose=False)
+        for _ in range(5):
+            collection = ChainCollection.load_from_fasta(path, server='local', show_progressbar=False,
+                                                         verbose=False)
+        self.assertLessEqual(len([x for x in threading.enumerate() if x.name.startswith('abpytools-loader')]), 4)
+        self.assertEqual(collection.names, ['LightSeq1', 'LightSeq2'])
+        self.assertEqual(get_loading_executor().stats['completed'], 12)
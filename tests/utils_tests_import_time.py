@@ -0,0 +1,54 @@
+import unittest
+import os
+import subprocess
+import sys
+from abpytools.utils import lazy_import
+from parameterized import parameterized
+
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'pandas', 'scipy', 'sklearn', 'tqdm', 'google.protobuf']
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code):
+    output = subprocess.check_output([sys.executable, '-X', 'importtime', '-c', code], cwd=PACKAGE_DIRECTORY,
+                                     stderr=subprocess.STDOUT, universal_newlines=True)
+    return output.splitlines()
+
+
+def cumulative_import_time(lines, module):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    for line in lines:
+        if line.startswith('import time:') and line.split('|')[-1].strip() == module:
+            return int(line.split('|')[1]) / 1e6
+    return None
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    @parameterized.expand([
+        ("abpytools", "import abpytools"),
+        ("Chain", "from abpytools import Chain"),
+        ("ChainCollection", "from abpytools import ChainCollection"),
+        ("FabCollection", "from abpytools import FabCollection")
+    ])
+    def test_no_heavy_dependencies(self, name, statement):
+        lines = run_python('{}\nimport sys\nprint(",".join(m for m in {!r} if m in sys.modules))'.format(
+            statement, HEAVY_MODULES))
+        self.assertEqual(lines[-1], '')
+
+    def test_lazy_attribute(self):
+        lines = run_python('import sys\nimport abpytools\nprint(abpytools.CDRLength.__name__, '
+                           '"abpytools.analysis.cdr_length" in sys.modules)')
+        self.assertEqual(lines[-1], 'CDRLength True')
+
+    def test_import_time(self):
+        # benchmark: `import abpytools` used to take about 2s, mostly importing matplotlib, seaborn and pandas
+        import_time = min(cumulative_import_time(run_python('import abpytools'), 'abpytools') for _ in range(3))
+        self.assertLess(import_time, 1.)
+
+    def test_lazy_import(self):
+        json = lazy_import('json')
+        self.assertFalse(json.is_loaded)
+        self.assertEqual(json.dumps([1]), '[1]')
+        self.assertTrue(json.is_loaded)
@@ -0,0 +1,88 @@
+import unittest
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+from abpytools.utils import ReferenceBundle, get_reference_bundle
+from abpytools.utils.reference_bundle import DEFAULT_DATA_DIRECTORY
+from abpytools.analysis.analysis_helper_functions import load_substitution_matrix
+from parameterized import parameterized
+
+
+class ReferenceBundleTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bundle = ReferenceBundle()
+
+    @parameterized.expand([
+        ("CDR_positions", "CDR_positions"),
+        ("Framework_positions", "Framework_positions"),
+        ("NumberingSchemes", "NumberingSchemes"),
+        ("AminoAcidProperties", "AminoAcidProperties")
+    ])
+    def test_reference_data(self, name, data_type):
+        with open(os.path.join(DEFAULT_DATA_DIRECTORY, '{}.json'.format(data_type)), 'r') as f:
+            data = json.load(f)
+        # same values, types and key order as the JSON file
+        self.assertEqual(json.dumps(self.bundle.reference_data(data_type)), json.dumps(data))
+
+    @parameterized.expand([
+        ("BLOSUM45", "BLOSUM45"),
+        ("BLOSUM62", "BLOSUM62"),
+        ("BLOSUM80", "BLOSUM80")
+    ])
+    def test_substitution_matrix(self, name, substitution_matrix):
+        with open(os.path.join(DEFAULT_DATA_DIRECTORY, '{}.txt'.format(substitution_matrix)), 'rb') as f:
+            matrix = pickle.load(f)
+        self.assertEqual(self.bundle.substitution_matrix_dict(substitution_matrix), matrix)
+
+    def test_positions(self):
+        positions = self.bundle.positions('chothia', 'heavy')
+        self.assertEqual(positions.shape, (158,))
+        self.assertEqual(self.bundle.position_codes('chothia', 'heavy')['H1'], 0)
+        self.assertRaises(ValueError, self.bundle.positions, 'martin', 'heavy')
+        self.assertRaises(ValueError, self.bundle.positions, 'chothia', 'lambda')
+
+    def test_region_slices(self):
+        positions = self.bundle.position_codes('kabat', 'heavy')
+        region_slices = self.bundle.region_slices('kabat', 'heavy')
+        self.assertEqual(region_slices['FR2'], (44, 61))
+        # H35F is in the CDR1 positions of kabat
+        self.assertTrue(region_slices['CDR1'][0] <= positions['H35F'] < region_slices['CDR1'][1])
+        self.assertEqual(set(region_slices), set(self.bundle.regions))
+
+    def test_amino_acid_table(self):
+        table = self.bundle.amino_acid_table('hydrophobicity', 'kdHydrophobicity')
+        self.assertEqual(table[ord('I')], 4.5)
+        self.assertTrue(np.isnan(table[ord('X')]))
+        self.assertRaises(ValueError, self.bundle.amino_acid_table, 'pI', 'reference')
+
+    def test_read_only(self):
+        with self.assertRaises(ValueError):
+            self.bundle.amino_acid_table('pI', 'EMBOSS')[ord('D')] = 0
+        with self.assertRaises(ValueError):
+            self.bundle.positions('kabat', 'light')[0] = 'L0'
+
+    def test_lazy_loading(self):
+        # only the files that are used are parsed
+        directory = tempfile.mkdtemp()
+        try:
+            shutil.copy(os.path.join(DEFAULT_DATA_DIRECTORY, 'AminoAcidProperties.json'), directory)
+            bundle = get_reference_bundle(directory)
+            self.assertIs(bundle, get_reference_bundle(directory))
+            self.assertEqual(bundle.amino_acid_table('pI', 'EMBOSS')[ord('D')], 3.9)
+            self.assertRaises(OSError, bundle.positions, 'kabat', 'heavy')
+        finally:
+            shutil.rmtree(directory)
+
+    def test_reference_data_parsed_once(self):
+        self.assertIs(self.bundle.reference_data('CDR_positions'), self.bundle.reference_data('CDR_positions'))
+        self.assertIs(self.bundle.amino_acid_table('pI', 'EMBOSS'), self.bundle.amino_acid_table('pI', 'EMBOSS'))
+        self.assertRaises(ValueError, self.bundle.reference_data, 'BLOSUM62')
+
+    def test_load_substitution_matrix(self):
+        self.assertEqual(load_substitution_matrix('BLOSUM80')[('A', 'A')], 5)
+        self.assertRaises(ValueError, load_substitution_matrix, 'PAM250')